@@ -0,0 +1,522 @@
+"""Gemini model calls shared by the Streamlit app and the CLI tools."""
+
+import asyncio
+import functools
+import hashlib
+import json
+import queue
+import threading
+import time
+
+from metrics import observe_stage, record_cache, record_payload, record_usage, span
+from preflight import preflight
+from prompts import PROMPT_NAMES, PROMPT_SECTIONS, needed_sections
+from resilience import RetryPolicy, SingleFlight, call_with_retries, call_with_retries_async
+from response_cache import fingerprint_parts, make_response_key
+from resume_sections import prune_sections
+from settings import JD_COMPRESSION, MODEL_NAME, MODEL_PRICES, MODEL_RETRY, SECTION_PRUNING, TOKEN_BUDGET, TOKEN_BUDGETS
+
+RETRY_POLICY = RetryPolicy(**MODEL_RETRY)
+# Shared by every caller in the process so identical concurrent requests make one model call
+IN_FLIGHT = SingleFlight()
+CLIENT_OPTIONS = {}
+
+
+def configure_client(**options):
+    """Set genai.configure options (e.g. api_key), applied when the client library is first loaded."""
+    CLIENT_OPTIONS.update(options)
+
+
+@functools.lru_cache(maxsize=None)
+def load_genai():
+    # google.generativeai takes about a second to import, so it waits for the first model call.
+    # Without an api_key option the client reads GOOGLE_API_KEY from the environment.
+    import google.generativeai as genai
+    if CLIENT_OPTIONS:
+        genai.configure(**CLIENT_OPTIONS)
+    return genai
+
+
+@functools.lru_cache(maxsize=None)
+def get_model(model_name):
+    """Shared GenerativeModel for `model_name`, created once per process."""
+    return load_genai().GenerativeModel(model_name)
+
+
+def get_prompt_name(prompt):
+    return PROMPT_NAMES.get(prompt, "custom")
+
+
+def get_prompt_id(prompt):
+    # Include a hash of the text so editing a prompt invalidates its cached responses
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+    return f"{get_prompt_name(prompt)}:{digest}"
+
+
+def build_contents(job_description, pdf_parts, prompt):
+    return [
+        {"text": job_description},
+        *pdf_parts,
+        {"text": prompt}
+    ]
+
+
+def get_cache_key(job_description, pdf_parts, prompt, model_name):
+    return make_response_key(fingerprint_parts(pdf_parts), job_description, get_prompt_id(prompt), model_name)
+
+
+def prepare_request(job_description, pdf_parts, prompt, model_name, label, sections=None, cache=None, extra_parts=None):
+    """Build the request contents and its key, timed as the "request_build" stage.
+
+    Resume sections the prompt does not read are left out (`sections`,
+    default prompts.PROMPT_SECTIONS for the prompt), and the job description
+    goes through the token preflight (boilerplate removal and the prompt's
+    token budget), so the key covers what is sent. If `cache` has a
+    near-duplicate index, near-duplicates of an earlier resume or job
+    description may be keyed as that one (see near_duplicates.py).
+    `extra_parts` follow the resume in the request but are not part of its
+    identity there.
+    """
+    with span("request_build", prompt=label) as fields:
+        resume_parts = pdf_parts
+        sections = (sections or PROMPT_SECTIONS.get(label)) if SECTION_PRUNING else None
+        if sections:
+            pdf_parts = prune_sections(pdf_parts, sections, label)
+        pdf_parts = pdf_parts + list(extra_parts or [])
+        job_description = preflight(
+            job_description, pdf_parts, prompt, label, JD_COMPRESSION, TOKEN_BUDGETS.get(label, TOKEN_BUDGET)
+        )
+        contents = build_contents(job_description, pdf_parts, prompt)
+        near_duplicates = getattr(cache, "near_duplicates", None)
+        if near_duplicates is None:
+            request_key = get_cache_key(job_description, pdf_parts, prompt, model_name)
+        else:
+            resume_id, job_id = near_duplicates.request_identities(
+                resume_parts, pdf_parts, sections, job_description, label, extra_parts
+            )
+            request_key = make_response_key(resume_id, job_id, get_prompt_id(prompt), model_name)
+        fields["payload_bytes"] = record_payload(contents, prompt=label)
+    return contents, request_key
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call, such as a SQLite cache read or write, on the default executor so the event loop keeps serving."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def lookup_cached(cache, cache_key, refresh, label):
+    if cache is None or refresh:
+        return None
+    with span("cache_lookup", prompt=label) as fields:
+        cached = cache.get(cache_key)
+        fields["hit"] = cached is not None
+    record_cache("response", cached is not None)
+    return cached
+
+
+def admitted(admission, contents, send):
+    """Wait for admission (if any), then call send(); returns (result, ticket)."""
+    if admission is None:
+        return send(), None
+    ticket = admission.acquire(contents)
+    try:
+        return send(), ticket
+    except Exception:
+        admission.settle(ticket, 0)
+        raise
+
+
+async def admitted_async(admission, contents, send):
+    if admission is None:
+        return await send(), None
+    ticket = await admission.acquire_async(contents)
+    try:
+        return await send(), ticket
+    except Exception:
+        admission.settle(ticket, 0)
+        raise
+
+
+def settle_usage(admission, ticket, usage):
+    # Without usage metadata the estimate stands
+    if ticket is not None and (usage["input"] or usage["output"]):
+        admission.settle(ticket, usage["input"] + usage["output"])
+
+
+def call_model(model_name, contents, label, on_retry=None, admission=None, **kwargs):
+    """Call generate_content with admission control and retries, recording latency and token usage."""
+    model = get_model(model_name)
+    with span("model_call", prompt=label, model=model_name):
+        response, ticket = call_with_retries(
+            lambda: admitted(admission, contents, lambda: model.generate_content(contents, **kwargs)),
+            RETRY_POLICY, on_retry, label,
+        )
+    usage = record_usage(getattr(response, "usage_metadata", None), label, model_name, MODEL_PRICES)
+    settle_usage(admission, ticket, usage)
+    return response
+
+
+async def call_model_async(model_name, contents, label, on_retry=None, admission=None, **kwargs):
+    model = get_model(model_name)
+    with span("model_call", prompt=label, model=model_name):
+        response, ticket = await call_with_retries_async(
+            lambda: admitted_async(admission, contents, lambda: model.generate_content_async(contents, **kwargs)),
+            RETRY_POLICY, on_retry, label,
+        )
+    usage = record_usage(getattr(response, "usage_metadata", None), label, model_name, MODEL_PRICES)
+    settle_usage(admission, ticket, usage)
+    return response
+
+
+def generate_analysis(job_description, pdf_parts, prompt, model_name=MODEL_NAME, cache=None, refresh=False, on_retry=None, admission=None,
+                      extra_parts=None):
+    """
+    Run one analysis prompt against a resume and job description.
+
+    Args:
+        job_description (str): Job description text
+        pdf_parts (list): Ordered resume parts from pdf_render.render_pdf
+        prompt (str): One of the prompts in prompts.PROMPTS
+        model_name (str): Gemini model name
+        cache (ResponseCache): Optional response cache
+        refresh (bool): Skip the cache lookup but still store the new response
+        on_retry (callable): Optional on_retry(attempt, delay, error), called before each retry wait
+        admission (scheduler.Admission): Optional shared rate limiter and fair queue to wait in
+        extra_parts (list): Optional parts sent after the resume, e.g. local skill matches to ground the answer
+
+    Returns:
+        str: Model response text
+
+    Raises:
+        Exception: Whatever the Gemini client raises once retries run out; callers decide how to report it
+    """
+    label = get_prompt_name(prompt)
+    contents, cache_key = prepare_request(
+        job_description, pdf_parts, prompt, model_name, label, cache=cache, extra_parts=extra_parts
+    )
+    cached = lookup_cached(cache, cache_key, refresh, label)
+    if cached is not None:
+        return cached
+
+    def run():
+        text = call_model(model_name, contents, label, on_retry, admission).text
+        if cache is not None:
+            cache.put(cache_key, text)
+        return text
+
+    return IN_FLIGHT.do(cache_key, run)
+
+
+async def generate_analysis_async(job_description, pdf_parts, prompt, model_name=MODEL_NAME, cache=None, refresh=False, on_retry=None, admission=None,
+                                  extra_parts=None):
+    """Async counterpart of generate_analysis, using the client's async transport."""
+    label = get_prompt_name(prompt)
+    contents, cache_key = await run_blocking(
+        prepare_request, job_description, pdf_parts, prompt, model_name, label, cache=cache, extra_parts=extra_parts
+    )
+    cached = await run_blocking(lookup_cached, cache, cache_key, refresh, label)
+    if cached is not None:
+        return cached
+
+    async def run():
+        text = (await call_model_async(model_name, contents, label, on_retry, admission)).text
+        if cache is not None:
+            await run_blocking(cache.put, cache_key, text)
+        return text
+
+    return await IN_FLIGHT.do_async(cache_key, run)
+
+
+def build_combined_prompt(prompts):
+    """
+    Merge several analysis prompts into one task list with a JSON answer format.
+
+    Args:
+        prompts (dict): Prompt name -> prompt text
+
+    Returns:
+        str: Prompt asking for one JSON object keyed by prompt name
+    """
+    sections = "\n\n".join(f"### Task `{name}`\n{prompt}" for name, prompt in prompts.items())
+    keys = ", ".join(f'"{name}"' for name in prompts)
+    return (
+        "Complete every task below using the job description and resume provided above. "
+        "Treat each task independently and give it the full depth it asks for.\n\n"
+        f"{sections}\n\n"
+        f"Respond with a single JSON object with exactly these keys: {keys}. "
+        "Each value must be the complete answer to that task as a Markdown string."
+    )
+
+
+def split_combined_response(text, names):
+    """
+    Split a combined JSON response into per-task answers.
+
+    Returns:
+        dict: Prompt name -> answer text; tasks missing from the response are omitted
+    """
+    try:
+        sections = json.loads(text)
+    except ValueError:
+        # Tolerate prose or code fences around the JSON object
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            sections = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+    if not isinstance(sections, dict):
+        return {}
+    return {name: str(sections[name]) for name in names if sections.get(name)}
+
+
+def generate_combined_analysis(job_description, pdf_parts, prompts, model_name=MODEL_NAME, cache=None, refresh=False, on_retry=None, admission=None):
+    """
+    Run several analyses in a single model call, sending the resume and job description once.
+
+    Args:
+        prompts (dict): Prompt name -> prompt text for the chosen analyses
+
+    Returns:
+        dict: Prompt name -> answer text; a task the model skipped is omitted
+    """
+    combined_prompt = build_combined_prompt(prompts)
+    contents, cache_key = prepare_request(
+        job_description, pdf_parts, combined_prompt, model_name, "combined", needed_sections(prompts), cache
+    )
+    text = lookup_cached(cache, cache_key, refresh, "combined")
+
+    def run():
+        text = call_model(
+            model_name, contents, "combined", on_retry, admission,
+            generation_config={"response_mime_type": "application/json"},
+        ).text
+        # Only cache answers that actually parsed
+        if cache is not None and split_combined_response(text, prompts):
+            cache.put(cache_key, text)
+        return text
+
+    if text is None:
+        text = IN_FLIGHT.do(cache_key, run)
+    return split_combined_response(text, prompts)
+
+
+async def generate_combined_analysis_async(job_description, pdf_parts, prompts, model_name=MODEL_NAME, cache=None, refresh=False, on_retry=None, admission=None):
+    """Async counterpart of generate_combined_analysis."""
+    combined_prompt = build_combined_prompt(prompts)
+    contents, cache_key = await run_blocking(
+        prepare_request, job_description, pdf_parts, combined_prompt, model_name, "combined", needed_sections(prompts), cache
+    )
+    text = await run_blocking(lookup_cached, cache, cache_key, refresh, "combined")
+
+    async def run():
+        response = await call_model_async(
+            model_name, contents, "combined", on_retry, admission,
+            generation_config={"response_mime_type": "application/json"},
+        )
+        if cache is not None and split_combined_response(response.text, prompts):
+            await run_blocking(cache.put, cache_key, response.text)
+        return response.text
+
+    if text is None:
+        text = await IN_FLIGHT.do_async(cache_key, run)
+    return split_combined_response(text, prompts)
+
+
+class StreamTimer:
+    """
+    Split a streamed call into "model_first_token" (upload, queueing and
+    prompt processing) and "model_generation" (first chunk to last).
+    Usage is read from the last chunk, which carries the totals.
+    """
+
+    def __init__(self, label, model_name):
+        self.label = label
+        self.model_name = model_name
+        self.started = time.perf_counter()
+        self.first = None
+        self.usage = None
+
+    def chunk(self, chunk):
+        if self.first is None:
+            self.first = time.perf_counter()
+            observe_stage("model_first_token", self.first - self.started, prompt=self.label, model=self.model_name)
+        self.usage = getattr(chunk, "usage_metadata", None) or self.usage
+
+    def finish(self):
+        if self.first is not None:
+            observe_stage("model_generation", time.perf_counter() - self.first, prompt=self.label, model=self.model_name)
+        return record_usage(self.usage, self.label, self.model_name, MODEL_PRICES)
+
+
+def stream_analysis(job_description, pdf_parts, prompt, model_name=MODEL_NAME, cache=None, refresh=False, on_retry=None, admission=None,
+                    extra_parts=None):
+    """
+    Streaming counterpart of generate_analysis, yielding text chunks as they arrive.
+
+    A cached response is yielded as a single chunk, and so is the result of
+    an identical request that was already streaming when this one started.
+    The full text is only written to the cache once the stream has completed.
+    Retries only cover opening the stream, never a stream that has already
+    produced text.
+    """
+    label = get_prompt_name(prompt)
+    contents, cache_key = prepare_request(
+        job_description, pdf_parts, prompt, model_name, label, cache=cache, extra_parts=extra_parts
+    )
+    cached = lookup_cached(cache, cache_key, refresh, label)
+    if cached is not None:
+        yield cached
+        return
+
+    flight, leader = IN_FLIGHT.join(cache_key)
+    if not leader:
+        shared = flight.wait(IN_FLIGHT.timeout)
+        if shared is not None:
+            yield shared
+            return
+
+    model = get_model(model_name)
+    timer = StreamTimer(label, model_name)
+    chunks = []
+    text = error = None
+    try:
+        with span("model_call", prompt=label, model=model_name):
+            response, ticket = call_with_retries(
+                lambda: admitted(admission, contents, lambda: model.generate_content(contents, stream=True)),
+                RETRY_POLICY, on_retry, label,
+            )
+            for chunk in response:
+                timer.chunk(chunk)
+                chunks.append(chunk.text)
+                yield chunk.text
+        text = "".join(chunks)
+        settle_usage(admission, ticket, timer.finish())
+        if cache is not None:
+            cache.put(cache_key, text)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if leader:
+            # Followers wait on this; once the text is complete it is theirs even if saving it failed
+            IN_FLIGHT.finish(cache_key, flight, text, None if text is not None else error)
+
+
+async def stream_analysis_async(job_description, pdf_parts, prompt, model_name=MODEL_NAME, cache=None, refresh=False, on_retry=None, admission=None,
+                                extra_parts=None):
+    """Async counterpart of stream_analysis."""
+    label = get_prompt_name(prompt)
+    contents, cache_key = await run_blocking(
+        prepare_request, job_description, pdf_parts, prompt, model_name, label, cache=cache, extra_parts=extra_parts
+    )
+    cached = await run_blocking(lookup_cached, cache, cache_key, refresh, label)
+    if cached is not None:
+        yield cached
+        return
+
+    flight, leader = IN_FLIGHT.join(cache_key)
+    if not leader:
+        shared = await flight.wait_async(IN_FLIGHT.timeout)
+        if shared is not None:
+            yield shared
+            return
+
+    model = get_model(model_name)
+    timer = StreamTimer(label, model_name)
+    chunks = []
+    text = error = None
+    try:
+        with span("model_call", prompt=label, model=model_name):
+            response, ticket = await call_with_retries_async(
+                lambda: admitted_async(admission, contents, lambda: model.generate_content_async(contents, stream=True)),
+                RETRY_POLICY, on_retry, label,
+            )
+            async for chunk in response:
+                timer.chunk(chunk)
+                chunks.append(chunk.text)
+                yield chunk.text
+        text = "".join(chunks)
+        settle_usage(admission, ticket, timer.finish())
+        if cache is not None:
+            await run_blocking(cache.put, cache_key, text)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        if leader:
+            # Followers wait on this; once the text is complete it is theirs even if saving it failed
+            IN_FLIGHT.finish(cache_key, flight, text, None if text is not None else error)
+
+
+async def generate_analyses_concurrently(job_description, pdf_parts, prompts, model_name=MODEL_NAME, cache=None, refresh=False, admission=None):
+    """
+    Stream several prompts at once, yielding progress from whichever is ready.
+
+    Args:
+        prompts (dict): Prompt name -> prompt text
+
+    Yields:
+        tuple: (name, text, finished, error) where text is the response so far
+        and error is set only on the final event of a failed analysis
+    """
+    events = asyncio.Queue()
+
+    async def run(name, prompt):
+        text = ""
+        try:
+            async for chunk in stream_analysis_async(
+                job_description, pdf_parts, prompt, model_name, cache, refresh, admission=admission
+            ):
+                text += chunk
+                await events.put((name, text, False, None))
+            await events.put((name, text, True, None))
+        except Exception as e:
+            await events.put((name, text, True, e))
+
+    tasks = [asyncio.ensure_future(run(name, prompt)) for name, prompt in prompts.items()]
+    remaining = len(tasks)
+    while remaining:
+        event = await events.get()
+        if event[2]:
+            remaining -= 1
+        yield event
+
+
+def start_event_loop():
+    """Start an event loop on a daemon thread and return it.
+
+    The Gemini async client binds to the loop it was first used on, so
+    long-lived callers (the Streamlit app) keep one loop for the process
+    instead of calling asyncio.run per request.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gemini-async", daemon=True).start()
+    return loop
+
+
+def iter_analyses_concurrently(loop, job_description, pdf_parts, prompts, **kwargs):
+    """
+    Run generate_analyses_concurrently on `loop` and yield its results in the calling thread.
+
+    This lets synchronous code such as a Streamlit script update the page as
+    each analysis arrives while the calls themselves overlap on the loop.
+    """
+    results = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for result in generate_analyses_concurrently(job_description, pdf_parts, prompts, **kwargs):
+                results.put(result)
+        finally:
+            results.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    while True:
+        result = results.get()
+        if result is done:
+            break
+        yield result
+    future.result()
@@ -0,0 +1,319 @@
+"""Asynchronous REST/JSON API for the resume analyses.
+
+Lets other systems, such as an ATS backend, run the same eight analyses as
+the Streamlit app. Each worker process runs one aiohttp event loop and owns
+its own Gemini client, response cache and admission controller. With
+--workers N, the processes share the listening port (SO_REUSEPORT) and
+split the configured quota between them. Async submissions go to the
+persistent job queue (jobs.py), which background workers in every process
+drain, so a job can be polled through any worker and survives a restart.
+
+Endpoints:
+    GET  /healthz              liveness check
+    GET  /v1/analyses          available analyses
+    POST /v1/analyses          run analyses on a resume; waits for the results, or returns a job ID with ?mode=async
+    GET  /v1/jobs/{job_id}     status, queue position, partial text and results of an async job
+    GET  /metrics              Prometheus metrics of the worker that answers
+
+Usage:
+    python api_server.py --port 8080 --workers 4
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import functools
+import logging
+import multiprocessing
+import os
+
+from aiohttp import web
+
+from analysis import configure_client
+from bulk_screen import parse_analyses
+from job_worker import JobWorkers, run_analyses, submit_job
+from jobs import QUEUED
+from metrics import METRICS
+from prompts import ANALYSIS_TITLES, PROMPTS
+from render_sandbox import SandboxUnavailable
+from response_cache import fingerprint_parts
+from results_store import default_requisition, score_rows
+from scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, Admission, AdmissionController
+from settings import (
+    API_HOST, API_PORT, API_TOKEN, API_WORKERS, EXPECTED_OUTPUT_TOKENS, JOB_WORKERS, MODEL_NAME, PDF_DPI, PDF_IMAGE_OPTIONS,
+    PDF_MAX_PAGES, PDF_MODE, PDF_RENDER_SETTINGS, RPM_LIMIT, TPM_LIMIT,
+    make_job_store, make_pdf_cache, make_render_sandbox, make_response_cache, make_results_store,
+)
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+logger = logging.getLogger("resume_analyzer.api")
+
+
+def json_error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+
+def render_resume(sandbox, pdf_bytes):
+    return sandbox.render(pdf_bytes, max_pages=PDF_MAX_PAGES, dpi=PDF_DPI, mode=PDF_MODE, image_options=PDF_IMAGE_OPTIONS)
+
+
+def is_true(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+async def read_submission(request):
+    """
+    Parse a multipart or JSON submission.
+
+    Multipart fields: resume (PDF file), job_description, analyses, combined, refresh, candidate, requisition.
+    JSON keys: resume_base64, job_description, analyses, combined, refresh, candidate, requisition.
+    `analyses` is "all", tool numbers / prompt names separated by commas, or a JSON list.
+    `candidate` defaults to the uploaded file name and `requisition` to one per job description.
+
+    Returns:
+        dict: pdf_bytes, job_description, analyses, combined, refresh, candidate, requisition
+
+    Raises:
+        ValueError: With a message suitable for a 400 response
+    """
+    if request.content_type == "multipart/form-data":
+        fields = await request.post()
+        resume = fields.get("resume")
+        if not isinstance(resume, web.FileField):
+            raise ValueError("multipart field 'resume' must be a PDF file")
+        pdf_bytes = resume.file.read()
+        filename = resume.filename or ""
+    elif request.content_type == "application/json":
+        try:
+            fields = await request.json()
+        except ValueError:
+            raise ValueError("request body is not valid JSON")
+        if not isinstance(fields, dict):
+            raise ValueError("request body must be a JSON object")
+        try:
+            pdf_bytes = base64.b64decode(fields.get("resume_base64") or "", validate=True)
+        except (binascii.Error, TypeError):
+            raise ValueError("resume_base64 is not valid base64")
+        filename = ""
+    else:
+        raise ValueError("send multipart/form-data or application/json")
+
+    if not pdf_bytes.startswith(b"%PDF-"):
+        raise ValueError("resume must be a PDF file")
+    job_description = (fields.get("job_description") or "").strip()
+    if not job_description:
+        raise ValueError("job_description is required")
+    analyses = fields.get("analyses") or "all"
+    if isinstance(analyses, list):
+        analyses = ",".join(str(item) for item in analyses)
+    try:
+        names = parse_analyses(str(analyses))
+    except argparse.ArgumentTypeError as e:
+        raise ValueError(str(e))
+    return {
+        "pdf_bytes": pdf_bytes,
+        "job_description": job_description,
+        "analyses": names,
+        "combined": is_true(fields.get("combined", False)),
+        "refresh": is_true(fields.get("refresh", False)),
+        "candidate": str(fields.get("candidate") or filename),
+        "requisition": str(fields.get("requisition") or "").strip() or default_requisition(job_description),
+    }
+
+
+async def render_submission(app, submission):
+    # Rendering runs in the sandbox's worker processes; keep the waiting off the event loop
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, app["pdf_cache"].get_or_render, submission["pdf_bytes"], PDF_RENDER_SETTINGS,
+        functools.partial(render_resume, app["render_sandbox"]),
+    )
+
+
+async def run_submission(app, submission, admission):
+    """Convert the resume and run the requested analyses concurrently; returns the JSON result body."""
+    render = await render_submission(app, submission)
+    results = await run_analyses(
+        submission["job_description"], render["parts"], submission["analyses"], combined=submission["combined"],
+        cache=app["response_cache"], refresh=submission["refresh"], admission=admission,
+    )
+    if app["results_store"] is not None:
+        rows = score_rows(
+            results, submission["candidate"], submission["requisition"], fingerprint_parts(render["parts"]), MODEL_NAME
+        )
+        if rows:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, app["results_store"].append, rows)
+            except Exception:
+                logger.exception("Could not save scores")
+    return {"model": MODEL_NAME, "pages": render["pages"], "results": results}
+
+
+def client_id(request):
+    # Fairness is per caller: an explicit client ID, else the peer address
+    return request.headers.get("X-Client-Id") or request.remote or "anonymous"
+
+
+async def submit_analyses(request):
+    app = request.app
+    try:
+        submission = await read_submission(request)
+    except ValueError as e:
+        return json_error(400, str(e))
+
+    mode = request.query.get("mode", "sync")
+    if mode not in ("sync", "async"):
+        return json_error(400, "mode must be 'sync' or 'async'")
+    if mode == "sync":
+        admission = Admission(
+            app["admission_controller"], client_id(request), PRIORITY_INTERACTIVE, output_tokens=EXPECTED_OUTPUT_TOKENS
+        )
+        try:
+            result = await run_submission(app, submission, admission)
+        except SandboxUnavailable as e:
+            return json_error(503, f"PDF conversion is unavailable: {e}")
+        except (RuntimeError, ValueError) as e:
+            return json_error(422, f"could not read the PDF: {e}")
+        return web.json_response(result)
+
+    try:
+        render = await render_submission(app, submission)
+    except SandboxUnavailable as e:
+        return json_error(503, f"PDF conversion is unavailable: {e}")
+    except (RuntimeError, ValueError) as e:
+        return json_error(422, f"could not read the PDF: {e}")
+    # Async jobs are batch work: they queue behind callers waiting on a sync response.
+    # The persistent queue runs them, so they survive a restart and identical submissions share a job.
+    loop = asyncio.get_running_loop()
+    job_id, _ = await loop.run_in_executor(None, functools.partial(
+        submit_job, app["job_store"], submission["job_description"], render, submission["analyses"],
+        combined=submission["combined"], refresh=submission["refresh"], priority=PRIORITY_BULK,
+        session=client_id(request), candidate=submission["candidate"], requisition=submission["requisition"],
+    ))
+    job = await loop.run_in_executor(None, app["job_store"].get, job_id)
+    status_url = f"/v1/jobs/{job_id}"
+    return web.json_response(
+        {"job_id": job_id, "status": job["status"], "status_url": status_url}, status=202, headers={"Location": status_url}
+    )
+
+
+async def get_job(request):
+    loop = asyncio.get_running_loop()
+    store = request.app["job_store"]
+    job = await loop.run_in_executor(None, store.get, request.match_info["job_id"])
+    if job is None:
+        return json_error(404, "unknown or expired job")
+    body = {"job_id": job["id"], "status": job["status"], "created": job["created"], "updated": job["updated"]}
+    if job["status"] == QUEUED:
+        body["position"] = await loop.run_in_executor(None, store.position, job["id"])
+    if job["result"] is not None:
+        body.update(job["result"])
+    elif job["partial"]:
+        body["partial"] = job["partial"]
+    if job["waiting"]:
+        body["waiting"] = job["waiting"]
+    if job["error"]:
+        body["error"] = job["error"]
+    return web.json_response(body)
+
+
+async def list_analyses(request):
+    return web.json_response({
+        "analyses": [
+            {"id": name, "number": number, "title": ANALYSIS_TITLES[name]}
+            for number, name in enumerate(PROMPTS, start=1)
+        ]
+    })
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok"})
+
+
+async def metrics(request):
+    return web.Response(text=METRICS.render_prometheus(), content_type="text/plain")
+
+
+@web.middleware
+async def require_token(request, handler):
+    if API_TOKEN and request.path != "/healthz":
+        if request.headers.get("Authorization") != f"Bearer {API_TOKEN}":
+            return json_error(401, "missing or invalid bearer token")
+    return await handler(request)
+
+
+async def on_startup(app):
+    configure_client(api_key=os.getenv("GOOGLE_API_KEY"))
+    app["pdf_cache"] = make_pdf_cache()
+    app["render_sandbox"] = make_render_sandbox()
+    app["response_cache"] = make_response_cache()
+    app["job_store"] = make_job_store()
+    app["results_store"] = make_results_store()
+    workers = app["workers"]
+    # Each worker gets an equal share of the process-wide quota
+    app["admission_controller"] = AdmissionController(
+        requests_per_minute=RPM_LIMIT / workers, tokens_per_minute=TPM_LIMIT / workers
+    )
+    app["job_workers"] = None
+    if JOB_WORKERS:
+        # Jobs run on this loop: the async Gemini client is bound to the loop it first ran on
+        app["job_workers"] = JobWorkers(
+            app["job_store"], asyncio.get_running_loop(), app["response_cache"], app["admission_controller"],
+            threads=JOB_WORKERS, results_store=app["results_store"],
+        ).start()
+
+
+async def on_shutdown(app):
+    # Don't wait: unfinished jobs stay in the queue and are picked up again once their lease ends
+    if app["job_workers"] is not None:
+        app["job_workers"].stop(timeout=0)
+    app["render_sandbox"].close()
+
+
+def create_app(workers=1):
+    app = web.Application(client_max_size=MAX_UPLOAD_BYTES + 1024 * 1024, middlewares=[require_token])
+    app["workers"] = workers
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/v1/analyses", list_analyses)
+    app.router.add_post("/v1/analyses", submit_analyses)
+    app.router.add_get("/v1/jobs/{job_id}", get_job)
+    return app
+
+
+def serve(host, port, workers):
+    web.run_app(create_app(workers), host=host, port=port, reuse_port=workers > 1, print=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the resume analyses over HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Worker processes sharing the port")
+    args = parser.parse_args(argv)
+    if not os.getenv("GOOGLE_API_KEY"):
+        parser.error("GOOGLE_API_KEY is not set")
+
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    if args.workers <= 1:
+        serve(args.host, args.port, 1)
+        return
+    # Spawn, not fork: each worker builds its own gRPC client and event loop from scratch
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=serve, args=(args.host, args.port, args.workers)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
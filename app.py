@@ -1,17 +1,27 @@
-import base64
-import io
 import streamlit as st
 import os
-from  PIL import Image  
-import fitz
-import google.generativeai as genai
-
-# Try to load environment variables from .env file
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not installed, that's okay
+import time
+import uuid
+from analysis import configure_client
+from app_resources import (
+    CARD_ICONS, CARD_TITLES, CARDS, RESULT_HEADERS, get_admission_controller, get_job_store, get_pdf_cache, get_render_sandbox,
+    get_response_cache, get_skill_matcher, load_asset, start_job_workers, start_metrics_export,
+)
+from job_worker import submit_job
+from jobs import FAILED, QUEUED, RUNNING
+from metrics import METRICS, observe_stage, record_cache
+from near_duplicates import minhash, parts_text
+from preflight import REASON_LABELS, compress_job_description
+from skill_matcher import format_skills_for_prompt, group_by_category
+from prompts import PROMPTS
+from render_sandbox import PdfRejected, SandboxUnavailable
+from response_cache import fingerprint_parts
+from resume_sections import SECTION_TITLES
+from scores import score_label, strip_scores
+from settings import (
+    ADMIN_PANEL, JD_COMPRESSION, METRICS_PORT, PDF_DPI, PDF_IMAGE_OPTIONS, PDF_MAX_PAGES, PDF_MODE, PDF_RENDER_SETTINGS, PDF_TEXT_SETTINGS,
+    NEAR_DUPLICATES, SECTION_PRUNING,
+)
 
 # Check if API key is available
 api_key = os.getenv("GOOGLE_API_KEY")
@@ -34,277 +44,272 @@ if not api_key:
     """)
     st.stop()
 
-genai.configure(api_key=api_key)
-
-# Prompts for Gemini API interactions
-input_prompt1 = """You are an expert HR manager with 15+ years of experience in technical recruitment. Conduct a detailed analysis of the resume against the job description. Your analysis must include:
-
-1. Match Analysis (40% of evaluation):
-   - Exact matching skills and years of experience
-   - Directly relevant project experience
-   - Industry-specific expertise alignment
-   - Required qualifications match
-
-2. Technical Depth (30% of evaluation):
-   - Core technical skills assessment
-   - Tool and technology proficiency levels
-   - Project complexity evaluation
-   - Technical problem-solving evidence
-
-3. Career Progression (20% of evaluation):
-   - Role responsibilities alignment
-   - Career growth trajectory
-   - Leadership/management experience if required
-   - Achievement impact measurement
-
-4. Cultural & Soft Skills (10% of evaluation):
-   - Communication skills evidence
-   - Team collaboration indicators
-   - Problem-solving approach
-   - Cultural fit indicators
-
-Provide a percentage-based match score and detailed bullet points for each category. Be extremely specific with examples from both the resume and job description."""
-
-input_prompt2 = """Perform a comprehensive skills extraction and analysis. For each skill found:
-
-1. Technical Skills:
-   - List each skill with proficiency level (Basic/Intermediate/Expert)
-   - Years of experience with each skill
-   - Context of skill usage in projects
-   - Current industry relevance score (1-10)
-
-2. Tools & Technologies:
-   - Categorize by domain (Development/Testing/DevOps/etc.)
-   - Version/certification information if mentioned
-   - Implementation examples from projects
-   - Industry demand level (High/Medium/Low)
-
-3. Soft Skills:
-   - Evidence-based skill identification
-   - Situation examples demonstrating each skill
-   - Impact metrics where available
-   - Relevance to target role
-
-4. Domain Knowledge:
-   - Industry-specific expertise
-   - Business domain knowledge
-   - Methodologies and frameworks
-   - Compliance and standards knowledge
-
-5. Certifications & Education:
-   - Full certification details with dates
-   - Relevance to target role
-   - Expiration/renewal status
-   - Associated skills coverage
-
-Present findings in a structured format with specific examples for each category."""
-
-input_prompt3 = """As a career development expert, analyze the gap between current profile and job requirements. Provide:
-
-1. Critical Skill Gaps:
-   - Identify missing must-have skills
-   - Current vs required proficiency levels
-   - Specific upskilling recommendations
-   - Estimated time to achieve competency
-
-2. Certification Strategy:
-   - Priority certifications needed
-   - Specific courses with links
-   - Cost and time investment
-   - Expected impact on candidacy
-
-3. Project Portfolio Enhancement:
-   - Specific project suggestions
-   - Technology stack recommendations
-   - Complexity level progression
-   - Portfolio presentation tips
-
-4. Professional Development Plan:
-   - 30/60/90 day learning roadmap
-   - Skill acquisition sequence
-   - Progress tracking metrics
-   - Resource recommendations
-
-Provide detailed, actionable steps with specific resources, timeframes, and expected outcomes."""
-
-input_prompt4 = """Perform a detailed ATS-optimized compatibility analysis:
-
-1. Quantitative Analysis (40%):
-   - Keyword match percentage
-   - Required skills coverage
-   - Experience duration match
-   - Education/certification alignment
-
-2. Qualitative Analysis (30%):
-   - Project relevance scoring
-   - Achievement impact assessment
-   - Leadership experience evaluation
-   - Problem-solving capability match
-
-3. Technical Proficiency (20%):
-   - Tool/technology expertise levels
-   - Programming language proficiency
-   - Framework/methodology alignment
-   - Technical problem-solving evidence
-
-4. Role-Specific Requirements (10%):
-   - Industry experience match
-   - Team size/structure alignment
-   - Budget/project scale experience
-   - Regulatory/compliance knowledge
-
-Calculate sub-scores for each category and provide a weighted total match percentage with detailed explanations."""
-
-input_prompt5 = """Conduct a comprehensive weakness analysis focusing on:
-
-1. Critical Gaps:
-   - Missing essential requirements
-   - Insufficient experience areas
-   - Technical skill deficiencies
-   - Project scale mismatches
-
-2. Presentation Issues:
-   - Impact quantification gaps
-   - Achievement documentation
-   - Technical depth demonstration
-   - Role progression clarity
-
-3. Modern Skill Gaps:
-   - Emerging technology exposure
-   - Industry trend alignment
-   - Methodology/framework currency
-   - Tool/platform proficiency
-
-4. Career Narrative:
-   - Role transition logic
-   - Responsibility progression
-   - Leadership development
-   - Industry focus clarity
-
-For each weakness, provide:
-- Specific evidence from resume
-- Impact on application
-- Detailed improvement strategy
-- Timeline for addressing"""
-
-input_prompt6 = """Perform an in-depth ATS optimization analysis:
-
-1. Keyword Analysis:
-   - Essential keyword coverage
-   - Keyword frequency and placement
-   - Industry-specific terminology
-   - Role-specific language match
-
-2. Format Optimization:
-   - Section structure analysis
-   - Heading standardization
-   - Bullet point formatting
-   - Font and spacing review
-
-3. Content Evaluation:
-   - Action verb usage
-   - Quantifiable achievements
-   - Technical terminology accuracy
-   - Role title alignment
-
-4. ATS Compatibility Score:
-   - Parsing accuracy prediction
-   - Keyword match percentage
-   - Format compliance score
-   - Overall ATS ranking potential
-
-Provide specific recommendations for each section with before/after examples."""
-
-input_prompt7 = """Create a highly targeted cover letter with:
-
-1. Opening Impact (25%):
-   - Company research integration
-   - Role-specific enthusiasm
-   - Cultural alignment indicators
-   - Unique value proposition
-
-2. Experience Alignment (35%):
-   - Key achievement highlights
-   - Relevant project spotlights
-   - Skill match emphasis
-   - Problem-solving examples
-
-3. Company Connection (25%):
-   - Industry knowledge display
-   - Company values alignment
-   - Growth potential emphasis
-   - Future contribution vision
-
-4. Professional Tone (15%):
-   - Confidence balance
-   - Enthusiasm demonstration
-   - Professional language
-   - Call to action
-
-Maintain perfect grammar and professional tone while showcasing genuine enthusiasm."""
-
-input_prompt8 = """Generate strategic deep-dive questions across these areas:
-
-1. Technical Depth:
-   - Project architecture decisions
-   - Technology selection rationale
-   - Problem-solving approaches
-   - Technical challenge resolution
-
-2. Impact Measurement:
-   - Project success metrics
-   - Team influence examples
-   - Business value delivery
-   - Innovation contributions
-
-3. Leadership & Collaboration:
-   - Team dynamics handling
-   - Stakeholder management
-   - Conflict resolution
-   - Mentorship experience
-
-4. Career Development:
-   - Role transition motivation
-   - Skill development strategy
-   - Industry focus selection
-   - Future career vision
-
-Each question should be designed to uncover specific, detailed examples that could strengthen the resume."""
-
-def get_gemini_response(input,pdf_content,prompt):
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content([
-            {"text": input},         
-            pdf_content,              
-            {"text": prompt}         
-        ])
-        return response.text
-    except Exception as e:
-        st.error(f"Error generating response: {str(e)}")
-        if "API_KEY" in str(e) or "credentials" in str(e).lower():
-            st.info("Please check your Google API key configuration.")
-        return "Error: Unable to generate response. Please check your API configuration."
-def input_pdf_convert(uploaded_file):
+# The Gemini client itself is only loaded by the first model call (see analysis.load_genai)
+configure_client(api_key=api_key)
+
+start_metrics_export()
+start_job_workers()
+# Start the render workers now, so they are ready by the time a resume is uploaded
+get_render_sandbox()
+
+def get_session_id():
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+def render_resume(pdf_bytes):
+    # Converted in a sandboxed worker process, so a malicious PDF cannot stall this server
+    return get_render_sandbox().render(
+        pdf_bytes, max_pages=PDF_MAX_PAGES, dpi=PDF_DPI, mode=PDF_MODE, image_options=PDF_IMAGE_OPTIONS
+    )
+
+def get_resume_render(uploaded_file):
+    """Return the cached render result: parts plus per-page mode and payload size."""
     if uploaded_file is not None:
         # Read PDF bytes
-        pdf_bytes = uploaded_file.read()
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        page = doc.load_page(0)  # first page
-        pix = page.get_pixmap()
-        image_bytes_arr = io.BytesIO(pix.tobytes("jpeg"))
-        image_bytes_arr = image_bytes_arr.getvalue()
-
-        pdf_parts = [
-            {
-                "mime_type": "image/jpeg",
-                "data": base64.b64encode(image_bytes_arr).decode()
-            }
-        ]
-        return pdf_parts
+        pdf_bytes = uploaded_file.getvalue()
+        rendered = []
+        def render(data):
+            rendered.append(True)
+            return render_resume(data)
+        started = time.perf_counter()
+        result = get_pdf_cache().get_or_render(pdf_bytes, PDF_RENDER_SETTINGS, render)
+        # Label by cache result so cheap reruns don't hide the real render time
+        observe_stage("render", time.perf_counter() - started, cache="miss" if rendered else "hit")
+        record_cache("pdf", not rendered)
+        if rendered:
+            for meta in result["pages"]:
+                if "encode_ms" in meta:
+                    observe_stage("page_encode", meta["encode_ms"] / 1000)
+        return result
     else:
         raise FileNotFoundError("No PDF file uploaded")
 
+def get_resume_text(uploaded_file):
+    pdf_bytes = uploaded_file.getvalue()
+    def extract(data):
+        return {"text": get_render_sandbox().extract_text(data, max_pages=PDF_MAX_PAGES)}
+    return get_pdf_cache().get_or_render(pdf_bytes, PDF_TEXT_SETTINGS, extract)["text"]
+
+def show_keyword_scores(scores):
+    """Show the local keyword scores above a Skills Match or ATS Score result."""
+    col_a, col_b, col_c, col_d = st.columns(4)
+    col_a.metric("🧮 Keyword Match", f"{scores['overall']}%")
+    col_b.metric("📋 Term Coverage", f"{scores['coverage']}%")
+    col_c.metric("📐 TF-IDF / BM25", f"{scores['tfidf']}% / {scores['bm25']}%")
+    col_d.metric("🗂️ Section Weighted", f"{scores['section_weighted']}%")
+    if scores["missing_terms"]:
+        st.caption("Missing keywords: " + ", ".join(scores["missing_terms"][:15]))
+
+def show_admin_metrics():
+    """Admin view of this server process: p50/p95 per stage and prompt, tokens, cost and cache hit rates."""
+    rows = METRICS.percentiles("resume_stage_seconds")
+    if not rows:
+        st.caption("No requests recorded yet in this server process.")
+        return
+    st.table([
+        {
+            "Stage": row["stage"] + (f" ({row['cache']})" if "cache" in row else ""),
+            "Prompt": row.get("prompt", "—"),
+            "Count": row["count"],
+            "p50 (ms)": round(row["p50"] * 1000, 1),
+            "p95 (ms)": round(row["p95"] * 1000, 1),
+        }
+        for row in rows
+    ])
+
+    usage = {}
+    for labels, value in METRICS.counters("resume_tokens_total").items():
+        labels = dict(labels)
+        usage.setdefault(labels["prompt"], {"Prompt": labels["prompt"], "Input tokens": 0, "Output tokens": 0, "Cost (USD)": 0.0})
+        usage[labels["prompt"]]["Input tokens" if labels["kind"] == "input" else "Output tokens"] += int(value)
+    for labels, value in METRICS.counters("resume_cost_usd_total").items():
+        prompt = dict(labels)["prompt"]
+        if prompt in usage:
+            usage[prompt]["Cost (USD)"] = round(usage[prompt]["Cost (USD)"] + value, 4)
+    if usage:
+        st.table(list(usage.values()))
+
+    lookups = {}
+    for labels, value in METRICS.counters("resume_cache_requests_total").items():
+        labels = dict(labels)
+        lookups.setdefault(labels["cache"], {"hit": 0, "miss": 0})[labels["result"]] += int(value)
+    if lookups:
+        st.caption(" · ".join(
+            f"{cache} cache: {counts['hit'] / (counts['hit'] + counts['miss']):.0%} hits of {counts['hit'] + counts['miss']}"
+            for cache, counts in lookups.items()
+        ))
+    saved = {}
+    for labels, value in METRICS.counters("resume_preflight_tokens_saved_total").items():
+        reason = dict(labels)["reason"]
+        saved[reason] = saved.get(reason, 0) + int(value)
+    if saved:
+        st.caption("Tokens saved by preflight: " + ", ".join(
+            f"{tokens:,} {REASON_LABELS[reason]}" for reason, tokens in saved.items()
+        ))
+    queued = get_admission_controller().stats()
+    if any(queued.values()):
+        st.caption("Waiting for quota: " + ", ".join(f"{count} {name}" for name, count in queued.items()))
+    jobs = get_job_store().stats()
+    if jobs:
+        st.caption("Jobs: " + ", ".join(f"{count} {status}" for status, count in jobs.items()))
+    if METRICS_PORT:
+        st.caption(f"Prometheus metrics: http://<host>:{METRICS_PORT}/metrics")
+
+def near_duplicate_similarity(render):
+    """Similarity to an earlier resume this one nearly duplicates, or None."""
+    index = get_response_cache().near_duplicates
+    text = parts_text(render["parts"]) if index is not None else None
+    signature = minhash(text) if text else None
+    if signature is None:
+        return None
+    match = index.lookup("resume", fingerprint_parts(render["parts"]), signature)
+    return match[1] if match else None
+
+def local_skills(uploaded_file, show=False):
+    """Skills found by the local taxonomy matcher, as extra parts for the AI; `show` lists them on the page."""
+    matches = get_skill_matcher().find(get_resume_text(uploaded_file))
+    if not matches:
+        if show:
+            st.caption("🔍 No taxonomy skills found in the resume text; the AI will extract them from the page.")
+        return []
+    if show:
+        for category, skills in group_by_category(matches).items():
+            st.caption(f"**{category}:** " + ", ".join(skills))
+    return [{"text": format_skills_for_prompt(matches)}]
+
+def local_keyword_scores(uploaded_file, job_description, show=False):
+    """Local keyword scores, as extra parts for the AI; `show` displays them on the page."""
+    resume_text = get_resume_text(uploaded_file)
+    if len(resume_text.strip()) < 50:
+        if show:
+            st.caption("🧮 Keyword scores need a resume with selectable text; this one looks scanned.")
+        return []
+    # Imported here: NumPy is only needed once a resume is scored
+    from keyword_score import format_scores_for_prompt, score_resume
+    scores = score_resume(resume_text, job_description)
+    if show:
+        show_keyword_scores(scores)
+    return [{"text": format_scores_for_prompt(scores)}]
+
+def local_grounding(name, uploaded_file, job_description, show=False):
+    """Extra parts that ground one analysis in the local skill and keyword results."""
+    if name == "input_prompt2":
+        return local_skills(uploaded_file, show)
+    if name in ("input_prompt4", "input_prompt6"):
+        return local_keyword_scores(uploaded_file, job_description, show)
+    return []
+
+def show_error(error):
+    st.error(f"Error generating response: {error}")
+    if "API_KEY" in error or "credentials" in error.lower():
+        st.info("Please check your Google API key configuration.")
+
+def show_scores(scores):
+    """Weighted total and sub-scores of a scoring analysis, as a row of metrics."""
+    cols = st.columns(len(scores["scores"]) + 1)
+    cols[0].metric("Weighted total", f"{scores['total']:.0f}%")
+    for col, (key, value) in zip(cols[1:], scores["scores"].items()):
+        col.metric(score_label(key), f"{value:.0f}")
+
+def submit_analyses(names, job_description, uploaded_file, refresh=False, combined=False, ground=False, requisition=""):
+    """Queue the analyses as a background job and show it; an identical queued or successfully finished job is reused."""
+    extra = {}
+    if ground and not combined:
+        extra = {name: local_grounding(name, uploaded_file, job_description) for name in names}
+        extra = {name: parts for name, parts in extra.items() if parts}
+    job_id, created = submit_job(
+        get_job_store(), job_description, get_resume_render(uploaded_file), names, extra,
+        combined=combined, refresh=refresh, session=get_session_id(), candidate=uploaded_file.name,
+        requisition=requisition.strip() or None,
+    )
+    if not created:
+        st.toast("♻️ This analysis is already queued or done; showing it.")
+    # Kept in the URL too, so a page refresh or a shared link finds the same job
+    st.session_state["job_id"] = job_id
+    st.query_params["job"] = job_id
+
+def notify_retry(retry):
+    st.toast(f"⏳ The AI service is busy, retrying in {retry['seconds']:.0f}s (attempt {retry['attempt']})...")
+
+def show_job(job_id, uploaded_file, job_description):
+    """
+    Show a job's results, polling the queue until it finishes.
+
+    The job runs on a background worker, so a rerun (any widget change) only
+    stops this polling; the next run picks the same job up where it is.
+    """
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        st.warning("These results have expired. Run the analysis again.")
+        st.session_state.pop("job_id", None)
+        st.query_params.pop("job", None)
+        return
+    names = job["request"]["analyses"]
+    single = len(names) == 1
+    placeholders = {}
+    for name in names:
+        icon, title, busy = RESULT_HEADERS[name] if single else (CARD_ICONS[name], CARD_TITLES[name], None)
+        st.markdown(f"""
+        <div class="result-container">
+            <div class="result-header">
+                <span class="result-icon">{icon}</span>
+                <span class="result-title">{title}</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+        if single and uploaded_file is not None and job_description.strip():
+            local_grounding(name, uploaded_file, job_description, show=True)
+        placeholders[name] = st.empty()
+        if not single:
+            placeholders[name].info("⏳ Waiting for results...")
+
+    status = st.empty()
+    shown = {}
+    notified = None
+    while job is not None and job["status"] in (QUEUED, RUNNING):
+        waiting = job["waiting"]
+        if job["status"] == QUEUED:
+            status.info(f"🕒 The AI is busy with other requests. You are #{store.position(job_id)} in line...")
+        elif waiting.get("position"):
+            # Running, but its model calls are waiting for quota behind other sessions
+            status.info(f"🕒 The AI is busy with other requests. You are #{waiting['position']} in line...")
+        elif single:
+            status.info(busy)
+        elif job["request"]["combined"]:
+            status.info("⚡ Running all analyses in one request...")
+        else:
+            status.info("🚀 Running all analyses...")
+        retry = waiting.get("retry")
+        if retry and retry != notified and retry["until"] > time.time():
+            notify_retry(retry)
+            notified = retry
+        for name, text in (job["partial"] or {}).items():
+            if text and shown.get(name) != text:
+                placeholders[name].write(strip_scores(text))
+                shown[name] = text
+        time.sleep(0.5)
+        job = store.get(job_id)
+    status.empty()
+
+    if job is None:
+        st.warning("These results have expired. Run the analysis again.")
+        return
+    if job["status"] == FAILED:
+        show_error(job["error"])
+        return
+    for name, placeholder in placeholders.items():
+        entry = job["result"]["results"][name]
+        if entry["error"] is None:
+            with placeholder.container():
+                if entry.get("scores"):
+                    show_scores(entry["scores"])
+                st.write(strip_scores(entry["response"]))
+        elif job["request"]["combined"] and entry["error"].startswith("missing"):
+            placeholder.warning("This section was missing from the combined response. Try running it on its own.")
+        else:
+            with placeholder.container():
+                show_error(entry["error"])
+
 
 #streamlit app
 st.set_page_config(
@@ -315,217 +320,10 @@ st.set_page_config(
 )
 
 # Modern CSS styling inspired by professional resume checkers
-st.markdown("""
-<style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Global Styles */
-    .main {
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Header Styles */
-    .hero-section {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 3rem 2rem;
-        border-radius: 20px;
-        text-align: center;
-        color: white;
-        margin-bottom: 3rem;
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-    }
-    
-    .hero-title {
-        font-size: 3.5rem;
-        font-weight: 700;
-        margin-bottom: 1rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    .hero-subtitle {
-        font-size: 1.3rem;
-        font-weight: 300;
-        opacity: 0.95;
-        margin-bottom: 2rem;
-    }
-    
-    .hero-stats {
-        display: flex;
-        justify-content: center;
-        gap: 3rem;
-        margin-top: 2rem;
-    }
-    
-    .stat-item {
-        text-align: center;
-    }
-    
-    .stat-number {
-        font-size: 2.5rem;
-        font-weight: 700;
-        display: block;
-    }
-    
-    .stat-label {
-        font-size: 0.9rem;
-        opacity: 0.8;
-    }
-    
-    /* Card Styles */
-    .upload-card {
-        background: white;
-        border-radius: 15px;
-        padding: 2rem;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-        border: 1px solid #f0f0f0;
-        margin-bottom: 2rem;
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .upload-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 12px 35px rgba(0,0,0,0.15);
-    }
-    
-    .card-title {
-        font-size: 1.4rem;
-        font-weight: 600;
-        color: #333;
-        margin-bottom: 0.5rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .card-subtitle {
-        color: #666;
-        font-size: 0.95rem;
-        margin-bottom: 1.5rem;
-    }
-    
-    /* Analysis Button Styles */
-    .stButton > button {
-        width: 100% !important;
-        padding: 1rem !important;
-        border-radius: 12px !important;
-        border: 1px solid #e5e7eb !important;
-        background: white !important;
-        color: #333 !important;
-        font-weight: 500 !important;
-        font-size: 1rem !important;
-        transition: all 0.3s ease !important;
-        margin: 0.5rem 0 !important;
-        display: flex !important;
-        align-items: center !important;
-        justify-content: flex-start !important;
-        gap: 1rem !important;
-        text-align: left !important;
-    }
-
-    .stButton > button:hover {
-        border-color: #667eea !important;
-        box-shadow: 0 4px 20px rgba(102, 126, 234, 0.1) !important;
-        transform: translateY(-2px) !important;
-    }
-
-    .stButton > button:disabled {
-        opacity: 0.5 !important;
-        cursor: not-allowed !important;
-        background: #f8fafc !important;
-        transform: none !important;
-        box-shadow: none !important;
-    }
-
-    /* Status Messages */
-    .status-card {
-        background: #f8fafc;
-        border: 1px solid #e2e8f0;
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        text-align: center;
-    }
-    
-    .status-ready {
-        background: #ecfdf5;
-        border-color: #10b981;
-        color: #065f46;
-    }
-    
-    .status-warning {
-        background: #fffbeb;
-        border-color: #f59e0b;
-        color: #92400e;
-    }
-    
-    /* Results Section */
-    .result-container {
-        background: white;
-        border-radius: 15px;
-        padding: 2rem;
-        margin: 2rem 0;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.08);
-        border-left: 4px solid #667eea;
-    }
-    
-    .result-header {
-        display: flex;
-        align-items: center;
-        gap: 1rem;
-        margin-bottom: 1.5rem;
-        padding-bottom: 1rem;
-        border-bottom: 1px solid #e5e7eb;
-    }
-    
-    .result-icon {
-        font-size: 2rem;
-    }
-    
-    .result-title {
-        font-size: 1.5rem;
-        font-weight: 600;
-        color: #333;
-    }
-    
-    /* Footer */
-    .footer {
-        text-align: center;
-        padding: 3rem 2rem;
-        background: #f8fafc;
-        border-radius: 15px;
-        margin-top: 4rem;
-        color: #666;
-    }
-    
-    /* Hide Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_asset("styles.css"), unsafe_allow_html=True)
 
 # Hero Section
-st.markdown("""
-<div class="hero-section">
-    <h1 class="hero-title">🎯 ResumeCheck Pro</h1>
-    <p class="hero-subtitle">AI-powered resume analysis that gets you hired faster</p>
-    <div class="hero-stats">
-        <div class="stat-item">
-            <span class="stat-number">98%</span>
-            <span class="stat-label">Accuracy Rate</span>
-        </div>
-        <div class="stat-item">
-            <span class="stat-number">8+</span>
-            <span class="stat-label">Analysis Types</span>
-        </div>
-        <div class="stat-item">
-            <span class="stat-number">30s</span>
-            <span class="stat-label">Average Time</span>
-        </div>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(load_asset("hero.html"), unsafe_allow_html=True)
 
 # Main Input Section
 st.markdown("## 🚀 Get Started")
@@ -547,6 +345,15 @@ with col1:
         help="Our AI analyzes job requirements to provide targeted recommendations",
         label_visibility="collapsed"
     )
+    if JD_COMPRESSION and input_text.strip():
+        preflight_report = compress_job_description(input_text)
+        if preflight_report["removed"]:
+            st.caption(
+                f"✂️ Sent to AI: about {preflight_report['tokens_after']:,} of {preflight_report['tokens_before']:,} tokens per analysis"
+                " · skipped " + ", ".join(
+                    f"{REASON_LABELS[reason]} (~{tokens:,})" for reason, tokens in preflight_report["removed"].items()
+                )
+            )
 
 with col2:
     st.markdown("""
@@ -579,6 +386,36 @@ with col2:
             st.metric("📄 File Name", uploaded_file.name)
         with col_b:
             st.metric("📊 File Size", f"{uploaded_file.size:,} bytes")
+
+        try:
+            render = get_resume_render(uploaded_file)
+        except PdfRejected as e:
+            render = None
+            st.error(f"❌ This PDF can't be processed: {e}. Please upload a different file.")
+            # The rest of the page then treats the upload as missing
+            uploaded_file = None
+        except SandboxUnavailable:
+            render = None
+            st.error("❌ The PDF converter could not be started, so this resume can't be read right now. Please try again in a moment.")
+            uploaded_file = None
+        if render is not None:
+            render_pages = render["pages"]
+            st.caption(
+                "🧾 Sent to AI: "
+                + ", ".join(f"page {meta['page'] + 1} as {meta.get('format', meta['mode'])}" for meta in render_pages)
+                + f" · {sum(meta['bytes'] for meta in render_pages):,} bytes"
+            )
+            if render.get("sections"):
+                st.caption(
+                    "🗂️ Sections found: " + ", ".join(SECTION_TITLES[section] for section in dict.fromkeys(render["sections"]))
+                    + (" · each analysis gets only the sections it reads" if SECTION_PRUNING else "")
+                )
+            duplicate_similarity = near_duplicate_similarity(render)
+            if duplicate_similarity:
+                st.info(
+                    f"♻️ This resume is {duplicate_similarity:.0%} the same as one analyzed before"
+                    + ("; its cached analyses are reused (tick 🔄 Force fresh analysis to run them again)." if NEAR_DUPLICATES == "reuse" else ".")
+                )
     else:
         st.markdown("""
         <div style="background: #f8fafc; border: 2px dashed #cbd5e1; border-radius: 12px; padding: 2rem; text-align: center; margin: 1rem 0;">
@@ -624,19 +461,25 @@ else:
 # Analysis tools grid
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Card definitions
-cards = [
-    ("btn1", "📊", "Resume Analysis", "Comprehensive evaluation of your resume against job requirements"),
-    ("btn2", "🔍", "Skills Extraction", "Extract and categorize all skills from your resume"),
-    ("btn3", "📈", "Skill Improvement", "Get personalized recommendations to enhance your skills"),
-    ("btn4", "🎯", "Skills Match", "Calculate compatibility percentage with job requirements"),
-    ("btn5", "⚠️", "Weakness Analysis", "Identify gaps and areas for improvement"),
-    ("btn6", "🤖", "ATS Score", "Check compatibility with Applicant Tracking Systems"),
-    ("btn7", "📝", "Cover Letter", "Generate a tailored cover letter for this position"),
-    ("btn8", "❓", "Strategic Questions", "Get improvement-focused questions about your resume"),
-]
+force_refresh = st.checkbox(
+    "🔄 Force fresh analysis",
+    help="Skip saved results and ask the AI again for this resume and job description"
+)
+ground_with_scores = st.checkbox(
+    "🧮 Ground AI with local analysis",
+    value=True,
+    help="Skills Extraction sends the skills found locally, and Skills Match and ATS Score send the locally computed keyword scores, so the AI builds on them instead of estimating its own"
+)
+single_request = st.checkbox(
+    "⚡ Single request mode",
+    help="Run All Analyses sends your resume and job description once and gets every result back in one response"
+)
+requisition = st.text_input(
+    "🏷️ Requisition ID (optional)",
+    help="Saved scores are grouped by job opening for later ranking; without an ID, each job description gets its own"
+)
 
-rows = [cards[:4], cards[4:]]
+rows = [CARDS[:4], CARDS[4:]]
 
 # Initialize all submit flags
 submit1 = submit2 = submit3 = submit4 = submit5 = submit6 = submit7 = submit8 = False
@@ -664,135 +507,31 @@ for row in rows:
                 elif card_id == "btn7": submit7 = True
                 elif card_id == "btn8": submit8 = True
 
-# Handle the button submissions
+run_all = st.button(
+    "🚀  Run All Analyses",
+    key="btn_all",
+    disabled=button_disabled,
+    help="Run all eight analyses at once and show each result as soon as it is ready",
+    use_container_width=True,
+    type="primary"
+)
+
+# Handle the button submissions: each queues a background job
 if uploaded_file is not None and input_text.strip():
-    pdf_content = input_pdf_convert(uploaded_file)
-    
-    if submit1:
-        with st.spinner("📊 Analyzing your resume..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt1)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">📊</span>
-                    <span class="result-title">Resume Analysis Results</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-    
-    elif submit2:
-        with st.spinner("🔍 Extracting skills..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt2)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">🔍</span>
-                    <span class="result-title">Skills Extraction Results</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-            
-    elif submit3:
-        with st.spinner("📈 Improving your skills..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt3)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">📈</span>
-                    <span class="result-title">Skill Improvement Plan</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-            
-    elif submit4:
-        with st.spinner("🎯 Calculating skills compatibility..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt4)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">🎯</span>
-                    <span class="result-title">Skills Match Analysis</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-            
-    elif submit5:
-        with st.spinner("⚠️ Analyzing potential weaknesses..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt5)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">⚠️</span>
-                    <span class="result-title">Weakness Analysis</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-
-    elif submit6:
-        with st.spinner("🤖 Calculating ATS score..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt6)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">🤖</span>
-                    <span class="result-title">ATS Compatibility Score</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-
-    elif submit7:
-        with st.spinner("📝 Generating cover letter..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt7)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">📝</span>
-                    <span class="result-title">Tailored Cover Letter</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
-
-    elif submit8:
-        with st.spinner("❓ Generating strategic improvement questions..."):
-            response = get_gemini_response(input_text, pdf_content[0], input_prompt8)
-            st.markdown("""
-            <div class="result-container">
-                <div class="result-header">
-                    <span class="result-icon">❓</span>
-                    <span class="result-title">Strategic Improvement Questions</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.write(response)
+    clicked = [name for name, submitted in zip(PROMPTS, (submit1, submit2, submit3, submit4, submit5, submit6, submit7, submit8)) if submitted]
+    if run_all:
+        submit_analyses(list(PROMPTS), input_text, uploaded_file, force_refresh, combined=single_request, requisition=requisition)
+    elif clicked:
+        submit_analyses(clicked, input_text, uploaded_file, force_refresh, ground=ground_with_scores, requisition=requisition)
+
+# Show the current job, including one started before a rerun or page refresh
+job_id = st.query_params.get("job") or st.session_state.get("job_id")
+if job_id:
+    show_job(job_id, uploaded_file, input_text)
+
+if ADMIN_PANEL:
+    with st.expander("📈 Admin: Performance Metrics"):
+        show_admin_metrics()
 
 # Enhanced Footer
-st.markdown("""
-<div class="footer">
-    <h3 style="color: #333; margin-bottom: 1rem;">🎯 ResumeCheck Pro</h3>
-    <p style="margin-bottom: 1.5rem;">Powered by Google Gemini AI | Built with ❤️ using Streamlit</p>
-    <div style="display: flex; justify-content: center; gap: 2rem; margin-bottom: 1rem;">
-        <div style="text-align: center;">
-            <div style="font-weight: 600; color: #667eea;">Fast</div>
-            <div style="font-size: 0.9rem;">30-second analysis</div>
-        </div>
-        <div style="text-align: center;">
-            <div style="font-weight: 600; color: #667eea;">Accurate</div>
-            <div style="font-size: 0.9rem;">AI-powered insights</div>
-        </div>
-        <div style="text-align: center;">
-            <div style="font-weight: 600; color: #667eea;">Professional</div>
-            <div style="font-size: 0.9rem;">Industry-standard analysis</div>
-        </div>
-    </div>
-    <div style="font-size: 0.85rem; color: #888;">
-        💡 <strong>Pro Tip:</strong> For best results, ensure your resume is well-formatted and the job description is complete.
-    </div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(load_asset("footer.html"), unsafe_allow_html=True)
@@ -0,0 +1,131 @@
+"""Process-wide resources and static page content for the Streamlit app.
+
+Streamlit re-executes app.py on every interaction, so anything defined in
+the script itself is rebuilt each time, including the @st.cache_resource
+wrappers, whose cache key is computed from their source code. Defining them
+in this module means they are built once, when it is first imported, and
+each rerun only looks them up.
+"""
+
+import logging
+import os
+import threading
+
+import streamlit as st
+
+from analysis import get_model, start_event_loop
+from job_worker import JobWorkers
+from metrics import enable_json_logs, start_metrics_server
+from prompts import PROMPTS
+from settings import (
+    JOB_WORKERS, METRICS_LOG, METRICS_PORT, MODEL_NAME,
+    make_admission_controller, make_job_store, make_pdf_cache, make_render_sandbox, make_response_cache, make_results_store,
+)
+from skill_matcher import get_default_matcher
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+logger = logging.getLogger("resume_analyzer.app")
+
+# Analysis tool cards, in prompts.PROMPTS order: (button key, icon, title, help text)
+CARDS = [
+    ("btn1", "📊", "Resume Analysis", "Comprehensive evaluation of your resume against job requirements"),
+    ("btn2", "🔍", "Skills Extraction", "Extract and categorize all skills from your resume"),
+    ("btn3", "📈", "Skill Improvement", "Get personalized recommendations to enhance your skills"),
+    ("btn4", "🎯", "Skills Match", "Calculate compatibility percentage with job requirements"),
+    ("btn5", "⚠️", "Weakness Analysis", "Identify gaps and areas for improvement"),
+    ("btn6", "🤖", "ATS Score", "Check compatibility with Applicant Tracking Systems"),
+    ("btn7", "📝", "Cover Letter", "Generate a tailored cover letter for this position"),
+    ("btn8", "❓", "Strategic Questions", "Get improvement-focused questions about your resume"),
+]
+CARD_ICONS = {name: icon for (card_id, icon, title, desc), name in zip(CARDS, PROMPTS)}
+CARD_TITLES = {name: title for (card_id, icon, title, desc), name in zip(CARDS, PROMPTS)}
+
+# Header and progress message when a single analysis is shown
+RESULT_HEADERS = {
+    "input_prompt1": ("📊", "Resume Analysis Results", "📊 Analyzing your resume..."),
+    "input_prompt2": ("🔍", "Skills Extraction Results", "🔍 Extracting skills..."),
+    "input_prompt3": ("📈", "Skill Improvement Plan", "📈 Improving your skills..."),
+    "input_prompt4": ("🎯", "Skills Match Analysis", "🎯 Calculating skills compatibility..."),
+    "input_prompt5": ("⚠️", "Weakness Analysis", "⚠️ Analyzing potential weaknesses..."),
+    "input_prompt6": ("🤖", "ATS Compatibility Score", "🤖 Calculating ATS score..."),
+    "input_prompt7": ("📝", "Tailored Cover Letter", "📝 Generating cover letter..."),
+    "input_prompt8": ("❓", "Strategic Improvement Questions", "❓ Generating strategic improvement questions..."),
+}
+
+
+@st.cache_resource
+def load_asset(name):
+    """Contents of a file in assets/; .css files come wrapped in a <style> tag, ready for st.markdown."""
+    with open(os.path.join(ASSETS_DIR, name), encoding="utf-8") as f:
+        content = f.read()
+    if name.endswith(".css"):
+        return f"<style>\n{content}</style>"
+    return content
+
+
+@st.cache_resource
+def start_metrics_export():
+    """Turn on JSON metric logs and the /metrics endpoint once per server process, if configured."""
+    if METRICS_LOG:
+        enable_json_logs()
+    if METRICS_PORT:
+        try:
+            return start_metrics_server(METRICS_PORT)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", METRICS_PORT, e)
+    return None
+
+
+@st.cache_resource
+def get_pdf_cache():
+    return make_pdf_cache()
+
+
+@st.cache_resource
+def get_render_sandbox():
+    return make_render_sandbox()
+
+
+@st.cache_resource
+def get_response_cache():
+    return make_response_cache()
+
+
+@st.cache_resource
+def get_event_loop():
+    return start_event_loop()
+
+
+@st.cache_resource
+def get_admission_controller():
+    return make_admission_controller()
+
+
+@st.cache_resource
+def get_job_store():
+    return make_job_store()
+
+
+@st.cache_resource
+def get_results_store():
+    return make_results_store()
+
+
+@st.cache_resource
+def start_job_workers():
+    """Drain the job queue on background threads once per server process, unless separate workers do it."""
+    if not JOB_WORKERS:
+        return None
+    # Load the Gemini client off the script thread, so neither the page nor the first analysis waits for the import
+    threading.Thread(target=get_model, args=(MODEL_NAME,), name="gemini-warmup", daemon=True).start()
+    # The workers share the app's event loop, which the async Gemini client is bound to
+    return JobWorkers(
+        get_job_store(), get_event_loop(), get_response_cache(), get_admission_controller(), threads=JOB_WORKERS,
+        results_store=get_results_store(),
+    ).start()
+
+
+@st.cache_resource
+def get_skill_matcher():
+    return get_default_matcher()
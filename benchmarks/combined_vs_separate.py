@@ -0,0 +1,76 @@
+"""Compare single-request (combined) analysis against one request per prompt.
+
+Measures input tokens with the model's count_tokens endpoint and wall-clock
+latency of both paths against the real Gemini API, then prints one JSON
+object. Responses are never served from the cache here.
+
+Usage:
+    python benchmarks/combined_vs_separate.py resume.pdf job_description.txt --analyses 1,4,6
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+
+from analysis import build_combined_prompt, build_contents, generate_analyses_concurrently, generate_combined_analysis
+from bulk_screen import parse_analyses
+from pdf_render import render_pdf
+from prompts import PROMPTS
+from settings import MODEL_NAME, PDF_DPI, PDF_IMAGE_OPTIONS, PDF_MAX_PAGES, PDF_MODE
+
+
+def count_input_tokens(model, job_description, parts, prompt):
+    return model.count_tokens(build_contents(job_description, parts, prompt)).total_tokens
+
+
+async def run_separate(job_description, parts, prompts):
+    failures = 0
+    async for _, _, finished, error in generate_analyses_concurrently(job_description, parts, prompts):
+        if finished and error is not None:
+            failures += 1
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("resume", help="PDF resume")
+    parser.add_argument("job_description", help="Text file with the job description")
+    parser.add_argument("-a", "--analyses", type=parse_analyses, default=parse_analyses("all"))
+    args = parser.parse_args(argv)
+
+    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+    with open(args.resume, "rb") as f:
+        parts = render_pdf(f.read(), max_pages=PDF_MAX_PAGES, dpi=PDF_DPI, mode=PDF_MODE, image_options=PDF_IMAGE_OPTIONS)["parts"]
+    with open(args.job_description, encoding="utf-8") as f:
+        job_description = f.read()
+    prompts = {name: PROMPTS[name] for name in args.analyses}
+    model = genai.GenerativeModel(MODEL_NAME)
+
+    separate_tokens = sum(count_input_tokens(model, job_description, parts, prompt) for prompt in prompts.values())
+    started = time.perf_counter()
+    separate_failures = asyncio.run(run_separate(job_description, parts, prompts))
+    separate_seconds = time.perf_counter() - started
+
+    combined_tokens = count_input_tokens(model, job_description, parts, build_combined_prompt(prompts))
+    started = time.perf_counter()
+    sections = generate_combined_analysis(job_description, parts, prompts)
+    combined_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "model": MODEL_NAME,
+        "analyses": list(prompts),
+        "separate": {"input_tokens": separate_tokens, "seconds": round(separate_seconds, 3), "failures": separate_failures},
+        "combined": {"input_tokens": combined_tokens, "seconds": round(combined_seconds, 3), "missing_sections": len(prompts) - len(sections)},
+        "input_token_savings": round(1 - combined_tokens / separate_tokens, 3) if separate_tokens else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
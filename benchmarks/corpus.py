@@ -0,0 +1,82 @@
+"""Generate a synthetic resume corpus for offline benchmarks.
+
+Resumes vary in page count and text density, and come in two kinds:
+"text" PDFs with a real text layer (the common, digitally generated case)
+and "scanned" PDFs whose pages are a single embedded image.
+"""
+
+import os
+import random
+
+import fitz
+
+SKILLS = (
+    "Python", "Java", "TypeScript", "React", "Node.js", "AWS", "Kubernetes", "Docker", "Terraform",
+    "PostgreSQL", "Redis", "Kafka", "Spark", "PyTorch", "TensorFlow", "CI/CD", "GraphQL", "Go",
+)
+SECTIONS = ("Summary", "Experience", "Projects", "Skills", "Education", "Certifications")
+
+JOB_DESCRIPTION = """Senior Backend Engineer
+
+We are looking for a backend engineer with 5+ years of Python experience building
+distributed systems on AWS. You will design REST and GraphQL APIs, run services on
+Kubernetes and Docker, and own CI/CD pipelines.
+
+Requirements:
+- Python, PostgreSQL, Redis and Kafka in production
+- Infrastructure as code with Terraform
+- Experience mentoring engineers and leading projects
+
+We are an equal opportunity employer. Benefits include health insurance and a 401(k).
+"""
+
+
+def resume_lines(rng, lines_per_page):
+    lines = []
+    for section in SECTIONS:
+        lines.append(section)
+        for _ in range(max(lines_per_page // len(SECTIONS), 2)):
+            picked = ", ".join(rng.sample(SKILLS, 3))
+            lines.append(f"- Delivered {rng.randint(2, 40)}% improvements using {picked} across {rng.randint(2, 9)} teams.")
+    return lines
+
+
+def make_resume(path, pages, lines_per_page=45, scanned=False, seed=0):
+    """Write one synthetic resume PDF and return its path."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        text = "\n".join(resume_lines(rng, lines_per_page)[:lines_per_page])
+        page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50), text, fontsize=8)
+    if scanned:
+        # Re-create every page as a flat image so there is no text layer left. Scanners
+        # store JPEG; an uncompressed pixmap would put a 3-page scan over the upload size cap.
+        scan = fitz.open()
+        for page in doc:
+            pix = page.get_pixmap(dpi=150)
+            new_page = scan.new_page(width=page.rect.width, height=page.rect.height)
+            new_page.insert_image(new_page.rect, stream=pix.tobytes("jpeg", jpg_quality=80))
+        doc = scan
+    doc.save(path)
+    return path
+
+
+def build_corpus(directory, count=24, max_pages=3, scanned_ratio=0.25, seed=0):
+    """
+    Fill `directory` with `count` resumes of 1..max_pages pages.
+
+    Returns:
+        list: Paths of the generated PDFs
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        pages = 1 + i % max_pages
+        density = rng.choice((25, 45, 70))
+        scanned = rng.random() < scanned_ratio
+        kind = "scanned" if scanned else "text"
+        path = os.path.join(directory, f"resume_{i:03d}_{pages}p_{kind}.pdf")
+        paths.append(make_resume(path, pages, density, scanned, seed=seed + i))
+    return paths
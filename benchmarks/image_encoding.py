@@ -0,0 +1,76 @@
+"""Measure bytes per page and encode time for resume page images.
+
+Compares the original encoding (default-quality RGB JPEG, base64 encoded)
+against a grid of format, quality, grayscale and DPI settings, plus the
+configured default options, on every page of the given PDFs. Prints one
+JSON object with per-setting averages. No network access is needed.
+
+Usage:
+    python benchmarks/image_encoding.py resume1.pdf resume2.pdf
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+from pdf_render import DEFAULT_DPI, DEFAULT_IMAGE_OPTIONS, rasterize_page
+
+GRID = [
+    {"format": "jpeg", "quality": 75, "grayscale": False},
+    {"format": "jpeg", "quality": 75, "grayscale": True},
+    {"format": "jpeg", "quality": 60, "grayscale": True},
+    {"format": "webp", "quality": 75, "grayscale": True},
+    {"format": "webp", "quality": 60, "grayscale": True},
+    {"format": "png", "quality": 0, "grayscale": True},
+    {"format": "auto", "quality": 75, "grayscale": True, "target_bytes": 60 * 1024},
+]
+
+
+def legacy_encode(page):
+    # The pre-optimization pipeline: JPEG bytes -> BytesIO copy -> base64 string
+    pix = page.get_pixmap()
+    return base64.b64encode(pix.tobytes("jpeg")).decode()
+
+
+def measure(pages, encode):
+    sizes, times = [], []
+    for page in pages:
+        started = time.perf_counter()
+        size = encode(page)
+        times.append((time.perf_counter() - started) * 1000)
+        sizes.append(size)
+    return {
+        "avg_bytes_per_page": round(sum(sizes) / len(sizes)),
+        "avg_encode_ms": round(sum(times) / len(times), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[DEFAULT_DPI, 100, 150])
+    args = parser.parse_args(argv)
+
+    docs = [fitz.open(path) for path in args.pdfs]
+    pages = [doc.load_page(n) for doc in docs for n in range(doc.page_count)]
+
+    results = {"pages": len(pages), "legacy": measure(pages, lambda page: len(legacy_encode(page)))}
+    results["settings"] = []
+    for dpi in args.dpi:
+        for overrides in GRID + [{"label": "configured defaults"}]:
+            options = {**DEFAULT_IMAGE_OPTIONS, **overrides}
+            options.pop("label", None)
+            stats = measure(pages, lambda page: len(rasterize_page(page, dpi, options)[0]))
+            results["settings"].append({"dpi": dpi, **overrides, **stats})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""Offline benchmark suite for the resume analysis pipeline.
+
+Runs against a generated PDF corpus (see corpus.py) and the stub model (see
+stub_model.py), so it needs neither network access nor an API key. It
+reports:
+
+- per-stage latency: fitz.open, text extraction, rasterize, encode,
+  section segmentation, full conversion, job description preflight (and
+  the tokens it and section pruning save), request build, response handling, the (stubbed) model call, and the Streamlit
+  app's cold start and no-op rerun
+- throughput of the concurrent "Run All Analyses" path, the single-request
+  combined path and the bulk-screening CLI
+- results store appends, compaction and a top-50 query over synthetic rows
+- vectorizing and matching a synthetic resume pool against many roles
+
+Results are a single JSON document (stdout or --output) so runs can be
+diffed or tracked over time. Caches live in a throwaway directory, so every
+run is cold.
+
+Usage:
+    python benchmarks/run_suite.py --output bench_results.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+# Must happen before settings is imported anywhere
+WORK_DIR = tempfile.mkdtemp(prefix="resume-bench-")
+os.environ["RESUME_CACHE_DIR"] = os.path.join(WORK_DIR, "cache")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+# The stub has no quota; measure the pipeline, not the admission limits, unless asked to
+os.environ.setdefault("GEMINI_RPM_LIMIT", "0")
+os.environ.setdefault("GEMINI_TPM_LIMIT", "0")
+
+import fitz
+
+import stub_model
+from analysis import (
+    build_contents, generate_analysis, generate_combined_analysis, get_cache_key,
+    iter_analyses_concurrently, start_event_loop, stream_analysis,
+)
+from bulk_screen import screen
+from corpus import JOB_DESCRIPTION, SKILLS, build_corpus
+from pdf_render import AUTO_FORMATS, encode_pixmap, render_pdf
+from preflight import compress_job_description
+from prompts import PROMPT_SECTIONS, PROMPTS, input_prompt1
+from resume_sections import prune_sections, segment_pdf
+from scheduler import estimate_tokens
+from match_matrix import HashedDocs, hash_terms, match
+from resume_index import INDEX_BATCH_SIZE, ResumeIndex
+from render_sandbox import PdfRejected
+from results_store import ResultsStore
+from settings import MODEL_NAME, PDF_DPI, PDF_IMAGE_OPTIONS, PDF_MAX_PAGES, PDF_MODE, make_render_sandbox
+
+
+def summarize(samples, unit="ms"):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        f"mean_{unit}": round(statistics.fmean(ordered), 3),
+        f"p50_{unit}": round(ordered[len(ordered) // 2], 3),
+        f"p95_{unit}": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+def time_ms(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def convert(pdf_bytes):
+    return render_pdf(
+        pdf_bytes, max_pages=PDF_MAX_PAGES, dpi=PDF_DPI, mode=PDF_MODE, image_options=PDF_IMAGE_OPTIONS
+    )
+
+
+def bench_stages(pdfs, stub):
+    stages = {name: [] for name in (
+        "fitz_open", "text_extract", "rasterize", "encode", "segment", "convert", "sandbox_convert", "preflight", "request_build",
+        "response_handling",
+    )}
+    colorspace = fitz.csGRAY if PDF_IMAGE_OPTIONS["grayscale"] else fitz.csRGB
+    formats = AUTO_FORMATS if PDF_IMAGE_OPTIONS["format"] == "auto" else (PDF_IMAGE_OPTIONS["format"],)
+
+    converted = []
+    for pdf_bytes in pdfs:
+        elapsed, doc = time_ms(fitz.open, stream=pdf_bytes, filetype="pdf")
+        stages["fitz_open"].append(elapsed)
+        for page in doc:
+            stages["text_extract"].append(time_ms(page.get_text, "text", sort=True)[0])
+            elapsed, pix = time_ms(page.get_pixmap, dpi=PDF_DPI, colorspace=colorspace, alpha=False)
+            stages["rasterize"].append(elapsed)
+            for image_format in formats:
+                stages["encode"].append(time_ms(encode_pixmap, pix, image_format, PDF_IMAGE_OPTIONS["quality"])[0])
+        doc.close()
+        stages["segment"].append(time_ms(segment_pdf, pdf_bytes, PDF_MAX_PAGES)[0])
+        elapsed, result = time_ms(convert, pdf_bytes)
+        stages["convert"].append(elapsed)
+        converted.append(result)
+
+    # What the app and API pay: the same conversion in the sandbox's workers, pages spread across them
+    with make_render_sandbox() as sandbox:
+        sandbox.wait_ready()
+        for pdf_bytes in pdfs:
+            try:
+                stages["sandbox_convert"].append(time_ms(
+                    sandbox.render, pdf_bytes, max_pages=PDF_MAX_PAGES, dpi=PDF_DPI, mode=PDF_MODE, image_options=PDF_IMAGE_OPTIONS
+                )[0])
+            except PdfRejected:
+                pass  # e.g. a scanned corpus file over the size limit
+
+    for result in converted:
+        # Uncached, as for a job description seen for the first time
+        stages["preflight"].append(time_ms(compress_job_description.__wrapped__, JOB_DESCRIPTION)[0])
+        started = time.perf_counter()
+        build_contents(JOB_DESCRIPTION, result["parts"], input_prompt1)
+        get_cache_key(JOB_DESCRIPTION, result["parts"], input_prompt1, MODEL_NAME)
+        stages["request_build"].append((time.perf_counter() - started) * 1000)
+
+    # Our own overhead around a response: a zero-latency stub, streamed and joined
+    saved = stub.latency, stub.first_token_latency
+    stub.latency = stub.first_token_latency = 0
+    for result in converted:
+        started = time.perf_counter()
+        "".join(stream_analysis(JOB_DESCRIPTION, result["parts"], input_prompt1))
+        stages["response_handling"].append((time.perf_counter() - started) * 1000)
+    stub.latency, stub.first_token_latency = saved
+
+    summary = {name: summarize(samples) for name, samples in stages.items() if samples}
+    model_call = [time_ms(generate_analysis, JOB_DESCRIPTION, converted[0]["parts"], input_prompt1)[0] for _ in range(3)]
+    summary["model_call_stub"] = summarize(model_call)
+    report = compress_job_description(JOB_DESCRIPTION)
+    summary["preflight_tokens"] = {"before": report["tokens_before"], "after": report["tokens_after"], "removed": report["removed"]}
+    summary["section_tokens"] = {
+        name: {"sent": estimate_tokens(prune_sections(converted[0]["parts"], PROMPT_SECTIONS[name], name)),
+               "whole": estimate_tokens(converted[0]["parts"])}
+        for name in PROMPTS
+    }
+    summary["payload_per_page"] = summarize(
+        [meta["bytes"] for result in converted for meta in result["pages"]], unit="bytes"
+    )
+    return summary, converted
+
+
+COLD_START = """
+import sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({script!r}, default_timeout=120)
+started = time.perf_counter()
+app.run()
+print((time.perf_counter() - started) * 1000)
+"""
+
+# AppTest recompiles the script on every run, which a real server does not (it
+# caches the bytecode), so reruns are timed around an exec of compiled app.py.
+# The first run starts the PDF render workers and loads the Gemini client in the
+# background; reruns are only timed once both are done, as they would be long
+# before a user's second click.
+RERUN_TIMER = """
+import threading
+import time
+import streamlit as st
+state = st.session_state
+if "_bench_code" not in state:
+    with open({script!r}, encoding="utf-8") as f:
+        state["_bench_code"] = compile(f.read(), {script!r}, "exec")
+namespace = {{"__name__": "__main__", "__file__": {script!r}}}
+started = time.perf_counter()
+try:
+    exec(state["_bench_code"], namespace)
+finally:
+    state.setdefault("_bench_script_ms", []).append((time.perf_counter() - started) * 1000)
+if "_bench_ready" not in state:
+    namespace["get_render_sandbox"]().wait_ready()
+    for thread in threading.enumerate():
+        if thread.name == "gemini-warmup":
+            thread.join()
+    state["_bench_ready"] = True
+"""
+
+# In its own process, like the cold start: AppTest leaves the timer script installed as __main__
+RERUNS = """
+import json, sys
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({timer!r}, default_timeout=120)
+for _ in range({reruns} + 1):
+    app.run()
+print(json.dumps(app.session_state["_bench_script_ms"][1:]))
+"""
+
+
+def bench_streamlit(reruns=20):
+    """Time app.py's first run in a fresh process (imports included) and its no-op reruns, in another."""
+    try:
+        if importlib.util.find_spec("streamlit.testing.v1") is None:
+            raise ImportError
+    except ImportError:
+        return {"skipped": "streamlit.testing is not available"}
+    script = os.path.join(ROOT, "app.py")
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", COLD_START.format(root=ROOT, script=script)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    cold_ms = float(output.strip().splitlines()[-1])
+
+    timer = os.path.join(WORK_DIR, "rerun_timer.py")
+    with open(timer, "w", encoding="utf-8") as f:
+        f.write(RERUN_TIMER.format(script=script))
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", RERUNS.format(root=ROOT, timer=timer, reruns=reruns)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return {"cold_start_ms": round(cold_ms, 3), "rerun": summarize(json.loads(output.strip().splitlines()[-1]))}
+
+
+def bench_concurrent(parts, stub):
+    loop = start_event_loop()
+    started = time.perf_counter()
+    results = list(iter_analyses_concurrently(loop, JOB_DESCRIPTION, parts, PROMPTS))
+    seconds = time.perf_counter() - started
+    loop.call_soon_threadsafe(loop.stop)
+    finished = [event for event in results if event[2]]
+    return {
+        "analyses": len(finished),
+        "failures": sum(1 for event in finished if event[3] is not None),
+        "wall_seconds": round(seconds, 3),
+        "sequential_estimate_seconds": round(len(PROMPTS) * stub.latency, 3),
+        "analyses_per_second": round(len(finished) / seconds, 2),
+    }
+
+
+def bench_combined(parts):
+    started = time.perf_counter()
+    sections = generate_combined_analysis(JOB_DESCRIPTION, parts, PROMPTS)
+    seconds = time.perf_counter() - started
+    return {"sections": len(sections), "wall_seconds": round(seconds, 3)}
+
+
+def bench_bulk(corpus_dir, model_workers):
+    jd_path = os.path.join(WORK_DIR, "job_description.txt")
+    with open(jd_path, "w", encoding="utf-8") as f:
+        f.write(JOB_DESCRIPTION)
+    output = os.path.join(WORK_DIR, "bulk_results.jsonl")
+    resumes = len([name for name in os.listdir(corpus_dir) if name.endswith(".pdf")])
+    analyses = list(PROMPTS)
+    store = ResultsStore(os.path.join(WORK_DIR, "bulk_scores"))
+    started = time.perf_counter()
+    with contextlib.redirect_stderr(io.StringIO()):
+        screen(corpus_dir, JOB_DESCRIPTION, output, analyses, model_workers=model_workers, results_store=store)
+    seconds = time.perf_counter() - started
+    with open(output, encoding="utf-8") as f:
+        errors = [record["error"] for record in map(json.loads, f) if record["error"]]
+    # Resumes the sandbox refused are reported apart from analyses that failed
+    rejected = [error for error in errors if error.startswith("PDF conversion failed")]
+    failures = len(errors) - len(rejected)
+    if failures:
+        raise RuntimeError(f"bulk screening: {failures} analyses failed, e.g. {next(e for e in errors if e not in rejected)}")
+    return {
+        "resumes": resumes,
+        "rejected_resumes": len(rejected) // len(analyses),
+        "analyses": resumes * len(analyses),
+        "failures": failures,
+        "scores_stored": store.query(["total"]).num_rows,
+        "model_workers": model_workers,
+        "wall_seconds": round(seconds, 3),
+        "resumes_per_second": round(resumes / seconds, 2),
+        "analyses_per_second": round(resumes * len(analyses) / seconds, 2),
+    }
+
+
+def bench_results_store(rows, requisitions=20, batch=10000):
+    """Fill a results store with synthetic ATS scores, then time compaction and a top-50 query."""
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        return {"skipped": "pyarrow is not installed"}
+    store = ResultsStore(os.path.join(WORK_DIR, "results"))
+    rng = random.Random(0)
+    now = time.time()
+    started = time.perf_counter()
+    for start in range(0, rows, batch):
+        store.append([
+            {
+                "timestamp": now + i, "requisition": f"REQ-{i % requisitions}", "candidate": f"candidate-{i // requisitions}",
+                "analysis": "input_prompt6", "model": MODEL_NAME, "total": rng.uniform(0, 100),
+            }
+            for i in range(start, min(start + batch, rows))
+        ])
+    append_seconds = time.perf_counter() - started
+    compact_seconds = time_ms(store.compact)[0] / 1000
+    top = [time_ms(store.top, "REQ-7", "input_prompt6", 50)[0] for _ in range(5)]
+    scan_ms = time_ms(store.query, ["total"], ds.field("total") >= 99)[0]
+    return {
+        "rows": rows,
+        "requisitions": requisitions,
+        "append_rows_per_second": round(rows / append_seconds),
+        "compact_seconds": round(compact_seconds, 3),
+        "top50_one_requisition": summarize(top),
+        "filter_scan_all_ms": round(scan_ms, 3),
+    }
+
+
+def bench_match(resumes, roles, top_k=10):
+    """Vectorize synthetic resume and job description texts, then time the blocked top-K matching."""
+    rng = random.Random(0)
+    words = ("design", "build", "scale", "mentor", "lead", "api", "cloud", "data", "pipeline", "testing", "security")
+    vocabulary = SKILLS + words
+    resume_texts = [" ".join(rng.choices(vocabulary, k=400)) for _ in range(resumes)]
+    role_texts = [" ".join(rng.choices(vocabulary, k=120)) for _ in range(roles)]
+    started = time.perf_counter()
+    resume_vectors = HashedDocs([hash_terms(text) for text in resume_texts])
+    role_vectors = HashedDocs([hash_terms(text) for text in role_texts])
+    vectorize_seconds = time.perf_counter() - started
+    match_ms = time_ms(match, resume_vectors, role_vectors, top_k)[0]
+    return {
+        "resumes": resumes,
+        "roles": roles,
+        "vectorize_docs_per_second": round((resumes + roles) / vectorize_seconds),
+        "match_ms": round(match_ms, 3),
+    }
+
+
+def bench_index(resumes, queries=20, top_k=50):
+    """Index synthetic resume texts, then time BM25 searches over all of them and over a 1,000-resume subset."""
+    rng = random.Random(0)
+    # A long-tailed vocabulary, so postings lists have realistic lengths instead of each holding every resume
+    vocabulary = list(SKILLS) + [f"term{i}" for i in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    index = ResumeIndex(os.path.join(WORK_DIR, "index"))
+    started = time.perf_counter()
+    for i in range(resumes):
+        index.add(f"resume-{i}.pdf", " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=400)), f"sha-{i}")
+        if (i + 1) % INDEX_BATCH_SIZE == 0:
+            index.flush()
+    index.flush()
+    build_seconds = time.perf_counter() - started
+    index = ResumeIndex(index.path)  # searches run on a freshly opened, memory-mapped index
+    texts = [" ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=150)) for _ in range(queries)]
+    subset = range(0, resumes, max(1, resumes // 1000))
+    return {
+        "resumes": resumes,
+        "segments": len(index._segments),
+        "index_docs_per_second": round(resumes / build_seconds),
+        "search_all": summarize([time_ms(index.search, text, top_k)[0] for text in texts]),
+        "search_subset_1000": summarize([time_ms(index.search, text, top_k, doc_ids=subset)[0] for text in texts]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite with a stub Gemini model.")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    parser.add_argument("--corpus-size", type=int, default=24)
+    parser.add_argument("--max-pages", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub model latency in seconds")
+    parser.add_argument("--first-token-latency", type=float, default=0.1)
+    parser.add_argument("--response-chars", type=int, default=3000)
+    parser.add_argument("--model-workers", type=int, default=8, help="Concurrent model calls in the bulk run")
+    parser.add_argument("--store-rows", type=int, default=100000, help="Synthetic rows for the results store benchmark")
+    parser.add_argument("--match-resumes", type=int, default=5000, help="Synthetic resumes for the matching benchmark")
+    parser.add_argument("--match-roles", type=int, default=300, help="Synthetic roles for the matching benchmark")
+    parser.add_argument("--index-resumes", type=int, default=100000, help="Synthetic resumes for the index search benchmark")
+    parser.add_argument("--skip-streamlit", action="store_true")
+    args = parser.parse_args(argv)
+
+    stub = stub_model.install(args.latency, args.first_token_latency, args.response_chars)
+    corpus_dir = os.path.join(WORK_DIR, "corpus")
+    paths = build_corpus(corpus_dir, args.corpus_size, args.max_pages)
+    pdfs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pdfs.append(f.read())
+
+    stages, converted = bench_stages(pdfs, stub)
+    if not args.skip_streamlit:
+        stages["streamlit_run"] = bench_streamlit()
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymupdf": fitz.VersionBind,
+            "corpus_size": len(paths),
+            "max_pages": args.max_pages,
+            "stub": {
+                "latency": args.latency,
+                "first_token_latency": args.first_token_latency,
+                "response_chars": args.response_chars,
+            },
+            "settings": {"dpi": PDF_DPI, "mode": PDF_MODE, "image": PDF_IMAGE_OPTIONS},
+        },
+        "stages": stages,
+        "throughput": {
+            "concurrent_all_analyses": bench_concurrent(converted[0]["parts"], stub),
+            "combined_single_request": bench_combined(converted[0]["parts"]),
+            "bulk_screen": bench_bulk(corpus_dir, args.model_workers),
+            "results_store": bench_results_store(args.store_rows),
+            "match_matrix": bench_match(args.match_resumes, args.match_roles),
+            "resume_index": bench_index(args.index_resumes),
+        },
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
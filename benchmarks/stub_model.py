@@ -0,0 +1,127 @@
+"""Offline stand-in for google.generativeai.GenerativeModel.
+
+StubGenerativeModel answers generate_content, generate_content_async (both
+with and without stream=True) and count_tokens after a configurable delay,
+with a response of configurable size. install() patches it into the
+google.generativeai module, so the app's own code paths run unchanged
+without network access or an API key.
+"""
+
+import asyncio
+import json
+import re
+import time
+import zlib
+from types import SimpleNamespace
+
+import google.generativeai as genai
+
+IMAGE_TOKENS = 258  # what Gemini charges for one image part
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(contents):
+    tokens = 0
+    for part in contents:
+        if "text" in part:
+            tokens += len(part["text"]) // CHARS_PER_TOKEN + 1
+        else:
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+def score_block(prompt, seed):
+    """Fill in the JSON score block a scoring prompt asks for, or "" if it asks for none."""
+    template = re.search(r"```json\n(\{.*?\})\n```", prompt)
+    if template is None:
+        return ""
+    keys = re.findall(r'"(\w+)": <0-100>', template.group(1))
+    return "\n```json\n" + json.dumps({key: (seed >> i) % 101 for i, key in enumerate(keys)}) + "\n```"
+
+
+class StubGenerativeModel:
+    """Drop-in replacement for genai.GenerativeModel; configure via class attributes or install()."""
+
+    latency = 1.0              # seconds until the full response is available
+    first_token_latency = 0.2  # seconds until the first streamed chunk
+    response_chars = 3000
+    chunk_chars = 200
+    calls = 0
+
+    def __init__(self, model_name="stub", **kwargs):
+        self.model_name = model_name
+
+    def _response_text(self, contents, generation_config):
+        config = generation_config or {}
+        prompt = contents[-1].get("text", "")
+        # Scores vary with the resume, so rankings built from them are not all ties
+        seed = zlib.crc32(repr(contents[1:-1]).encode())
+        if config.get("response_mime_type") == "application/json":
+            # Combined mode: answer every task named in the prompt
+            tasks = re.split(r"### Task `([^`]+)`", prompt)[1:]
+            share = max(self.response_chars // max(len(tasks) // 2, 1), 1)
+            return json.dumps({name: "x" * share + score_block(task, seed) for name, task in zip(tasks[::2], tasks[1::2])})
+        return ("Stub analysis. " * (self.response_chars // 15 + 1))[:self.response_chars] + score_block(prompt, seed)
+
+    def _response(self, contents, text, sent=None):
+        # Like the real API, streamed chunks report the running total so far
+        prompt_tokens = estimate_tokens(contents)
+        output_tokens = len(text if sent is None else sent) // CHARS_PER_TOKEN + 1
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _chunks(self, text):
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        type(self).calls += 1
+        text = self._response_text(contents, generation_config)
+        if not stream:
+            time.sleep(self.latency)
+            return self._response(contents, text)
+        return self._stream(contents, text)
+
+    def _stream(self, contents, text):
+        chunks = self._chunks(text)
+        time.sleep(self.first_token_latency)
+        gap = max(self.latency - self.first_token_latency, 0) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            yield self._response(contents, chunk, sent=text[:(i + 1) * self.chunk_chars])
+
+    async def generate_content_async(self, contents, stream=False, generation_config=None, **kwargs):
+        type(self).calls += 1
+        text = self._response_text(contents, generation_config)
+        if not stream:
+            await asyncio.sleep(self.latency)
+            return self._response(contents, text)
+        return self._stream_async(contents, text)
+
+    async def _stream_async(self, contents, text):
+        chunks = self._chunks(text)
+        await asyncio.sleep(self.first_token_latency)
+        gap = max(self.latency - self.first_token_latency, 0) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield self._response(contents, chunk, sent=text[:(i + 1) * self.chunk_chars])
+
+    def count_tokens(self, contents):
+        return SimpleNamespace(total_tokens=estimate_tokens(contents))
+
+
+def install(latency=1.0, first_token_latency=0.2, response_chars=3000, chunk_chars=200):
+    """Replace genai.GenerativeModel with the stub and return the stub class."""
+    StubGenerativeModel.latency = latency
+    StubGenerativeModel.first_token_latency = first_token_latency
+    StubGenerativeModel.response_chars = response_chars
+    StubGenerativeModel.chunk_chars = chunk_chars
+    StubGenerativeModel.calls = 0
+    genai.GenerativeModel = StubGenerativeModel
+    genai.configure(api_key="offline-benchmark")
+    return StubGenerativeModel
@@ -0,0 +1,343 @@
+"""Screen a directory of resumes against one job description from the command line.
+
+Resumes are converted in sandboxed worker processes (see render_sandbox.py)
+and the selected analyses run on a bounded thread pool. Each finished analysis is appended to a JSONL file
+straight away, so memory use does not grow with the batch and a re-run with
+the same output file picks up where the previous one stopped.
+
+Usage:
+    python bulk_screen.py resumes/ job_description.txt -o results.jsonl --analyses 1,4,6
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from analysis import configure_client, generate_analysis, generate_combined_analysis
+from metrics import enable_json_logs, start_metrics_server
+from near_duplicates import group_near_duplicates, resume_signature
+from pdf_cache import make_cache_key
+from prompts import ANALYSIS_TITLES, PROMPTS
+from response_cache import fingerprint_parts
+from resume_index import ResumeIndex, index_directory
+from results_store import default_requisition, score_rows
+from scheduler import PRIORITY_BULK, Admission
+from scores import extract_scores
+from settings import (
+    CACHE_DIR, EXPECTED_OUTPUT_TOKENS, METRICS_LOG, METRICS_PORT, MODEL_NAME, NEAR_DUPLICATE_THRESHOLD, PDF_DPI, PDF_IMAGE_OPTIONS, PDF_MAX_PAGES, PDF_MODE, PDF_RENDER_SETTINGS, PDF_RENDER_WORKERS,
+    make_admission_controller, make_pdf_cache, make_render_sandbox, make_response_cache, make_results_store,
+)
+
+# Scores are added to the results store this many rows at a time
+STORE_BATCH = 200
+# Resumes read per batch when looking for near-duplicates
+SIGNATURE_BATCH = 1000
+
+
+def parse_analyses(value):
+    """Turn "1,4,input_prompt6" or "all" into a list of prompt names."""
+    if value.strip().lower() == "all":
+        return list(PROMPTS)
+    names = []
+    for item in value.split(","):
+        item = item.strip()
+        name = f"input_prompt{item}" if item.isdigit() else item
+        if name not in PROMPTS:
+            raise argparse.ArgumentTypeError(f"unknown analysis: {item}")
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def load_completed(output_path):
+    """Return the (file, analysis) pairs already written without an error."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partial last line from an interrupted run
+            if not record.get("error"):
+                completed.add((record["file"], record["analysis"]))
+    return completed
+
+
+def convert_resume(sandbox, pdf_bytes):
+    # One resume per sandbox worker, under its time and memory limits, so a bad file fails alone
+    return sandbox.render(pdf_bytes, max_pages=PDF_MAX_PAGES, dpi=PDF_DPI, mode=PDF_MODE, image_options=PDF_IMAGE_OPTIONS)
+
+
+def run_analysis(job_description, parts, name, cache, refresh, admission):
+    started = time.perf_counter()
+    response = generate_analysis(job_description, parts, PROMPTS[name], cache=cache, refresh=refresh, admission=admission)
+    return response, time.perf_counter() - started
+
+
+def run_combined(job_description, parts, names, cache, refresh, admission):
+    started = time.perf_counter()
+    sections = generate_combined_analysis(
+        job_description, parts, {name: PROMPTS[name] for name in names}, cache=cache, refresh=refresh, admission=admission
+    )
+    return sections, time.perf_counter() - started
+
+
+def shortlist(resume_dir, job_description, top_k, sandbox, executor=None):
+    """
+    Index the directory's resumes and return the file names of the best `top_k` matches.
+
+    The index lives under the cache directory and is updated incrementally,
+    so only resumes not seen before are extracted, by `sandbox` (see
+    index_directory).
+    """
+    index = ResumeIndex(os.path.join(CACHE_DIR, "index"))
+    shas = index_directory(index, resume_dir, sandbox, executor=executor)
+    names_by_id = {index.doc_id(sha): name for name, sha in shas.items() if index.doc_id(sha) is not None}
+    ranked = index.search(job_description, top_k, doc_ids=names_by_id)
+    for score, _, doc_id in ranked:
+        print(f"shortlisted {names_by_id[doc_id]} (score {score:.2f})", file=sys.stderr)
+    return [names_by_id[doc_id] for _, _, doc_id in ranked]
+
+
+def find_duplicates(resume_dir, files, threshold, sandbox, executor=None):
+    """
+    Find near-duplicate resumes among `files` (see near_duplicates.py).
+
+    The most recently modified file of each group is the one kept, since a
+    resubmitted resume is usually the candidate's latest version. Text is
+    extracted by `sandbox`, on `executor` threads if given.
+
+    Returns:
+        dict: Duplicate file name -> (kept file name, similarity)
+    """
+    newest_first = sorted(files, key=lambda name: os.path.getmtime(os.path.join(resume_dir, name)), reverse=True)
+    signatures = {}
+    map_fn = executor.map if executor is not None else map
+    for batch_start in range(0, len(newest_first), SIGNATURE_BATCH):
+        batch = newest_first[batch_start:batch_start + SIGNATURE_BATCH]
+        pdfs = []
+        for name in batch:
+            with open(os.path.join(resume_dir, name), "rb") as f:
+                pdfs.append(f.read())
+        signatures.update(zip(batch, map_fn(functools.partial(resume_signature, sandbox), pdfs, [PDF_MAX_PAGES] * len(batch))))
+    return group_near_duplicates(signatures, threshold)
+
+
+def screen(resume_dir, job_description, output_path, analyses, render_workers=None, model_workers=4, refresh=False, combined=False, top_k=None,
+           results_store=None, requisition=None, files=None, duplicate_threshold=None):
+    """
+    Run `analyses` for every PDF in `resume_dir`, appending results to `output_path`.
+
+    With `files`, only those resumes are analyzed; with `top_k`, only the
+    best-matching resumes from the local index.
+    With `results_store`, scores are also added to it under `requisition`
+    (default: one per job description).
+    With `duplicate_threshold`, near-duplicate resumes are analyzed once: the
+    others get records with "duplicate_of" set instead of a response.
+
+    Returns:
+        int: Number of analyses that failed
+    """
+    # One sandbox converts and extracts every resume; the thread pool keeps all of its workers busy
+    with make_render_sandbox(render_workers or os.cpu_count()) as sandbox, \
+            ThreadPoolExecutor(max_workers=sandbox.workers) as render_pool:
+        if files is not None:
+            files = list(files)
+        elif top_k:
+            files = shortlist(resume_dir, job_description, top_k, sandbox, render_pool)
+        else:
+            files = sorted(name for name in os.listdir(resume_dir) if name.lower().endswith(".pdf"))
+        completed = load_completed(output_path)
+        duplicates = {}
+        if duplicate_threshold and len(files) > 1:
+            duplicates = find_duplicates(resume_dir, files, duplicate_threshold, sandbox, render_pool)
+            if duplicates:
+                print(f"{len(duplicates)} near-duplicate resumes collapsed into {len(set(kept for kept, _ in duplicates.values()))}", file=sys.stderr)
+        todo = []
+        for name in files:
+            remaining = [analysis for analysis in analyses if (name, analysis) not in completed]
+            if remaining:
+                todo.append((name, remaining))
+        total = sum(len(remaining) for _, remaining in todo)
+        print(f"{len(files)} resumes, {total} analyses to run ({len(completed)} already done)", file=sys.stderr)
+
+        pdf_cache = make_pdf_cache()
+        response_cache = make_response_cache()
+        # Bulk work queues behind interactive use of the same process and paces itself to the quota
+        admission = Admission(make_admission_controller(), "bulk", PRIORITY_BULK, output_tokens=EXPECTED_OUTPUT_TOKENS)
+        done = failed = 0
+        requisition = requisition or default_requisition(job_description)
+        fingerprints = {}
+        score_batch = []
+
+        def save_scores():
+            if score_batch:
+                results_store.append(score_batch)
+                score_batch.clear()
+
+        with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=model_workers) as model_pool:
+
+            def write(record):
+                nonlocal done, failed
+                done += 1
+                if record["error"]:
+                    failed += 1
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                if results_store is not None:
+                    score_batch.extend(score_rows(
+                        {record["analysis"]: record}, record["file"], requisition, fingerprints.get(record["file"], ""), MODEL_NAME
+                    ))
+                    if len(score_batch) >= STORE_BATCH:
+                        save_scores()
+                if record["error"]:
+                    status = "error"
+                elif record["duplicate_of"]:
+                    status = f"duplicate of {record['duplicate_of']} ({record['similarity']:.0%} similar)"
+                else:
+                    status = f"ok {record['seconds']:.1f}s"
+                print(f"[{done}/{total}] {record['file']} {record['analysis']} {status}", file=sys.stderr)
+
+            def record_for(name, analysis, pages, response=None, seconds=None, error=None, duplicate_of=None, similarity=None):
+                return {
+                    "file": name,
+                    "analysis": analysis,
+                    "title": ANALYSIS_TITLES[analysis],
+                    "model": MODEL_NAME,
+                    "pages": pages,
+                    "response": response,
+                    "seconds": seconds,
+                    "error": error,
+                    "scores": extract_scores(analysis, response),
+                    "duplicate_of": duplicate_of,
+                    "similarity": similarity,
+                }
+
+            def submit_analyses(name, remaining, result):
+                fingerprints[name] = fingerprint_parts(result["parts"])
+                if combined:
+                    future = model_pool.submit(run_combined, job_description, result["parts"], remaining, response_cache, refresh, admission)
+                    pending[future] = ("combined", name, remaining, result["pages"])
+                    return
+                for analysis in remaining:
+                    future = model_pool.submit(run_analysis, job_description, result["parts"], analysis, response_cache, refresh, admission)
+                    pending[future] = ("analysis", name, analysis, result["pages"])
+
+            pending = {}
+            for name, remaining in todo:
+                if name in duplicates:
+                    kept, similarity = duplicates[name]
+                    for analysis in remaining:
+                        write(record_for(name, analysis, None, duplicate_of=kept, similarity=round(similarity, 3)))
+            queue = iter((name, remaining) for name, remaining in todo if name not in duplicates)
+            # Cap in-flight work so parts for the whole batch are never held at once
+            max_in_flight = (render_workers or os.cpu_count() or 1) + model_workers * 2
+            exhausted = False
+
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        name, remaining = next(queue)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    with open(os.path.join(resume_dir, name), "rb") as f:
+                        pdf_bytes = f.read()
+                    key = make_cache_key(pdf_bytes, PDF_RENDER_SETTINGS)
+                    cached = pdf_cache.get(key)
+                    if cached is not None:
+                        submit_analyses(name, remaining, cached)
+                    else:
+                        future = render_pool.submit(convert_resume, sandbox, pdf_bytes)
+                        pending[future] = ("render", name, remaining, key)
+
+                if not pending:
+                    continue
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    kind, name, detail, extra = pending.pop(future)
+                    if kind == "render":
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            for analysis in detail:
+                                write(record_for(name, analysis, None, error=f"PDF conversion failed: {e}"))
+                            continue
+                        pdf_cache.put(extra, result)
+                        submit_analyses(name, detail, result)
+                    elif kind == "combined":
+                        try:
+                            sections, seconds = future.result()
+                        except Exception as e:
+                            for analysis in detail:
+                                write(record_for(name, analysis, extra, error=str(e)))
+                            continue
+                        for analysis in detail:
+                            if analysis in sections:
+                                write(record_for(name, analysis, extra, sections[analysis], seconds))
+                            else:
+                                write(record_for(name, analysis, extra, error="missing from combined response"))
+                    else:
+                        try:
+                            response, seconds = future.result()
+                            write(record_for(name, detail, extra, response, seconds))
+                        except Exception as e:
+                            write(record_for(name, detail, extra, error=str(e)))
+            save_scores()
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen many resumes against one job description.")
+    parser.add_argument("resume_dir", help="Directory containing PDF resumes")
+    parser.add_argument("job_description", help="Text file with the job description")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("-a", "--analyses", type=parse_analyses, default=parse_analyses("all"),
+                        help="Comma-separated analyses to run, by number (1-8) or prompt name, or 'all'")
+    parser.add_argument("--render-workers", type=int, default=PDF_RENDER_WORKERS,
+                        help="Processes used for PDF conversion (default: CPU count)")
+    parser.add_argument("--model-workers", type=int, default=4, help="Concurrent model calls")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached responses")
+    parser.add_argument("--shortlist", type=int, metavar="K",
+                        help="Rank resumes with the local keyword index and analyze only the top K")
+    parser.add_argument("--combined", action="store_true",
+                        help="Run the selected analyses for each resume in a single model call")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="Analyze near-duplicate resumes separately instead of only the newest of each group")
+    parser.add_argument("--duplicate-threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help="Estimated text similarity from which resumes count as near-duplicates (default: %(default)s)")
+    parser.add_argument("--requisition", help="Requisition ID the scores are stored under (default: one per job description)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Serve Prometheus metrics on this port while screening (default: off)")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        parser.error("GOOGLE_API_KEY is not set")
+    configure_client(api_key=api_key)
+    if METRICS_LOG:
+        enable_json_logs()
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+
+    with open(args.job_description, encoding="utf-8") as f:
+        job_description = f.read()
+
+    failed = screen(
+        args.resume_dir, job_description, args.output, args.analyses,
+        render_workers=args.render_workers, model_workers=args.model_workers, refresh=args.refresh,
+        combined=args.combined, top_k=args.shortlist, results_store=make_results_store(), requisition=args.requisition,
+        duplicate_threshold=None if args.keep_duplicates else args.duplicate_threshold,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Background workers that drain the persistent analysis job queue.
+
+The Streamlit app and the API submit analyses with submit_job() and poll
+the job by ID; the model calls run here, on worker threads, so a rerun,
+refresh or closed tab never cancels or repeats them. Each worker claims
+one job at a time, runs its analyses concurrently on a shared event loop
+and saves the streamed text as it arrives.
+
+The app and the API start workers in-process. More workers can drain the
+same queue from separate processes, pointed at the same cache directory:
+
+Usage:
+    python job_worker.py --threads 8
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+from analysis import configure_client, generate_combined_analysis_async, get_prompt_id, start_event_loop, stream_analysis_async
+from metrics import enable_json_logs
+from prompts import ANALYSIS_TITLES, PROMPTS
+from response_cache import fingerprint_parts, make_response_key
+from results_store import default_requisition, score_rows
+from scheduler import PRIORITY_INTERACTIVE, Admission
+from scores import extract_scores
+from settings import (
+    EXPECTED_OUTPUT_TOKENS, JOB_LEASE_SECONDS, JOB_WORKERS, METRICS_LOG, MODEL_NAME,
+    make_admission_controller, make_job_store, make_response_cache, make_results_store,
+)
+
+logger = logging.getLogger("resume_analyzer.jobs")
+
+
+def make_job_key(job_description, parts, names, extra, combined, model_name):
+    """Dedup key for a submission: the same resume, job description, analyses and model share one job."""
+    prompt_id = json.dumps([combined, [get_prompt_id(PROMPTS[name]) for name in names]])
+    return make_response_key(fingerprint_parts([parts, extra]), job_description, prompt_id, model_name)
+
+
+def submit_job(store, job_description, render, names, extra=None, combined=False, refresh=False,
+               priority=PRIORITY_INTERACTIVE, session="", model_name=MODEL_NAME, candidate="", requisition=None):
+    """
+    Queue analyses of a rendered resume.
+
+    Args:
+        store (jobs.JobStore): Queue to submit to
+        job_description (str): Job description text
+        render (dict): Result of pdf_render.render_pdf ("parts" and "pages")
+        names (list): Prompt names to run
+        extra (dict): Prompt name -> extra parts sent with that analysis only (local grounding)
+        combined (bool): Run all analyses in a single model call
+        refresh (bool): Skip cached responses; also never joins an existing job
+        priority (int): PRIORITY_INTERACTIVE or PRIORITY_BULK
+        session (str): Fairness key for admission control
+        candidate (str): Candidate name stored with the scores
+        requisition (str): Requisition ID stored with the scores; defaults to one per job description
+
+    Returns:
+        tuple: (job_id, created) where created is False if an identical job was reused
+    """
+    extra = extra or {}
+    request = {
+        "analyses": names, "combined": combined, "refresh": refresh, "model": model_name, "pages": render["pages"],
+        "candidate": candidate, "requisition": requisition or default_requisition(job_description),
+        "resume": fingerprint_parts(render["parts"]),
+    }
+    payload = {"job_description": job_description, "parts": render["parts"], "extra": extra}
+    key = None if refresh else make_job_key(job_description, render["parts"], names, extra, combined, model_name)
+    return store.submit(request, payload, key=key, priority=priority, session=session)
+
+
+def result_entry(name, response=None, error=None):
+    return {"title": ANALYSIS_TITLES[name], "response": response, "error": error, "scores": extract_scores(name, response)}
+
+
+async def run_analyses(job_description, parts, names, extra=None, combined=False, model_name=MODEL_NAME,
+                       cache=None, refresh=False, admission=None, partial=None, on_retry=None):
+    """
+    Run the analyses concurrently and collect one result entry per analysis.
+
+    Args:
+        partial (dict): Optional dict updated with prompt name -> text so far while responses stream
+        on_retry (callable): Optional on_retry(attempt, delay, error), called before each retry wait
+
+    Returns:
+        dict: Prompt name -> {"title", "response", "error"}; one analysis failing does not fail the others
+    """
+    extra = extra or {}
+    options = {"model_name": model_name, "cache": cache, "refresh": refresh, "on_retry": on_retry, "admission": admission}
+    if combined:
+        try:
+            sections = await generate_combined_analysis_async(
+                job_description, parts, {name: PROMPTS[name] for name in names}, **options
+            )
+        except Exception as e:
+            return {name: result_entry(name, error=str(e)) for name in names}
+        return {
+            name: result_entry(name, sections[name]) if name in sections
+            else result_entry(name, error="missing from the combined response")
+            for name in names
+        }
+
+    partial = {} if partial is None else partial
+    # Every key exists up front so a worker thread can copy the dict while it fills in
+    partial.update((name, "") for name in names)
+
+    async def run(name):
+        async for chunk in stream_analysis_async(
+            job_description, parts, PROMPTS[name], extra_parts=extra.get(name), **options
+        ):
+            partial[name] += chunk
+        return partial[name]
+
+    responses = await asyncio.gather(*(run(name) for name in names), return_exceptions=True)
+    return {
+        name: result_entry(name, error=str(response)) if isinstance(response, Exception)
+        else result_entry(name, response)
+        for name, response in zip(names, responses)
+    }
+
+
+class JobNotices:
+    """
+    What a running job is waiting for, saved with its progress so the app and
+    API can show it: its place in the admission queue and its latest retry.
+
+    The callbacks run on the event loop, inside the task of the analysis that
+    is waiting, so each analysis of the job keeps its own place in line.
+    """
+
+    def __init__(self):
+        self.positions = {}  # asyncio task -> 1-based place in line
+        self.retry = None
+
+    def on_position(self, position):
+        task = asyncio.current_task()
+        if position:
+            self.positions[task] = position
+        else:
+            self.positions.pop(task, None)
+
+    def on_retry(self, attempt, delay, error):
+        self.retry = {"attempt": attempt, "seconds": round(delay, 1), "until": time.time() + delay}
+
+    def snapshot(self):
+        waiting = {}
+        positions = dict(self.positions)
+        if positions:
+            waiting["position"] = min(positions.values())
+        if self.retry is not None:
+            waiting["retry"] = self.retry
+        return waiting
+
+
+class JobWorkers:
+    """
+    Worker threads that claim queued jobs and run them on `loop`.
+
+    The threads only wait and write to the queue; the model calls run on
+    the event loop, which must be the one the caller's async Gemini client
+    is bound to.
+
+    Args:
+        store (jobs.JobStore): Queue to drain
+        loop (asyncio.AbstractEventLoop): Running event loop for the model calls
+        cache (ResponseCache): Optional response cache
+        admission_controller (scheduler.AdmissionController): Optional shared rate limiter
+        threads (int): Jobs run at the same time
+        poll_seconds (float): How often an idle worker checks the queue and a busy one saves progress
+        lease_seconds (float): How long a claimed job stays with a worker that stops reporting
+        results_store (results_store.ResultsStore): Optional store the scores of finished jobs are added to
+    """
+
+    def __init__(self, store, loop, cache=None, admission_controller=None, threads=4, poll_seconds=0.5,
+                 lease_seconds=JOB_LEASE_SECONDS, results_store=None):
+        self.store = store
+        self.loop = loop
+        self.cache = cache
+        self.admission_controller = admission_controller
+        self.threads = threads
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.results_store = results_store
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._workers = []
+
+    def start(self):
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._run, args=(f"{self.name}:{index}",), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop claiming jobs; a job still running is picked up again by another worker once its lease ends."""
+        self._stop.set()
+        for thread in self._workers:
+            thread.join(timeout)
+
+    def _run(self, worker):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(worker, self.lease_seconds)
+            except Exception as e:
+                logger.warning("Job queue unavailable: %s", e)
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_seconds)
+                continue
+            self.run_job(job, worker)
+
+    def run_job(self, job, worker):
+        """Run one claimed job to completion, saving partial text and renewing the lease as it goes."""
+        request, payload = job["request"], job["payload"]
+        notices = JobNotices()
+        admission = None
+        if self.admission_controller is not None:
+            admission = Admission(
+                self.admission_controller, job["session"] or job["id"], job["priority"],
+                notices.on_position, EXPECTED_OUTPUT_TOKENS,
+            )
+        partial = {}
+        future = asyncio.run_coroutine_threadsafe(run_analyses(
+            payload["job_description"], payload["parts"], request["analyses"], payload.get("extra"),
+            request["combined"], request["model"], self.cache, request["refresh"], admission, partial, notices.on_retry,
+        ), self.loop)
+
+        saved = None
+        renewed = time.monotonic()
+        while True:
+            try:
+                results = future.result(self.poll_seconds)
+                break
+            except concurrent.futures.TimeoutError:
+                pass
+            except Exception as e:
+                self.store.fail(job["id"], e, worker)
+                return
+            # Write only when there is new text or a new wait to show, or to keep the lease alive
+            snapshot = (dict(partial), notices.snapshot())
+            if snapshot != saved or time.monotonic() - renewed > self.lease_seconds / 3:
+                if not self.store.progress(job["id"], worker, snapshot[0], self.lease_seconds, snapshot[1]):
+                    future.cancel()  # the lease ran out and another worker has the job
+                    return
+                saved, renewed = snapshot, time.monotonic()
+        # An analysis that failed (retries ran out, or it was missing from a combined response) is
+        # worth running again, so the job is not reused for the same request
+        self.store.finish(
+            job["id"], {"model": request["model"], "pages": request["pages"], "results": results}, worker,
+            reusable=not any(entry["error"] for entry in results.values()),
+        )
+        if self.results_store is not None:
+            rows = score_rows(
+                results, request.get("candidate", ""), request.get("requisition") or default_requisition(payload["job_description"]),
+                request.get("resume", ""), request["model"], job["id"],
+            )
+            try:
+                if rows:
+                    self.results_store.append(rows)
+            except Exception:
+                # Analytics are best effort; the job itself has its results
+                logger.exception("Could not save scores of job %s", job["id"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued resume analyses in the background.")
+    parser.add_argument("--threads", type=int, default=JOB_WORKERS or 4, help="Jobs run at the same time")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        parser.error("GOOGLE_API_KEY is not set")
+    configure_client(api_key=api_key)
+    if METRICS_LOG:
+        enable_json_logs()
+
+    workers = JobWorkers(
+        make_job_store(), start_event_loop(), make_response_cache(), make_admission_controller(), threads=args.threads,
+        results_store=make_results_store(),
+    ).start()
+    print(f"Running {args.threads} job worker(s)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        workers.stop(timeout=5)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
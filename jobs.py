@@ -0,0 +1,256 @@
+"""Persistent SQLite job queue for analyses.
+
+Analyses are submitted as jobs instead of running inline, so the work
+survives Streamlit reruns, page refreshes and closed tabs. Any number of
+worker threads or processes can drain the queue (see job_worker.py), and
+the UI or API polls results by job ID.
+
+- Deduplication: a job carries a key for its exact request (resume,
+  job description, analyses, model). Submitting the same request while an
+  earlier one is queued, running or finished returns the existing job,
+  unless that job failed or finished with an analysis that failed (a rate
+  limit or outage that outlasted the retries), which would fail the same way.
+- Leases: a worker that claims a job holds a lease on it and renews the
+  lease whenever it reports progress. If the worker dies, the lease runs
+  out and another worker picks the job up, up to a fixed number of attempts.
+- Progress: streaming text is saved as the job runs, so a poller can show
+  partial results, along with the job's place in the model-call queue and
+  any retry it is waiting out.
+
+The payload (job description and rendered resume parts) is stored with the
+job, so a worker in another process needs nothing else. Finished jobs are
+deleted after a TTL.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from pdf_cache import dumps, loads
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+COLUMNS = {
+    "id": "TEXT PRIMARY KEY",
+    "key": "TEXT",
+    "status": "TEXT NOT NULL",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "session": "TEXT NOT NULL DEFAULT ''",
+    "request": "TEXT NOT NULL",
+    "payload": "BLOB",
+    "result": "TEXT",
+    "partial": "TEXT",
+    "waiting": "TEXT",
+    "error": "TEXT",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "worker": "TEXT",
+    "lease_until": "REAL",
+    "created": "REAL NOT NULL",
+    "updated": "REAL NOT NULL",
+}
+
+
+class JobStore:
+    """Persistent job queue shared by every process that opens the same file."""
+
+    def __init__(self, path, ttl_seconds=24 * 3600, max_attempts=3):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{name} {kind}" for name, kind in COLUMNS.items())
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS jobs ({columns})")
+        # Older stores were created before the queue columns existed
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind.replace('PRIMARY KEY', '')}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created)")
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so check-then-write is atomic across processes
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def submit(self, request, payload=None, key=None, priority=0, session=""):
+        """
+        Queue a job, or return the live job for the same request.
+
+        Args:
+            request (dict): JSON-serializable description (analyses, options) returned with the job
+            payload (dict): Inputs for the worker; may contain raw bytes
+            key (str): Dedup key; None to always create a new job
+            priority (int): Lower runs first (scheduler.PRIORITY_INTERACTIVE / PRIORITY_BULK)
+            session (str): Fairness key passed on to admission control
+
+        Returns:
+            tuple: (job_id, created) where created is False for a deduplicated submission
+        """
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                if key is not None:
+                    row = self._conn.execute(
+                        "SELECT id FROM jobs WHERE key = ? AND status != ? ORDER BY created DESC LIMIT 1",
+                        (key, FAILED),
+                    ).fetchone()
+                    if row is not None:
+                        self._conn.execute("COMMIT")
+                        return row[0], False
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, key, status, priority, session, request, payload, created, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, key, QUEUED, priority, session, json.dumps(request),
+                     dumps(payload) if payload is not None else None, now, now),
+                )
+                self._expire(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id, True
+
+    def claim(self, worker, lease_seconds):
+        """
+        Take the next runnable job: queued, or running with an expired lease.
+
+        Returns:
+            dict: The job with its decoded "payload", or None if nothing is runnable
+        """
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                # Jobs whose workers died too many times are given up on
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, "the job's worker stopped too many times", now, RUNNING, now, self.max_attempts),
+                )
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?)"
+                    " ORDER BY priority, created LIMIT 1",
+                    (QUEUED, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated = ?"
+                    " WHERE id = ?",
+                    (RUNNING, worker, now + lease_seconds, now, row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0], with_payload=True)
+
+    def progress(self, job_id, worker, partial, lease_seconds, waiting=None):
+        """
+        Save partial results and renew the lease.
+
+        Args:
+            waiting (dict): What the job is waiting for, if anything: "position" in
+                the admission queue and the latest "retry" (see job_worker.JobNotices)
+
+        Returns:
+            bool: False if this worker no longer holds the job (its lease ran out and it was reclaimed)
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET partial = ?, waiting = ?, lease_until = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (json.dumps(partial), json.dumps(waiting or {}), now + lease_seconds, now, job_id, worker, RUNNING),
+            )
+        return cursor.rowcount > 0
+
+    def finish(self, job_id, result, worker=None, reusable=True):
+        """
+        Mark a job done with its result.
+
+        Args:
+            reusable (bool): False if part of the result is an error, so that submitting
+                the same request again runs it again instead of returning this job
+        """
+        self._complete(job_id, worker, DONE, result=json.dumps(result), reusable=reusable)
+
+    def fail(self, job_id, error, worker=None):
+        self._complete(job_id, worker, FAILED, error=str(error))
+
+    def get(self, job_id, with_payload=False):
+        """
+        Look up a job.
+
+        Returns:
+            dict: id, status, request, result, partial, waiting, error, attempts, priority,
+            session, created and updated (plus payload if asked); None if unknown or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, request, result, partial, error, attempts, priority, session, created, updated,"
+                f" {'payload' if with_payload else 'NULL'}, waiting FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "id": row[0],
+            "status": row[1],
+            "request": json.loads(row[2]),
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "partial": json.loads(row[4]) if row[4] is not None else None,
+            "error": row[5],
+            "attempts": row[6],
+            "priority": row[7],
+            "session": row[8],
+            "created": row[9],
+            "updated": row[10],
+            "waiting": json.loads(row[12]) if row[12] else {},
+        }
+        if with_payload:
+            job["payload"] = loads(row[11]) if row[11] is not None else None
+        return job
+
+    def position(self, job_id):
+        """1-based place of a queued job among all queued jobs, or 0 if it is not queued."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, priority, created FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None or row[0] != QUEUED:
+                return 0
+            ahead = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND (priority < ? OR (priority = ? AND created < ?))",
+                (QUEUED, row[1], row[1], row[2]),
+            ).fetchone()[0]
+        return ahead + 1
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def _complete(self, job_id, worker, status, result=None, error=None, reusable=True):
+        # A worker whose lease was taken over must not overwrite the new owner's outcome.
+        # A job that must not be reused loses its key, so dedup never finds it.
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, waiting = NULL, lease_until = NULL,"
+                " key = CASE WHEN ? THEN key END, updated = ? WHERE id = ? AND (? IS NULL OR worker = ?)",
+                (status, result, error, reusable, time.time(), job_id, worker, worker),
+            )
+
+    def _expire(self, now):
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, now - self.ttl_seconds)
+        )
@@ -0,0 +1,166 @@
+"""Deterministic keyword and ATS pre-scoring of a resume against a job description.
+
+Everything here runs locally in milliseconds, so "Skills Match" and
+"ATS Score" can show numbers before the model has answered. The scores can
+also be handed to the model so it explains them instead of estimating its
+own percentages.
+"""
+
+import re
+from collections import Counter
+
+import numpy as np
+
+from resume_sections import SECTION_HEADINGS, heading_key
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-/][a-z0-9+#]+)*")
+
+STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each either etc few for from further
+had has have having he her here hers him his how i if in into is it its itself just like may me might
+more most must my no nor not now of off on once only or other our ours out over own per plus same she
+should so some such than that the their theirs them then there these they this those through to too
+under until up upon us very via was we well were what when where which while who whom why will with
+within without would you your yours
+ability able applicant applicants candidate candidates company description duties excellent experience
+good great including job know knowledge looking new position preferred required requirements
+responsibilities role strong team understanding work working year years
+""".split())
+
+# How much a keyword found under each resume section (resume_sections.SECTION_HEADINGS)
+# counts towards the section-weighted score.
+SECTION_WEIGHTS = {
+    "skills": 1.0,
+    "experience": 1.0,
+    "projects": 0.8,
+    "certifications": 0.7,
+    "summary": 0.6,
+    "achievements": 0.6,
+    "education": 0.5,
+    "other": 0.5,
+}
+
+BM25_K1 = 1.2
+
+_HEADING_LOOKUP = {alias: section for section, aliases in SECTION_HEADINGS.items() for alias in aliases}
+
+
+def tokenize(text):
+    """Lowercase word tokens that keep tech names like c++, c#, node.js and ci/cd intact."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+def extract_terms(text):
+    """Unigrams plus adjacent-word bigrams, so "machine learning" counts as one term too."""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def split_sections(text):
+    """
+    Split resume text on recognised section headings.
+
+    Returns:
+        dict: Section name -> text; anything before the first heading is "other"
+    """
+    sections = {}
+    current = "other"
+    for line in text.splitlines():
+        heading = heading_key(line)
+        if heading in _HEADING_LOOKUP:
+            current = _HEADING_LOOKUP[heading]
+            continue
+        sections[current] = sections.get(current, "") + line + "\n"
+    return sections
+
+
+def score_resume(resume_text, job_description):
+    """
+    Score a resume against a job description.
+
+    Args:
+        resume_text (str): Text extracted from the resume
+        job_description (str): Job description text
+
+    Returns:
+        dict: Scores from 0 to 100 ("coverage", "tfidf", "bm25",
+        "section_weighted" and their mean "overall") plus the matched and
+        missing JD terms, most important first
+    """
+    jd_counts = Counter(extract_terms(job_description))
+    # Bigrams are only worth tracking when they recur; single mentions are mostly noise
+    jd_counts = Counter({term: n for term, n in jd_counts.items() if " " not in term or n > 1})
+    if not jd_counts:
+        return {"coverage": 0.0, "tfidf": 0.0, "bm25": 0.0, "section_weighted": 0.0, "overall": 0.0,
+                "matched_terms": [], "missing_terms": []}
+
+    vocab = list(jd_counts)
+    index = {term: i for i, term in enumerate(vocab)}
+    sections = split_sections(resume_text) or {"other": ""}
+    section_names = list(sections)
+
+    # Term counts per resume section (rows) over the JD vocabulary (columns)
+    counts = np.zeros((len(section_names), len(vocab)))
+    for row, name in enumerate(section_names):
+        for term in extract_terms(sections[name]):
+            col = index.get(term)
+            if col is not None:
+                counts[row, col] += 1
+    resume_tf = counts.sum(axis=0)
+    jd_tf = np.array([jd_counts[term] for term in vocab], dtype=float)
+    present = resume_tf > 0
+
+    # IDF over the resume sections and JD paragraphs, so terms that show up
+    # everywhere (boilerplate) weigh less than distinctive ones
+    jd_paragraphs = [p for p in re.split(r"\n\s*\n", job_description) if p.strip()]
+    doc_freq = (counts > 0).sum(axis=0).astype(float)
+    for paragraph in jd_paragraphs:
+        terms = set(extract_terms(paragraph))
+        doc_freq += np.array([term in terms for term in vocab], dtype=float)
+    n_docs = len(section_names) + len(jd_paragraphs)
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)) + 1e-6
+    jd_weight = (1 + np.log(jd_tf)) * idf
+
+    coverage = jd_weight[present].sum() / jd_weight.sum()
+
+    resume_vec = np.where(present, 1 + np.log(np.maximum(resume_tf, 1)), 0) * idf
+    norm = np.linalg.norm(resume_vec) * np.linalg.norm(jd_weight)
+    tfidf = float(resume_vec @ jd_weight / norm) if norm else 0.0
+
+    # Scoring one resume at a time, so BM25's length normalisation is neutral.
+    # Normalise against a resume that repeats each term as often as the JD does.
+    tf_part = resume_tf * (BM25_K1 + 1) / (resume_tf + BM25_K1)
+    ideal_part = jd_tf * (BM25_K1 + 1) / (jd_tf + BM25_K1)
+    bm25 = (idf * np.minimum(tf_part, ideal_part)).sum() / (idf * ideal_part).sum()
+
+    section_weights = np.array([SECTION_WEIGHTS.get(name, SECTION_WEIGHTS["other"]) for name in section_names])
+    best_weight = np.where(counts > 0, section_weights[:, None], 0).max(axis=0)
+    section_weighted = (jd_weight * best_weight).sum() / jd_weight.sum()
+
+    scores = {
+        "coverage": round(100 * float(coverage), 1),
+        "tfidf": round(100 * tfidf, 1),
+        "bm25": round(100 * float(bm25), 1),
+        "section_weighted": round(100 * float(section_weighted), 1),
+    }
+    scores["overall"] = round(sum(scores.values()) / len(scores), 1)
+    order = np.argsort(-jd_weight, kind="stable")
+    scores["matched_terms"] = [vocab[i] for i in order if present[i]]
+    scores["missing_terms"] = [vocab[i] for i in order if not present[i]]
+    return scores
+
+
+def format_scores_for_prompt(scores, max_terms=25):
+    """Describe pre-computed scores as a text part the model can ground its answer on."""
+    return (
+        "Local keyword pre-scores, computed deterministically from the resume text before this request:\n"
+        f"- Overall keyword match: {scores['overall']}%\n"
+        f"- Weighted term coverage: {scores['coverage']}%\n"
+        f"- TF-IDF similarity: {scores['tfidf']}%\n"
+        f"- BM25 relevance: {scores['bm25']}%\n"
+        f"- Section-weighted keyword score: {scores['section_weighted']}%\n"
+        f"- Matched terms: {', '.join(scores['matched_terms'][:max_terms]) or 'none'}\n"
+        f"- Missing terms: {', '.join(scores['missing_terms'][:max_terms]) or 'none'}\n"
+        "Use these figures for any keyword match percentages and focus on explaining them."
+    )
@@ -0,0 +1,311 @@
+"""Match a pool of resumes against a set of job descriptions, locally.
+
+Every resume and job description is vectorized once: its terms (unigrams
+and bigrams, as keyword_score.extract_terms) are hashed into a fixed number
+of signed buckets, so there is no vocabulary to build or share between
+workers and nothing is fetched from the network. Vectors are
+weighted by TF-IDF over the whole pool and L2-normalized, so a dot product
+is the cosine similarity.
+
+The resume x job description similarity matrix is computed block by
+block. Only buckets used by some job description can contribute to a
+score, so blocks are densified over those columns alone, and each block
+is sized to stay under a memory cap; only the running top K in each
+direction is kept. The result is the best candidates for every role and
+the best roles for every candidate, and model analyses (--analyze) then run
+for those pairs only instead of all N x M of them, with near-duplicate
+resumes in a shortlist analyzed once.
+
+Usage:
+    python match_matrix.py resumes/ roles/ -k 10 -o matches.jsonl
+    python match_matrix.py resumes/ roles/ -k 5 --analyze 1,6 --analysis-dir screened/
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from keyword_score import extract_terms
+from render_sandbox import PdfRejected
+from settings import PDF_MAX_PAGES, PDF_RENDER_WORKERS, make_render_sandbox
+
+N_FEATURES = 2 ** 20
+BLOCK_MB = 64  # memory cap for the dense blocks of one similarity block
+READ_BATCH_SIZE = 1000  # resumes read and vectorized per batch
+ROLE_EXTENSIONS = (".txt", ".md")
+
+
+def hash_terms(text, n_features=N_FEATURES):
+    """
+    Hashed term frequencies of a text.
+
+    Args:
+        text (str): Resume or job description text
+        n_features (int): Number of hash buckets
+
+    Returns:
+        tuple: (indices, values) arrays, one entry per bucket used: bucket
+        index and signed sublinear term frequency
+    """
+    counts = Counter(extract_terms(text))
+    if not counts:
+        return np.empty(0, np.int32), np.empty(0, np.float32)
+    # crc32 rather than hash(): string hashes are salted per process
+    hashes = np.fromiter((zlib.crc32(term.encode()) for term in counts), dtype=np.uint32, count=len(counts))
+    tf = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    # The top bit picks the sign, so bucket collisions tend to cancel out rather than add up
+    signed = np.where(hashes >> 31, -tf, tf)
+    indices, inverse = np.unique((hashes % n_features).astype(np.int32), return_inverse=True)
+    values = np.zeros(len(indices), np.float32)
+    np.add.at(values, inverse, signed)
+    return indices, values
+
+
+def vectorize_pdf(sandbox, pdf_bytes, max_pages, n_features):
+    # Text comes from the render sandbox; one unreadable or refused PDF must not stop the batch
+    try:
+        text = sandbox.extract_text(pdf_bytes, max_pages=max_pages)
+    except PdfRejected:
+        return None
+    return hash_terms(text, n_features)
+
+
+class HashedDocs:
+    """
+    Hashed document vectors in compressed sparse row form.
+
+    Args:
+        vectors (list): (indices, values) pairs from hash_terms
+        n_features (int): Number of hash buckets
+    """
+
+    def __init__(self, vectors, n_features=N_FEATURES):
+        self.n_features = n_features
+        self.indptr = np.zeros(len(vectors) + 1, np.int64)
+        np.cumsum([len(indices) for indices, _ in vectors], out=self.indptr[1:])
+        self.indices = np.concatenate([indices for indices, _ in vectors] or [np.empty(0, np.int32)])
+        self.values = np.concatenate([values for _, values in vectors] or [np.empty(0, np.float32)])
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def document_frequency(self):
+        return np.bincount(self.indices, minlength=self.n_features)
+
+    def normalize(self, idf):
+        """Weight by `idf` and scale every row to unit length."""
+        self.values *= idf[self.indices]
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=self.values.astype(np.float64) ** 2, minlength=len(self)))
+        norms[norms == 0] = 1
+        self.values /= norms[rows].astype(np.float32)
+
+    def dense(self, start, stop, columns, width):
+        """
+        Rows `start`..`stop` as a dense block.
+
+        Args:
+            columns (np.ndarray): Bucket -> block column, -1 for buckets left out
+            width (int): Number of block columns
+        """
+        low, high = self.indptr[start], self.indptr[stop]
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        cols = columns[self.indices[low:high]]
+        keep = cols >= 0
+        block = np.zeros((stop - start, width), np.float32)
+        block[rows[keep], cols[keep]] = self.values[low:high][keep]
+        return block
+
+
+def merge_top(best_scores, best_ids, scores, ids):
+    """Keep as many of the highest scores per row as `best_scores` has columns, out of it and a new block."""
+    k = best_scores.shape[1]
+    scores = np.concatenate([best_scores, scores], axis=1)
+    ids = np.concatenate([best_ids, ids], axis=1)
+    keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, keep, axis=1), np.take_along_axis(ids, keep, axis=1)
+
+
+def match(resumes, roles, top_k=10, block_mb=BLOCK_MB):
+    """
+    Cosine similarity of every resume with every role, reduced to the top K both ways.
+
+    Both collections are TF-IDF weighted over the pool and normalized in place.
+
+    Args:
+        resumes (HashedDocs): Resume vectors
+        roles (HashedDocs): Job description vectors
+        top_k (int): Matches kept per role and per candidate
+        block_mb (int): Memory cap for the dense blocks, in megabytes
+
+    Returns:
+        dict: "roles": (scores, ids) arrays, one row per role with the
+        indices of its best resumes; "candidates": (scores, ids), one row per
+        resume with the indices of its best roles; best first
+    """
+    df = resumes.document_frequency() + roles.document_frequency()
+    idf = (np.log((1 + len(resumes) + len(roles)) / (1 + df)) + 1).astype(np.float32)
+    resumes.normalize(idf)
+    roles.normalize(idf)
+
+    # Buckets no job description uses add nothing to any score, so they get no column
+    used = np.unique(roles.indices)
+    columns = np.full(roles.n_features, -1, np.int32)
+    columns[used] = np.arange(len(used), dtype=np.int32)
+    width = max(len(used), 1)
+    # A third of the cap each for the resume block, the role block and their similarity block
+    budget = block_mb * 1024 * 1024 // 3 // 4
+    rows_per_block = max(min(budget // width, int(budget ** 0.5)), 1)
+
+    n, m = len(resumes), len(roles)
+    # Placeholders score -inf, so the first real matches replace them
+    role_scores = np.full((m, min(top_k, n)), -np.inf, np.float32)
+    role_ids = np.full(role_scores.shape, -1, np.int64)
+    candidate_scores = np.full((n, min(top_k, m)), -np.inf, np.float32)
+    candidate_ids = np.full(candidate_scores.shape, -1, np.int64)
+    for role_start in range(0, m, rows_per_block):
+        role_stop = min(role_start + rows_per_block, m)
+        role_block = roles.dense(role_start, role_stop, columns, width)
+        for start in range(0, n, rows_per_block):
+            stop = min(start + rows_per_block, n)
+            similarity = resumes.dense(start, stop, columns, width) @ role_block.T
+            role_scores[role_start:role_stop], role_ids[role_start:role_stop] = merge_top(
+                role_scores[role_start:role_stop], role_ids[role_start:role_stop],
+                similarity.T, np.broadcast_to(np.arange(start, stop), similarity.T.shape),
+            )
+            candidate_scores[start:stop], candidate_ids[start:stop] = merge_top(
+                candidate_scores[start:stop], candidate_ids[start:stop],
+                similarity, np.broadcast_to(np.arange(role_start, role_stop), similarity.shape),
+            )
+    return {"roles": sort_rows(role_scores, role_ids), "candidates": sort_rows(candidate_scores, candidate_ids)}
+
+
+def sort_rows(scores, ids):
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def vectorize_directory(resume_dir, sandbox, executor=None, n_features=N_FEATURES):
+    """
+    Extract and vectorize every PDF in `resume_dir`.
+
+    PDFs are read in batches, and only their vectors are kept, so memory
+    does not grow with the size of the files. Unreadable PDFs are skipped.
+
+    Args:
+        resume_dir (str): Directory of PDF resumes
+        sandbox (RenderSandbox): Extracts the text, so a malicious PDF cannot hang or exhaust this process
+        executor (Executor): Optional thread pool, to keep several sandbox workers busy
+        n_features (int): Number of hash buckets
+
+    Returns:
+        tuple: (file names, HashedDocs)
+    """
+    map_fn = executor.map if executor is not None else map
+    files = sorted(name for name in os.listdir(resume_dir) if name.lower().endswith(".pdf"))
+    names, vectors = [], []
+    for batch_start in range(0, len(files), READ_BATCH_SIZE):
+        batch = files[batch_start:batch_start + READ_BATCH_SIZE]
+        pdfs = []
+        for name in batch:
+            with open(os.path.join(resume_dir, name), "rb") as f:
+                pdfs.append(f.read())
+        vectors_batch = map_fn(
+            functools.partial(vectorize_pdf, sandbox), pdfs, [PDF_MAX_PAGES] * len(batch), [n_features] * len(batch)
+        )
+        for name, vector in zip(batch, vectors_batch):
+            if vector is None:
+                print(f"skipping unreadable PDF {name}", file=sys.stderr)
+                continue
+            names.append(name)
+            vectors.append(vector)
+    return names, HashedDocs(vectors, n_features)
+
+
+def load_roles(role_dir):
+    """Return (role name, job description) for each .txt or .md file in `role_dir`; the name is the file name without extension."""
+    roles = []
+    for name in sorted(os.listdir(role_dir)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() in ROLE_EXTENSIONS:
+            with open(os.path.join(role_dir, name), encoding="utf-8") as f:
+                roles.append((stem, f.read()))
+    return roles
+
+
+def main(argv=None):
+    from bulk_screen import parse_analyses
+
+    parser = argparse.ArgumentParser(description="Match many resumes against many job descriptions locally.")
+    parser.add_argument("resume_dir", help="Directory containing PDF resumes")
+    parser.add_argument("role_dir", help="Directory of job descriptions, one .txt or .md file per role")
+    parser.add_argument("-k", "--top-k", type=int, default=10, help="Matches kept per role and per candidate")
+    parser.add_argument("-o", "--output", help="Write JSONL matches here instead of stdout")
+    parser.add_argument("--min-score", type=float, default=0.0, help="Keep only matches scoring above this cosine similarity")
+    parser.add_argument("--block-mb", type=int, default=BLOCK_MB, help="Memory cap for similarity blocks, in megabytes")
+    parser.add_argument("--render-workers", type=int, default=PDF_RENDER_WORKERS,
+                        help="Sandboxed processes used for text extraction (default: CPU count)")
+    parser.add_argument("--analyze", type=parse_analyses, metavar="ANALYSES",
+                        help="Run these analyses (as bulk_screen --analyses) for each role's top K candidates")
+    parser.add_argument("--analysis-dir", default="screened", help="Directory for the per-role JSONL files of --analyze")
+    parser.add_argument("--model-workers", type=int, default=4, help="Concurrent model calls for --analyze")
+    args = parser.parse_args(argv)
+    if args.top_k < 1:
+        parser.error("--top-k must be at least 1")
+
+    roles = load_roles(args.role_dir)
+    if not roles:
+        parser.error(f"no .txt or .md job descriptions in {args.role_dir}")
+    with make_render_sandbox(args.render_workers or os.cpu_count()) as sandbox, \
+            ThreadPoolExecutor(max_workers=sandbox.workers) as pool:
+        files, resumes = vectorize_directory(args.resume_dir, sandbox, executor=pool)
+    role_vectors = HashedDocs([hash_terms(text) for _, text in roles])
+    result = match(resumes, role_vectors, args.top_k, args.block_mb)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        shortlists = {}
+        for (role, _), scores, ids in zip(roles, *result["roles"]):
+            matches = [{"file": files[i], "score": round(float(s), 4)} for s, i in zip(scores, ids) if s > args.min_score]
+            shortlists[role] = [match["file"] for match in matches]
+            out.write(json.dumps({"role": role, "candidates": matches}) + "\n")
+        for name, scores, ids in zip(files, *result["candidates"]):
+            matches = [{"role": roles[i][0], "score": round(float(s), 4)} for s, i in zip(scores, ids) if s > args.min_score]
+            out.write(json.dumps({"file": name, "roles": matches}) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"matched {len(files)} resumes against {len(roles)} roles", file=sys.stderr)
+
+    if not args.analyze:
+        return 0
+    from analysis import configure_client
+    from bulk_screen import screen
+    from settings import NEAR_DUPLICATE_THRESHOLD, make_results_store
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        parser.error("GOOGLE_API_KEY is not set")
+    configure_client(api_key=api_key)
+    os.makedirs(args.analysis_dir, exist_ok=True)
+    results_store = make_results_store()
+    failed = 0
+    for role, job_description in roles:
+        if shortlists[role]:
+            failed += screen(
+                args.resume_dir, job_description, os.path.join(args.analysis_dir, role + ".jsonl"), args.analyze,
+                render_workers=args.render_workers, model_workers=args.model_workers, files=shortlists[role],
+                results_store=results_store, requisition=role, duplicate_threshold=NEAR_DUPLICATE_THRESHOLD,
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
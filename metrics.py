@@ -0,0 +1,266 @@
+"""In-process latency, token and cost metrics for the analysis pipeline.
+
+Stages are timed with `span()`, token usage is read from Gemini's
+usage_metadata with `record_usage()`, and cache lookups are counted with
+`record_cache()`. Everything goes into one process-wide registry
+(`METRICS`). The registry can be:
+
+- rendered in the Prometheus text format, or served by `start_metrics_server()`
+- summarized as p50/p95 per stage and prompt for the app's admin panel
+- logged, one JSON line per event, on the "resume_analyzer.metrics" logger
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("resume_analyzer.metrics")
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+SAMPLE_WINDOW = 1000  # recent observations kept per series for percentiles
+
+HELP = {
+    "resume_stage_seconds": "Time spent in each pipeline stage",
+    "resume_payload_bytes": "Size of the contents sent to the model per request",
+    "resume_tokens_total": "Tokens reported in response usage metadata",
+    "resume_cost_usd_total": "Estimated model cost from token usage",
+    "resume_cache_requests_total": "Cache lookups by cache and result",
+    "resume_stage_errors_total": "Stages that raised an exception",
+    "resume_model_retries_total": "Model calls retried after a 429 or 5xx, by status",
+    "resume_model_retry_wait_seconds": "Backoff waited before each model call retry",
+    "resume_singleflight_total": "Model requests by single-flight role (leader calls, follower shares)",
+    "resume_near_duplicates_total": "Requests whose resume or job description nearly duplicates an earlier one, by kind and action (reused or flagged)",
+    "resume_pdf_rejected_total": "Uploaded PDFs refused by the render sandbox, by reason (size, format, pages, pixels, timeout, memory, crashed, unreadable)",
+    "resume_preflight_tokens_saved_total": "Estimated input tokens removed from requests before sending (job description text, unused resume sections), by reason",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms with a bounded window of raw samples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)   # (name, labels) -> value
+        self._histograms = {}                 # (name, labels) -> [bucket counts, sum, count, buckets]
+        self._samples = {}                    # (name, labels) -> deque of recent values
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        series = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(series)
+            if histogram is None:
+                histogram = self._histograms[series] = [[0] * len(buckets), 0.0, 0, buckets]
+                self._samples[series] = deque(maxlen=SAMPLE_WINDOW)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+            self._samples[series].append(value)
+
+    def counters(self, name):
+        """Return {labels dict as tuple: value} for one counter."""
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def percentiles(self, name, quantiles=(0.5, 0.95)):
+        """
+        Summarize the recent samples of one histogram.
+
+        Returns:
+            list: One dict per label set with the labels, "count" and "p50"/"p95"-style keys
+        """
+        with self._lock:
+            series = [(labels, sorted(samples)) for (metric, labels), samples in self._samples.items() if metric == name]
+        rows = []
+        for labels, samples in sorted(series):
+            if not samples:
+                continue
+            row = dict(labels)
+            row["count"] = len(samples)
+            for q in quantiles:
+                row[f"p{int(q * 100)}"] = samples[min(len(samples) - 1, int(len(samples) * q))]
+            rows.append(row)
+        return rows
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (series, (list(counts), total, count, buckets))
+                for series, (counts, total, count, buckets) in self._histograms.items()
+            )
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value!r}")
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            header(name, "histogram")
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._samples.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+def log_event(event, **fields):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str))
+
+
+@contextmanager
+def span(stage, registry=METRICS, **labels):
+    """
+    Time a pipeline stage and record it as resume_stage_seconds{stage, ...labels}.
+
+    Yields a dict the caller may fill with extra fields for the structured log
+    line (payload size, cache result, ...). Exceptions are counted and re-raised.
+    """
+    fields = {}
+    started = time.perf_counter()
+    try:
+        yield fields
+    except Exception as e:
+        registry.inc("resume_stage_errors_total", stage=stage, **labels)
+        fields["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe("resume_stage_seconds", seconds, stage=stage, **labels)
+        log_event("span", stage=stage, seconds=round(seconds, 6), **labels, **fields)
+
+
+def observe_stage(stage, seconds, registry=METRICS, **labels):
+    """Record a stage timed by the caller, for spans that do not fit a with-block."""
+    registry.observe("resume_stage_seconds", seconds, stage=stage, **labels)
+    log_event("span", stage=stage, seconds=round(seconds, 6), **labels)
+
+
+def payload_bytes(contents):
+    """Bytes of text and inline image data in a list of request parts."""
+    total = 0
+    for part in contents:
+        if "text" in part:
+            total += len(part["text"].encode())
+        else:
+            total += len(part.get("data", b""))
+    return total
+
+
+def record_payload(contents, registry=METRICS, **labels):
+    size = payload_bytes(contents)
+    registry.observe("resume_payload_bytes", size, buckets=BYTES_BUCKETS, **labels)
+    return size
+
+
+def record_cache(cache, hit, registry=METRICS):
+    registry.inc("resume_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_usage(usage, prompt, model, prices=None, registry=METRICS):
+    """
+    Count tokens (and their estimated cost) from a response's usage_metadata.
+
+    Args:
+        usage: response.usage_metadata, or None when the client did not send it
+        prompt (str): Prompt name label, e.g. "input_prompt4"
+        model (str): Gemini model name
+        prices (dict): USD per million tokens, {"input": float, "output": float}
+
+    Returns:
+        dict: {"input": int, "output": int, "cost_usd": float}
+    """
+    if usage is None:
+        return {"input": 0, "output": 0, "cost_usd": 0.0}
+    input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    prices = prices or {}
+    cost = (input_tokens * prices.get("input", 0) + output_tokens * prices.get("output", 0)) / 1_000_000
+    registry.inc("resume_tokens_total", input_tokens, prompt=prompt, model=model, kind="input")
+    registry.inc("resume_tokens_total", output_tokens, prompt=prompt, model=model, kind="output")
+    registry.inc("resume_cost_usd_total", cost, prompt=prompt, model=model)
+    log_event("usage", prompt=prompt, model=model, input_tokens=input_tokens, output_tokens=output_tokens, cost_usd=cost)
+    return {"input": input_tokens, "output": output_tokens, "cost_usd": cost}
+
+
+def enable_json_logs(stream=None):
+    """Send the structured metric events to `stream` (default stderr), one JSON object per line."""
+    if any(getattr(handler, "_resume_metrics", False) for handler in logger.handlers):
+        return
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler._resume_metrics = True
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def start_metrics_server(port, host="0.0.0.0", registry=METRICS):
+    """
+    Serve the registry at http://host:port/metrics on a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes would otherwise flood stderr
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
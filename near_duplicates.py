@@ -0,0 +1,291 @@
+"""Near-duplicate detection for resumes and job descriptions.
+
+Candidates resubmit lightly edited resumes and postings are re-pasted with a
+changed footer, and an exact hash treats every such copy as new. Here each
+text gets a MinHash signature over its word 3-shingles: the share of
+positions where two signatures agree estimates the Jaccard similarity of
+their shingle sets. Signatures are split into bands (locality-sensitive
+hashing), so only texts sharing a whole band with a new one are compared
+at all, and lookups stay cheap however many texts have been seen.
+
+NearDuplicateIndex keeps one signature per group of near-duplicates (the
+first text seen) in SQLite, shared by every process using the cache
+directory. The response cache consults it when building request keys (see
+analysis.prepare_request): in "reuse" mode a near-duplicate resume or job
+description is keyed as the earlier one, so its cached analyses are
+reused; in "flag" mode it is only counted and logged. Bulk screening
+collapses near-duplicate resumes within a batch (group_near_duplicates).
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+from metrics import METRICS, log_event
+from render_sandbox import PdfRejected
+from response_cache import fingerprint_parts, normalize_job_description
+
+NUM_PERM = 128
+# 16 bands of 8 rows: texts 90% alike almost always share a band, texts 50% alike rarely do
+BANDS = 16
+SHINGLE_WORDS = 3
+# Shorter texts have too few shingles for a meaningful estimate
+MIN_WORDS = 20
+MEMO_SIZE = 4096
+MERSENNE_PRIME = (1 << 31) - 1  # small enough that a * x + b never overflows 64 bits
+PERMUTATION_SEED = 20240611  # fixed, so signatures are comparable across processes and runs
+WORD = re.compile(r"[a-z0-9+#]+")
+
+# NumPy is imported inside the functions that use it: settings imports this
+# module, and the Streamlit app should not load NumPy before a resume is uploaded.
+
+
+@lru_cache(maxsize=None)
+def permutations():
+    """(a, b) coefficients of the NUM_PERM hash functions."""
+    import numpy as np
+    rng = np.random.default_rng(PERMUTATION_SEED)
+    return (
+        rng.integers(1, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64),
+        rng.integers(0, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64),
+    )
+
+
+def shingle_hashes(text):
+    """crc32 of every run of SHINGLE_WORDS words, or None if the text is shorter than MIN_WORDS words."""
+    import numpy as np
+    words = WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash(text):
+    """
+    MinHash signature of a text.
+
+    Returns:
+        np.ndarray: NUM_PERM uint32 values, or None for texts under MIN_WORDS words
+    """
+    hashes = shingle_hashes(text)
+    if hashes is None:
+        return None
+    import numpy as np
+    a, b = permutations()
+    prime = np.uint64(MERSENNE_PRIME)
+    # One universal hash (a * x + b) mod p per permutation, applied to every shingle at once
+    x = (hashes % prime)[:, None]
+    return ((a * x + b) % prime).min(axis=0).astype(np.uint32)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float((a == b).sum()) / len(a)
+
+
+def band_buckets(signature):
+    """One bucket ID per band; near-duplicates share at least one with high probability."""
+    rows = len(signature) // BANDS
+    return [
+        int.from_bytes(hashlib.blake2b(signature[i * rows:(i + 1) * rows].tobytes(), digest_size=8).digest(), "big", signed=True)
+        for i in range(BANDS)
+    ]
+
+
+def parts_text(parts):
+    """Text of rendered resume parts, or None if any page went as an image (its text is unknown)."""
+    if any("text" not in part for part in parts):
+        return None
+    return "\n".join(part["text"] for part in parts)
+
+
+def resume_signature(sandbox, pdf_bytes, max_pages):
+    # Extracted in the render sandbox; a PDF it refuses or cannot read just has no signature
+    try:
+        return minhash(sandbox.extract_text(pdf_bytes, max_pages=max_pages))
+    except PdfRejected:
+        return None
+
+
+def group_near_duplicates(signatures, threshold):
+    """
+    Group near-duplicates within a batch.
+
+    Args:
+        signatures (dict): Name -> signature (None for texts without one);
+            the first of each group, in this order, represents the group
+        threshold (float): Minimum estimated similarity
+
+    Returns:
+        dict: Duplicate name -> (representative name, similarity); representatives are not included
+    """
+    buckets = {}
+    duplicates = {}
+    for name, signature in signatures.items():
+        if signature is None:
+            continue
+        keys = [(band, bucket) for band, bucket in enumerate(band_buckets(signature))]
+        candidates = dict.fromkeys(other for key in keys for other in buckets.get(key, ()))
+        best = max(((similarity(signature, signatures[other]), other) for other in candidates), default=(0, None))
+        if best[0] >= threshold:
+            duplicates[name] = (best[1], best[0])
+            continue
+        for key in keys:
+            buckets.setdefault(key, []).append(name)
+    return duplicates
+
+
+class NearDuplicateIndex:
+    """
+    Persistent LSH index mapping texts to the first near-duplicate seen.
+
+    Args:
+        path (str): SQLite database file
+        threshold (float): Minimum estimated similarity for two texts to count as near-duplicates
+        reuse (bool): Key near-duplicates as their earlier copy (see request_identities); otherwise only flag them
+        ttl_seconds (int): Forget texts first seen longer ago than this
+    """
+
+    def __init__(self, path, threshold=0.9, reuse=False, ttl_seconds=7 * 24 * 3600):
+        self.path = path
+        self.threshold = threshold
+        self.reuse = reuse
+        self.ttl_seconds = ttl_seconds
+        self._memo = {}  # (kind, key) -> (canonical key, similarity); a text's group never changes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS signatures (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands (kind TEXT NOT NULL, band INTEGER NOT NULL, bucket INTEGER NOT NULL, key TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (kind, band, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signatures_created ON signatures (created)")
+        self._conn.commit()
+
+    def _nearest(self, kind, signature, buckets):
+        clauses = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+        params = [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+        rows = self._conn.execute(
+            f"""SELECT s.key, s.signature FROM signatures s WHERE s.kind = ? AND s.created >= ? AND s.key IN (
+                SELECT key FROM bands WHERE kind = ? AND ({clauses}))""",
+            [kind, time.time() - self.ttl_seconds, kind, *params],
+        ).fetchall()
+        import numpy as np
+        best = (None, 0.0)
+        for key, blob in rows:
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score > best[1]:
+                best = (key, score)
+        return best
+
+    def lookup(self, kind, key, signature):
+        """
+        Find an earlier near-duplicate without recording this text.
+
+        Returns:
+            tuple: (key, similarity) of the closest earlier text at or above the threshold, or None
+        """
+        with self._lock:
+            nearest, score = self._nearest(kind, signature, band_buckets(signature))
+        return (nearest, score) if nearest is not None and nearest != key and score >= self.threshold else None
+
+    def canonical(self, kind, key, signature):
+        """
+        Return the key of the group `key` belongs to, recording it as a new group if it has no near-duplicate.
+
+        Args:
+            kind (str): "resume" or "job_description"
+            key (str): Exact fingerprint of the text
+            signature (np.ndarray): minhash() of the text
+
+        Returns:
+            tuple: (group key, similarity to it)
+        """
+        memo_key = (kind, key)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        buckets = band_buckets(signature)
+        with self._lock:
+            nearest, score = self._nearest(kind, signature, buckets)
+            if nearest is None or score < self.threshold:
+                nearest, score = key, 1.0
+                now = time.time()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signatures (kind, key, signature, created) VALUES (?, ?, ?, ?)",
+                    (kind, key, signature.tobytes(), now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO bands (kind, band, bucket, key) VALUES (?, ?, ?, ?)",
+                    [(kind, band, bucket, key) for band, bucket in enumerate(buckets)],
+                )
+                self._evict(now)
+                self._conn.commit()
+            self._memo[memo_key] = (nearest, score)
+        return nearest, score
+
+    def _evict(self, now):
+        expired = self._conn.execute(
+            "SELECT kind, key FROM signatures WHERE created < ?", (now - self.ttl_seconds,)
+        ).fetchall()
+        if expired:
+            self._conn.executemany("DELETE FROM bands WHERE kind = ? AND key = ?", expired)
+            self._conn.executemany("DELETE FROM signatures WHERE kind = ? AND key = ?", expired)
+
+    def _identity(self, kind, key, text, label):
+        signature = minhash(text) if text else None
+        if signature is None:
+            return None
+        group, score = self.canonical(kind, key, signature)
+        if group != key:
+            action = "reused" if self.reuse else "flagged"
+            METRICS.inc("resume_near_duplicates_total", kind=kind, action=action)
+            log_event("near_duplicate", kind=kind, prompt=label, similarity=round(score, 3), action=action)
+        return group if self.reuse else None
+
+    def request_identities(self, resume_parts, sent_parts, sections, job_description, label, extra_parts=None):
+        """
+        Resume and job description identities for a response cache key.
+
+        In reuse mode a near-duplicate is identified by its group, so it
+        shares cached responses with the earlier copy; otherwise (and for
+        texts too short to compare, or resumes sent as images) by its exact
+        content.
+
+        Args:
+            resume_parts (list): The whole rendered resume, without extra parts
+            sent_parts (list): The parts actually sent (after section pruning, with extra parts)
+            sections (tuple): Sections the parts were pruned to, None if not pruned
+            job_description (str): Job description as sent
+            label (str): Prompt name label for metrics
+            extra_parts (list): Parts sent after the resume (e.g. grounding), which are
+                not part of the resume's near-duplicate identity but still set the key
+
+        Returns:
+            tuple: (resume identity, job description identity) for response_cache.make_response_key
+        """
+        resume_group = self._identity("resume", fingerprint_parts(resume_parts), parts_text(resume_parts), label)
+        normalized = normalize_job_description(job_description)
+        job_group = self._identity(
+            "job_description", hashlib.sha256(normalized.encode()).hexdigest(), normalized, label
+        )
+        if resume_group:
+            resume_id = fingerprint_parts([resume_group, sections, extra_parts] if extra_parts else [resume_group, sections])
+        else:
+            resume_id = fingerprint_parts(sent_parts)
+        return resume_id, f"near-duplicate:{job_group}" if job_group else job_description
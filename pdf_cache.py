@@ -0,0 +1,173 @@
+"""Content-addressed cache for rendered resume pages.
+
+Rendering a PDF to model-ready parts is deterministic for a given file and
+set of render settings, so results are keyed by a SHA-256 of both. Lookups go
+to a small in-process LRU first and fall back to an on-disk store that
+survives restarts. Both tiers are bounded by bytes, not entry count.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def make_cache_key(pdf_bytes, settings):
+    """
+    Build the cache key for a PDF and its render settings.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF file contents
+        settings (dict): JSON-serializable render settings
+
+    Returns:
+        str: Hex digest identifying this exact render
+    """
+    digest = hashlib.sha256()
+    digest.update(pdf_bytes)
+    digest.update(b"\0")
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _encode_bytes(value):
+    # Image parts carry raw bytes; JSON on disk needs them tagged as base64
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"__b64__": base64.b64encode(value).decode()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode_bytes(obj):
+    if len(obj) == 1 and "__b64__" in obj:
+        return base64.b64decode(obj["__b64__"])
+    return obj
+
+
+def dumps(value):
+    return json.dumps(value, default=_encode_bytes).encode()
+
+
+def loads(payload):
+    return json.loads(payload, object_hook=_decode_bytes)
+
+
+class PdfRenderCache:
+    """Two-tier (memory + disk) cache for rendered resumes (pdf_render.render_pdf output)."""
+
+    def __init__(self, cache_dir, memory_limit_bytes=64 * 1024 * 1024, disk_limit_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_limit_bytes = memory_limit_bytes
+        self.disk_limit_bytes = disk_limit_bytes
+        self._memory = OrderedDict()  # key -> (parts, size)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_or_render(self, pdf_bytes, settings, render):
+        """Return cached parts for this PDF, calling `render(pdf_bytes)` on a miss."""
+        key = make_cache_key(pdf_bytes, settings)
+        parts = self.get(key)
+        if parts is None:
+            parts = render(pdf_bytes)
+            self.put(key, parts)
+        return parts
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry[0]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+        except OSError:
+            return None
+        try:
+            parts = loads(payload)
+        except ValueError:
+            # Truncated or corrupt file; drop it and treat as a miss.
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # mark as recently used for disk eviction
+        except OSError:
+            pass
+        self._remember(key, parts, len(payload))
+        return parts
+
+    def put(self, key, parts):
+        payload = dumps(parts)
+        self._remember(key, parts, len(payload))
+        self._write(key, payload)
+        self._evict_disk()
+
+    def _remember(self, key, parts, size):
+        if size > self.memory_limit_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+            self._memory[key] = (parts, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_limit_bytes:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _write(self, key, payload):
+        # Write to a temp file and rename so readers never see a partial entry.
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError:
+            return  # disk tier is best-effort
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # e.g. disk full: don't leave the partial temp file behind
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return
+        if total <= self.disk_limit_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_limit_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,251 @@
+"""Convert resume PDFs into Gemini parts.
+
+Pages with a usable text layer are sent as plain text, which is far smaller
+than an image and cheaper for the model to read; scanned or image-only pages
+are rasterized. Image bytes are passed to the Gemini client as-is rather than
+base64 strings, and the encoder can trade format, quality and resolution
+against a per-page size target (see rasterize_page).
+
+Each page is converted independently in a shared process pool so a
+multi-page resume takes roughly as long as its slowest page. PyMuPDF holds
+the GIL while rendering, which is why this uses processes rather than
+threads; single-page documents are converted inline to skip the IPC cost.
+"""
+
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from resume_sections import section_parts, segment_pdf
+
+# PyMuPDF and Pillow are imported inside the functions that use them: loading
+# them costs the Streamlit app a few hundred milliseconds at startup before
+# any resume has been uploaded.
+
+DEFAULT_MAX_PAGES = 3
+DEFAULT_DPI = 72  # PyMuPDF's default pixmap resolution
+
+MODE_AUTO = "auto"
+MODE_IMAGE = "image"
+MODE_TEXT = "text"
+
+# Text-layer heuristics, see has_text_layer
+MIN_TEXT_CHARS = 200
+DENSE_TEXT_CHARS = 1000
+MAX_GARBLED_RATIO = 0.05
+MAX_IMAGE_COVERAGE = 0.5
+
+# Image encoding, see rasterize_page. "auto" tries every lossy format and keeps the smallest.
+DEFAULT_IMAGE_OPTIONS = {
+    "format": "auto",     # "auto", "jpeg", "webp" or "png"
+    "quality": 75,        # starting JPEG/WebP quality
+    "grayscale": True,    # resumes rarely need colour to be read
+    "target_bytes": 0,    # per-page size target; 0 disables the search
+    "min_quality": 40,    # never go below this quality to hit the target...
+    "min_dpi": 72,        # ...or below this resolution, so text stays legible
+}
+AUTO_FORMATS = ("webp", "jpeg")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=None):
+    """Return the process pool shared by every render in this process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+        return _executor
+
+
+def count_pages(pdf_bytes):
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return doc.page_count
+
+
+def has_text_layer(page, text):
+    """
+    Decide whether a page's extracted text can stand in for its image.
+
+    Scanned and image-only pages come back with little or no text, and PDFs
+    with broken font encodings come back as replacement characters. Pages
+    mostly covered by images with only a caption's worth of text are also
+    sent as images so the model sees what the text layer is missing.
+    """
+    import fitz
+    stripped = text.strip()
+    if len(stripped) < MIN_TEXT_CHARS:
+        return False
+    if stripped.count("\ufffd") / len(stripped) > MAX_GARBLED_RATIO:
+        return False
+    page_area = abs(page.rect) or 1
+    image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    if image_area / page_area > MAX_IMAGE_COVERAGE and len(stripped) < DENSE_TEXT_CHARS:
+        return False
+    return True
+
+
+def encode_pixmap(pix, image_format, quality):
+    """
+    Encode a pixmap without intermediate copies of the pixel data.
+
+    JPEG and PNG come straight from PyMuPDF. WebP goes through Pillow, which
+    reads the pixmap's buffer in place via samples_mv.
+    """
+    if image_format == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=quality)
+    if image_format == "png":
+        return pix.tobytes("png")
+    from PIL import Image
+    mode = "L" if pix.n == 1 else "RGB"
+    image = Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1)
+    out = io.BytesIO()
+    image.save(out, "WEBP", quality=quality)
+    return out.getvalue()
+
+
+def rasterize_page(page, dpi, options):
+    """
+    Render and encode a page, searching for the smallest legible payload.
+
+    Every candidate format is tried at the starting quality and the smallest
+    result kept. If that is still over options["target_bytes"], quality is
+    lowered towards options["min_quality"], then resolution towards
+    options["min_dpi"], until the target is met or both floors are reached.
+
+    Returns:
+        tuple: (image bytes, format, dpi, quality)
+    """
+    import fitz
+    formats = AUTO_FORMATS if options["format"] == "auto" else (options["format"],)
+    colorspace = fitz.csGRAY if options["grayscale"] else fitz.csRGB
+    target = options["target_bytes"]
+    quality = options["quality"]
+    pix = None
+    while True:
+        if pix is None:
+            pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+        data, image_format = min(
+            ((encode_pixmap(pix, image_format, quality), image_format) for image_format in formats),
+            key=lambda candidate: len(candidate[0]),
+        )
+        if not target or len(data) <= target or image_format == "png":
+            return data, image_format, dpi, quality
+        if quality > options["min_quality"]:
+            quality = max(options["min_quality"], quality - 15)
+        elif dpi > options["min_dpi"]:
+            dpi = max(options["min_dpi"], int(dpi * 0.8))
+            pix = None
+        else:
+            return data, image_format, dpi, quality
+
+
+def render_page(pdf_bytes, page_number, dpi=DEFAULT_DPI, mode=MODE_AUTO, image_options=None):
+    """
+    Convert a single page to a Gemini part.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF file contents
+        page_number (int): Zero-based page index
+        dpi (int): Rasterization resolution for image pages
+        mode (str): MODE_AUTO to prefer the text layer, MODE_IMAGE to always rasterize
+        image_options (dict): Overrides for DEFAULT_IMAGE_OPTIONS
+
+    Returns:
+        tuple: (part, metadata) where metadata records the page number,
+        the mode used and the payload size in bytes, plus format, dpi,
+        quality and encode time for image pages
+    """
+    import fitz
+    options = {**DEFAULT_IMAGE_OPTIONS, **(image_options or {})}
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page = doc.load_page(page_number)
+        if mode == MODE_AUTO:
+            text = page.get_text("text", sort=True)
+            if has_text_layer(page, text):
+                part = {"text": f"[Resume page {page_number + 1}]\n{text.strip()}"}
+                meta = {"page": page_number, "mode": MODE_TEXT, "bytes": len(part["text"].encode())}
+                return part, meta
+        started = time.perf_counter()
+        data, image_format, used_dpi, quality = rasterize_page(page, dpi, options)
+        encode_ms = (time.perf_counter() - started) * 1000
+    part = {"mime_type": f"image/{image_format}", "data": data}
+    meta = {
+        "page": page_number,
+        "mode": MODE_IMAGE,
+        "bytes": len(data),
+        "format": image_format,
+        "dpi": used_dpi,
+        "quality": None if image_format == "png" else quality,
+        "encode_ms": round(encode_ms, 2),
+    }
+    return part, meta
+
+
+def render_pdf(pdf_bytes, max_pages=DEFAULT_MAX_PAGES, dpi=DEFAULT_DPI, mode=MODE_AUTO, max_workers=None, parallel=True,
+               image_options=None):
+    """
+    Convert up to `max_pages` pages of a PDF, in page order.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF file contents
+        max_pages (int): Upper bound on the number of pages converted
+        dpi (int): Rasterization resolution for image pages
+        mode (str): MODE_AUTO or MODE_IMAGE, see render_page
+        max_workers (int): Size of the shared process pool on first use
+        parallel (bool): Set to False to convert pages one after another in
+            this process, e.g. when already running inside a worker pool
+        image_options (dict): Overrides for DEFAULT_IMAGE_OPTIONS
+
+    Returns:
+        dict: "parts" is the ordered list of Gemini parts, "pages" the
+        per-page metadata and "sections" the resume sections found. When
+        every page is sent as text and its section headings are recognised,
+        the parts are one per section (see resume_sections) instead of one
+        per page, so analyses can leave out sections they do not read.
+    """
+    page_total = min(count_pages(pdf_bytes), max_pages)
+    if page_total <= 1 or not parallel:
+        results = [render_page(pdf_bytes, n, dpi, mode, image_options) for n in range(page_total)]
+    else:
+        executor = get_executor(max_workers)
+        futures = [executor.submit(render_page, pdf_bytes, n, dpi, mode, image_options) for n in range(page_total)]
+        results = [future.result() for future in futures]
+    sections = segment_pdf(pdf_bytes, page_total) if all_text(results) else None
+    return collect_pages(results, sections)
+
+
+def all_text(results):
+    """True if every page in render_page results went as text, so the document can be split into sections."""
+    return bool(results) and all(meta["mode"] == MODE_TEXT for _, meta in results)
+
+
+def collect_pages(results, sections):
+    """Build render_pdf's result from render_page results in page order and the segment_pdf sections (or None)."""
+    parts = [part for part, _ in results]
+    return {
+        "parts": section_parts(sections) if sections else parts,
+        "pages": [meta for _, meta in results],
+        "sections": [section for section, _ in sections] if sections else [],
+    }
+
+
+def render_pdf_parts(pdf_bytes, **kwargs):
+    """Like render_pdf, but return only the list of parts."""
+    return render_pdf(pdf_bytes, **kwargs)["parts"]
+
+
+def extract_text(pdf_bytes, max_pages=None):
+    """
+    Return the text layer of the first `max_pages` pages (all pages if None).
+
+    Scanned pages contribute nothing, so callers should treat an empty or very
+    short result as "no usable text" rather than as an empty resume.
+    """
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_total = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
+        return "\n".join(doc.load_page(n).get_text("text", sort=True) for n in range(page_total))
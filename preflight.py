@@ -0,0 +1,287 @@
+"""Token preflight for model requests: job description compression and budgets.
+
+Job descriptions pasted into the app are often mostly boilerplate (equal
+opportunity statements, benefits, company history, how to apply) that says
+nothing about the role, and the whole text is resent with every analysis.
+Before a request is built:
+
+- compress_job_description() drops boilerplate and repeated sentences.
+  Boilerplate is recognised locally: whole sections under headings such as
+  "About us" or "Benefits", and sentences whose weighted cue phrases
+  ("equal opportunity", "401(k)", "founded in") outweigh the cues that they
+  describe the role itself (requirements wording and taxonomy skills).
+- fit_to_budget() enforces a per-prompt input token budget by dropping the
+  job description lines that say least about the role, then truncating.
+
+Token counts are the same local estimate the admission controller uses
+(scheduler.estimate_tokens), so the preflight costs no API call.
+"""
+
+import re
+from functools import lru_cache
+
+from metrics import METRICS, log_event
+from scheduler import CHARS_PER_TOKEN, estimate_tokens
+from skill_matcher import get_default_matcher
+
+# Cue phrase -> weight, per boilerplate category
+BOILERPLATE_CUES = {
+    "eeo": {
+        "equal opportunity": 3, "equal employment": 3, "without regard to": 3, "affirmative action": 3,
+        "e-verify": 3, "discriminat": 2, "reasonable accommodation": 2.5, "national origin": 2,
+        "sexual orientation": 2, "gender identity": 2, "religion": 1.5, "veteran": 1.5, "disability": 1.5,
+        "race": 1, "protected": 1, "diversity": 1, "diverse": 1, "inclusion": 1, "inclusive": 1,
+    },
+    "benefits": {
+        "benefits": 2, "health insurance": 3, "401(k)": 3, "401k": 3, "paid time off": 3, "parental leave": 3,
+        "dental": 2, "vacation": 2, "pto": 2, "stock options": 2, "wellness": 2, "perks": 2, "retirement": 2,
+        "competitive salary": 2, "insurance": 1.5, "holidays": 1.5, "gym": 1.5, "bonus": 1, "equity": 1,
+        "compensation": 1,
+    },
+    "company": {
+        "about us": 2.5, "our mission": 2.5, "headquartered": 2.5, "leading provider": 2.5, "we are a leading": 2.5,
+        "founded": 2, "our vision": 2, "our values": 2, "our culture": 2, "who we are": 2, "fortune 500": 2,
+        "award-winning": 2, "offices in": 2, "customers worldwide": 2, "we believe": 1.5, "join us": 1.5,
+        "proud to": 1.5, "employees": 1,
+    },
+    "application": {
+        "how to apply": 3, "apply now": 3, "recruitment agencies": 3, "unsolicited": 3, "privacy notice": 3,
+        "privacy policy": 3, "background check": 2.5, "drug screen": 2.5, "to apply": 2, "personal data": 2,
+        "submit your": 1.5, "click": 1,
+    },
+}
+# Cues that a sentence is about the role itself
+ROLE_CUES = {
+    "you will": 2, "responsib": 2, "require": 2, "qualification": 2, "proficien": 2, "knowledge of": 2,
+    "experience": 1.5, "skills": 1.5, "familiar": 1.5, "degree": 1.5, "years": 1, "must": 1, "preferred": 1,
+    "develop": 1, "design": 1, "build": 1, "manage": 1, "lead": 1,
+}
+SKILL_WEIGHT = 2
+# How far boilerplate cues must outweigh role cues before a sentence is dropped
+BOILERPLATE_MARGIN = 2.5
+
+BOILERPLATE_HEADINGS = {
+    "about us": "company", "about the company": "company", "who we are": "company", "our company": "company",
+    "our story": "company", "our mission": "company", "our culture": "company", "company overview": "company",
+    "benefits": "benefits", "perks": "benefits", "perks and benefits": "benefits", "benefits and perks": "benefits",
+    "what we offer": "benefits", "why join us": "benefits", "why work here": "benefits", "compensation and benefits": "benefits",
+    "equal opportunity": "eeo", "equal opportunity employer": "eeo", "eeo statement": "eeo",
+    "diversity and inclusion": "eeo", "how to apply": "application", "application process": "application",
+    "privacy notice": "application",
+}
+# "About <company>" is boilerplate; these "About ..." headings are not
+ROLE_ABOUT_HEADINGS = ("about the role", "about the job", "about the position", "about you", "about the team")
+
+# How each removal reason reads in the app
+REASON_LABELS = {
+    "eeo": "equal opportunity", "benefits": "benefits", "company": "company info", "application": "application notes",
+    "duplicate": "repeats", "budget": "over budget", "sections": "unused resume sections",
+}
+
+BULLET = re.compile(r"^\s*(?:[-*•▪●◦]|\d+[.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+
+class TokenBudgetError(ValueError):
+    """The resume and prompt alone exceed the request's token budget."""
+
+
+def count_tokens(text):
+    return estimate_tokens([{"text": text}]) if text else 0
+
+
+def compile_cues(cues):
+    # Cues match at the start of a word, so "race" does not fire on "trace" nor "pto" on "crypto"
+    return [(re.compile(r"(?<![a-z0-9])" + re.escape(cue)), weight) for cue, weight in cues.items()]
+
+
+BOILERPLATE_PATTERNS = {category: compile_cues(cues) for category, cues in BOILERPLATE_CUES.items()}
+ROLE_PATTERNS = compile_cues(ROLE_CUES)
+
+
+def cue_score(text, patterns):
+    return sum(weight for pattern, weight in patterns if pattern.search(text))
+
+
+def role_score(text):
+    """How much a piece of job description text says about the role: requirement wording plus skills."""
+    lowered = text.lower()
+    return cue_score(lowered, ROLE_PATTERNS) + SKILL_WEIGHT * len(get_default_matcher().find(text))
+
+
+def classify_sentence(sentence):
+    """Return the boilerplate category of a sentence, or None if it should be kept."""
+    lowered = sentence.lower()
+    scores = {category: cue_score(lowered, patterns) for category, patterns in BOILERPLATE_PATTERNS.items()}
+    category = max(scores, key=scores.get)
+    if not scores[category]:
+        return None
+    return category if sum(scores.values()) - role_score(sentence) >= BOILERPLATE_MARGIN else None
+
+
+def heading_category(line, after_blank):
+    """
+    Classify a line that looks like a section heading.
+
+    Returns:
+        str: Boilerplate category, "" for any other heading, or None if the line is not a heading
+    """
+    stripped = line.strip()
+    if BULLET.match(line) or len(stripped) > 60 or len(stripped.split()) > 8:
+        return None
+    if not (stripped.endswith(":") or after_blank) or stripped.rstrip(":")[-1:] in ".!?,;":
+        return None
+    heading = re.sub(r"[^a-z ]", "", stripped.lower().replace("&", " and ")).strip()
+    heading = re.sub(r"\s+", " ", heading)
+    if heading in BOILERPLATE_HEADINGS:
+        return BOILERPLATE_HEADINGS[heading]
+    if heading.startswith("about ") and heading not in ROLE_ABOUT_HEADINGS:
+        return "company"
+    return ""
+
+
+def normalize(sentence):
+    return " ".join(re.findall(r"[a-z0-9+#]+", sentence.lower()))
+
+
+@lru_cache(maxsize=256)
+def compress_job_description(text):
+    """
+    Drop boilerplate sections and sentences, and repeated sentences, from a job description.
+
+    Line structure is kept, so bullets and headings still read as written.
+    Cached per text, since every analysis of a submission sends the same one.
+
+    Returns:
+        dict: "text" (compressed), "tokens_before", "tokens_after" and "removed"
+        (category -> estimated tokens dropped: eeo, benefits, company, application, duplicate)
+    """
+    removed = {}
+    seen = set()
+    kept = []
+    skipping = None
+    skipped_lines = 0
+    after_blank = True
+    for line in text.splitlines():
+        if not line.strip():
+            if kept and kept[-1]:
+                kept.append("")
+            # A boilerplate section runs to the end of its first paragraph or list;
+            # later paragraphs are judged sentence by sentence
+            if skipped_lines:
+                skipping = None
+            after_blank = True
+            continue
+        heading = heading_category(line, after_blank)
+        after_blank = False
+        if heading is not None:
+            skipping = heading or None
+            skipped_lines = 0
+        if skipping:
+            skipped_lines += heading is None
+            removed[skipping] = removed.get(skipping, 0) + len(line) / CHARS_PER_TOKEN
+            continue
+
+        prefix = BULLET.match(line)
+        body = line[prefix.end():] if prefix else line.strip()
+        sentences = []
+        for sentence in SENTENCE_END.split(body):
+            key = normalize(sentence)
+            category = "duplicate" if len(key.split()) >= 3 and key in seen else classify_sentence(sentence)
+            if category:
+                removed[category] = removed.get(category, 0) + len(sentence) / CHARS_PER_TOKEN
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+        if sentences:
+            kept.append((prefix.group(0) if prefix else "") + " ".join(sentences))
+
+    compressed = "\n".join(kept).strip()
+    if not compressed:
+        # Nothing recognisably about the role; send it as written rather than nothing
+        compressed, removed = text.strip(), {}
+    return {
+        "text": compressed,
+        "tokens_before": count_tokens(text),
+        "tokens_after": count_tokens(compressed),
+        "removed": {category: round(tokens) for category, tokens in removed.items()},
+    }
+
+
+def fit_to_budget(job_description, other_tokens, budget):
+    """
+    Shorten a job description so the whole request fits in `budget` input tokens.
+
+    Lines that say least about the role (see role_score) are dropped first,
+    keeping the original order of the rest; a single line that still does
+    not fit is cut at a word boundary.
+
+    Args:
+        job_description (str): Job description text
+        other_tokens (int): Estimated tokens of the rest of the request (resume and prompt)
+        budget (int): Input token budget, 0 for none
+
+    Returns:
+        tuple: (job_description, tokens_saved)
+
+    Raises:
+        TokenBudgetError: If the resume and prompt alone use up the budget
+    """
+    before = count_tokens(job_description)
+    if not budget or other_tokens + before <= budget:
+        return job_description, 0
+    available = budget - other_tokens
+    if available <= 0:
+        raise TokenBudgetError(
+            f"The resume and prompt need about {other_tokens:,} tokens, over this analysis's {budget:,}-token budget"
+        )
+    lines = job_description.splitlines()
+    ranked = sorted(range(len(lines)), key=lambda index: (role_score(lines[index]), -index))
+    dropped = set()
+    for index in ranked:
+        if count_tokens("\n".join(line for i, line in enumerate(lines) if i not in dropped)) <= available:
+            break
+        if len(dropped) == len(lines) - 1:
+            break
+        dropped.add(index)
+    text = "\n".join(line for i, line in enumerate(lines) if i not in dropped)
+    if count_tokens(text) > available:
+        text = text[:max(available - 1, 0) * CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+    return text, before - count_tokens(text)
+
+
+def preflight(job_description, pdf_parts, prompt, label, compress=True, budget=0):
+    """
+    Prepare the job description for one request and record the tokens saved.
+
+    Args:
+        job_description (str): Job description as submitted
+        pdf_parts (list): Resume parts sent with it
+        prompt (str): Prompt text sent with it
+        label (str): Prompt name label for metrics
+        compress (bool): Drop boilerplate and repeated sentences
+        budget (int): Input token budget for the whole request, 0 for none
+
+    Returns:
+        str: The job description to send
+
+    Raises:
+        TokenBudgetError: If the request cannot fit the budget
+    """
+    saved = {}
+    before = count_tokens(job_description)
+    if compress:
+        report = compress_job_description(job_description)
+        job_description = report["text"]
+        saved.update(report["removed"])
+    job_description, saved["budget"] = fit_to_budget(
+        job_description, estimate_tokens(pdf_parts + [{"text": prompt}]), budget
+    )
+    after = count_tokens(job_description)
+    if before == after:
+        return job_description
+    for reason, tokens in saved.items():
+        if tokens:
+            METRICS.inc("resume_preflight_tokens_saved_total", tokens, prompt=label, reason=reason)
+    log_event("preflight", prompt=label, tokens_before=before, tokens_after=after, **{f"saved_{k}": v for k, v in saved.items()})
+    return job_description
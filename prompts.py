@@ -0,0 +1,286 @@
+"""Prompts for Gemini API interactions, shared by the app and the CLI tools."""
+
+from scores import score_instruction
+
+input_prompt1 = """You are an expert HR manager with 15+ years of experience in technical recruitment. Conduct a detailed analysis of the resume against the job description. Your analysis must include:
+
+1. Match Analysis (40% of evaluation):
+   - Exact matching skills and years of experience
+   - Directly relevant project experience
+   - Industry-specific expertise alignment
+   - Required qualifications match
+
+2. Technical Depth (30% of evaluation):
+   - Core technical skills assessment
+   - Tool and technology proficiency levels
+   - Project complexity evaluation
+   - Technical problem-solving evidence
+
+3. Career Progression (20% of evaluation):
+   - Role responsibilities alignment
+   - Career growth trajectory
+   - Leadership/management experience if required
+   - Achievement impact measurement
+
+4. Cultural & Soft Skills (10% of evaluation):
+   - Communication skills evidence
+   - Team collaboration indicators
+   - Problem-solving approach
+   - Cultural fit indicators
+
+Provide a percentage-based match score and detailed bullet points for each category. Be extremely specific with examples from both the resume and job description.""" + score_instruction("input_prompt1")
+
+input_prompt2 = """Perform a comprehensive skills extraction and analysis. For each skill found:
+
+1. Technical Skills:
+   - List each skill with proficiency level (Basic/Intermediate/Expert)
+   - Years of experience with each skill
+   - Context of skill usage in projects
+   - Current industry relevance score (1-10)
+
+2. Tools & Technologies:
+   - Categorize by domain (Development/Testing/DevOps/etc.)
+   - Version/certification information if mentioned
+   - Implementation examples from projects
+   - Industry demand level (High/Medium/Low)
+
+3. Soft Skills:
+   - Evidence-based skill identification
+   - Situation examples demonstrating each skill
+   - Impact metrics where available
+   - Relevance to target role
+
+4. Domain Knowledge:
+   - Industry-specific expertise
+   - Business domain knowledge
+   - Methodologies and frameworks
+   - Compliance and standards knowledge
+
+5. Certifications & Education:
+   - Full certification details with dates
+   - Relevance to target role
+   - Expiration/renewal status
+   - Associated skills coverage
+
+Present findings in a structured format with specific examples for each category."""
+
+input_prompt3 = """As a career development expert, analyze the gap between current profile and job requirements. Provide:
+
+1. Critical Skill Gaps:
+   - Identify missing must-have skills
+   - Current vs required proficiency levels
+   - Specific upskilling recommendations
+   - Estimated time to achieve competency
+
+2. Certification Strategy:
+   - Priority certifications needed
+   - Specific courses with links
+   - Cost and time investment
+   - Expected impact on candidacy
+
+3. Project Portfolio Enhancement:
+   - Specific project suggestions
+   - Technology stack recommendations
+   - Complexity level progression
+   - Portfolio presentation tips
+
+4. Professional Development Plan:
+   - 30/60/90 day learning roadmap
+   - Skill acquisition sequence
+   - Progress tracking metrics
+   - Resource recommendations
+
+Provide detailed, actionable steps with specific resources, timeframes, and expected outcomes."""
+
+input_prompt4 = """Perform a detailed ATS-optimized compatibility analysis:
+
+1. Quantitative Analysis (40%):
+   - Keyword match percentage
+   - Required skills coverage
+   - Experience duration match
+   - Education/certification alignment
+
+2. Qualitative Analysis (30%):
+   - Project relevance scoring
+   - Achievement impact assessment
+   - Leadership experience evaluation
+   - Problem-solving capability match
+
+3. Technical Proficiency (20%):
+   - Tool/technology expertise levels
+   - Programming language proficiency
+   - Framework/methodology alignment
+   - Technical problem-solving evidence
+
+4. Role-Specific Requirements (10%):
+   - Industry experience match
+   - Team size/structure alignment
+   - Budget/project scale experience
+   - Regulatory/compliance knowledge
+
+Calculate sub-scores for each category and provide a weighted total match percentage with detailed explanations.""" + score_instruction("input_prompt4")
+
+input_prompt5 = """Conduct a comprehensive weakness analysis focusing on:
+
+1. Critical Gaps:
+   - Missing essential requirements
+   - Insufficient experience areas
+   - Technical skill deficiencies
+   - Project scale mismatches
+
+2. Presentation Issues:
+   - Impact quantification gaps
+   - Achievement documentation
+   - Technical depth demonstration
+   - Role progression clarity
+
+3. Modern Skill Gaps:
+   - Emerging technology exposure
+   - Industry trend alignment
+   - Methodology/framework currency
+   - Tool/platform proficiency
+
+4. Career Narrative:
+   - Role transition logic
+   - Responsibility progression
+   - Leadership development
+   - Industry focus clarity
+
+For each weakness, provide:
+- Specific evidence from resume
+- Impact on application
+- Detailed improvement strategy
+- Timeline for addressing"""
+
+input_prompt6 = """Perform an in-depth ATS optimization analysis:
+
+1. Keyword Analysis:
+   - Essential keyword coverage
+   - Keyword frequency and placement
+   - Industry-specific terminology
+   - Role-specific language match
+
+2. Format Optimization:
+   - Section structure analysis
+   - Heading standardization
+   - Bullet point formatting
+   - Font and spacing review
+
+3. Content Evaluation:
+   - Action verb usage
+   - Quantifiable achievements
+   - Technical terminology accuracy
+   - Role title alignment
+
+4. ATS Compatibility Score:
+   - Parsing accuracy prediction
+   - Keyword match percentage
+   - Format compliance score
+   - Overall ATS ranking potential
+
+Provide specific recommendations for each section with before/after examples.""" + score_instruction("input_prompt6")
+
+input_prompt7 = """Create a highly targeted cover letter with:
+
+1. Opening Impact (25%):
+   - Company research integration
+   - Role-specific enthusiasm
+   - Cultural alignment indicators
+   - Unique value proposition
+
+2. Experience Alignment (35%):
+   - Key achievement highlights
+   - Relevant project spotlights
+   - Skill match emphasis
+   - Problem-solving examples
+
+3. Company Connection (25%):
+   - Industry knowledge display
+   - Company values alignment
+   - Growth potential emphasis
+   - Future contribution vision
+
+4. Professional Tone (15%):
+   - Confidence balance
+   - Enthusiasm demonstration
+   - Professional language
+   - Call to action
+
+Maintain perfect grammar and professional tone while showcasing genuine enthusiasm."""
+
+input_prompt8 = """Generate strategic deep-dive questions across these areas:
+
+1. Technical Depth:
+   - Project architecture decisions
+   - Technology selection rationale
+   - Problem-solving approaches
+   - Technical challenge resolution
+
+2. Impact Measurement:
+   - Project success metrics
+   - Team influence examples
+   - Business value delivery
+   - Innovation contributions
+
+3. Leadership & Collaboration:
+   - Team dynamics handling
+   - Stakeholder management
+   - Conflict resolution
+   - Mentorship experience
+
+4. Career Development:
+   - Role transition motivation
+   - Skill development strategy
+   - Industry focus selection
+   - Future career vision
+
+Each question should be designed to uncover specific, detailed examples that could strengthen the resume."""
+
+
+# Analyses in display order, keyed by prompt identity
+PROMPTS = {
+    "input_prompt1": input_prompt1,
+    "input_prompt2": input_prompt2,
+    "input_prompt3": input_prompt3,
+    "input_prompt4": input_prompt4,
+    "input_prompt5": input_prompt5,
+    "input_prompt6": input_prompt6,
+    "input_prompt7": input_prompt7,
+    "input_prompt8": input_prompt8,
+}
+
+ANALYSIS_TITLES = {
+    "input_prompt1": "Resume Analysis",
+    "input_prompt2": "Skills Extraction",
+    "input_prompt3": "Skill Improvement",
+    "input_prompt4": "Skills Match",
+    "input_prompt5": "Weakness Analysis",
+    "input_prompt6": "ATS Score",
+    "input_prompt7": "Cover Letter",
+    "input_prompt8": "Strategic Questions",
+}
+
+PROMPT_NAMES = {prompt: name for name, prompt in PROMPTS.items()}
+
+# Resume sections each analysis reads (see resume_sections.py); None sends the whole resume.
+# Analyses that judge the resume as a document (overall fit, weaknesses, ATS formatting) read all of it.
+PROMPT_SECTIONS = {
+    "input_prompt1": None,
+    "input_prompt2": ("summary", "skills", "experience", "projects", "education", "certifications"),
+    "input_prompt3": ("summary", "skills", "experience", "projects", "education", "certifications"),
+    "input_prompt4": ("skills", "experience", "projects", "education", "certifications"),
+    "input_prompt5": None,
+    "input_prompt6": None,
+    "input_prompt7": ("header", "summary", "experience", "projects", "achievements"),
+    "input_prompt8": ("skills", "experience", "projects", "achievements"),
+}
+
+
+def needed_sections(names):
+    """Resume sections read by any of the named analyses, or None if one of them reads the whole resume."""
+    sections = []
+    for name in names:
+        if PROMPT_SECTIONS.get(name) is None:
+            return None
+        sections.extend(section for section in PROMPT_SECTIONS[name] if section not in sections)
+    return tuple(sections)
@@ -0,0 +1,415 @@
+"""Render untrusted PDFs in sandboxed, reusable worker processes.
+
+A single pathological upload (a page hundreds of inches wide, deeply nested
+objects, a decompression bomb) can pin a CPU or balloon memory for as long
+as PyMuPDF works on it, and inside the app or API server process that slows
+every other session. RenderSandbox keeps PyMuPDF out of the serving process:
+each document is converted by one of a small pool of long-lived worker
+processes, under limits.
+
+- Files over the size cap, or without a PDF header, are rejected before any
+  worker sees them.
+- The worker opens the document and refuses it if it has too many pages or
+  a page would rasterize to too many pixels, before converting anything.
+- Each worker caps its own data segment at `max_rss_mb`, so most runaway
+  allocations fail inside it and come back as a "memory" rejection.
+- The caller waits at most `timeout_seconds` and checks the worker's
+  resident memory while it waits, as a backstop for memory the data limit
+  does not count. A worker over either limit is killed and a fresh one
+  takes its place, so a bad file costs one worker restart and requests on
+  the other workers are not held up.
+- The pages of a document are converted on several workers at once, as
+  render_pdf does in its own process pool, so sandboxing does not make
+  multi-page resumes slower.
+- Rejections that depend only on the file are remembered by content hash, so
+  a Streamlit rerun or a retried upload of the same file fails at once.
+  Timeouts, memory kills and crashes can be down to load on the machine, so
+  those files are tried again.
+
+Workers are started with "spawn" rather than fork: the app and API server
+run threads, which fork does not copy safely. A spawned process normally
+re-runs the parent's main script first; under Streamlit that is app.py
+(the script runner installs it as __main__), which would start a sandbox
+of its own inside the worker, so the main script is hidden from workers
+while they start. The memory limits need the
+resource module and /proc, so on systems without them only the time, page
+and pixel limits apply.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS, log_event
+from pdf_render import (
+    DEFAULT_DPI, DEFAULT_MAX_PAGES, MODE_AUTO, all_text, collect_pages, extract_text, render_page, render_pdf,
+)
+from resume_sections import segment_pdf
+
+logger = logging.getLogger("resume_analyzer.render")
+
+DEFAULT_LIMITS = {
+    "timeout_seconds": 15,
+    "max_rss_mb": 512,
+    "max_file_mb": 10,
+    "max_document_pages": 100,
+    "max_page_pixels": 25_000_000,  # a Letter page at 300 dpi is about 8.4 million
+}
+# Workers are replaced after this many documents so heap fragmentation cannot build up
+JOBS_PER_WORKER = 200
+# Lower scheduling priority, so rendering yields the CPU to the server threads answering other sessions
+WORKER_NICENESS = 5
+POLL_SECONDS = 0.02
+STARTUP_SECONDS = 60
+REJECTIONS_REMEMBERED = 1024
+# Rejections that say something about the file itself rather than about how busy the machine was
+REMEMBERED_REASONS = frozenset({"size", "format", "pages", "pixels", "unreadable"})
+HEADER_SEARCH_BYTES = 1024  # PDF readers accept junk before the "%PDF-" header, up to about this far
+
+_start_lock = threading.Lock()
+
+
+class PdfRejected(ValueError):
+    """A PDF the sandbox would not convert; `reason` names the limit it hit."""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+class SandboxUnavailable(RuntimeError):
+    """A render worker could not be started; says nothing about the PDF being converted."""
+
+
+def resident_mb(pid):
+    """Resident memory of a process in MB, or None where /proc is not available."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def check_document(pdf_bytes, max_pages, dpi, limits):
+    """
+    Refuse documents over the page or pixel limits; runs in the worker before any conversion.
+
+    Returns:
+        int: Number of pages to convert, at most `max_pages` (all pages if None)
+
+    Raises:
+        PdfRejected: With reason "pages" or "pixels"
+    """
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if doc.page_count > limits["max_document_pages"]:
+            raise PdfRejected(
+                "pages", f"the PDF has {doc.page_count} pages; at most {limits['max_document_pages']} are accepted"
+            )
+        page_total = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
+        if dpi is None:
+            return page_total
+        scale = dpi / 72
+        for number in range(page_total):
+            rect = doc.load_page(number).rect
+            if rect.width * scale * rect.height * scale > limits["max_page_pixels"]:
+                raise PdfRejected(
+                    "pixels", f"page {number + 1} is {rect.width / 72:.0f} x {rect.height / 72:.0f} inches, too large to render"
+                )
+        return page_total
+
+
+def checked_document(pdf_bytes, limits, max_pages, dpi):
+    return check_document(pdf_bytes, max_pages, dpi, limits)
+
+
+def checked_render(pdf_bytes, limits, max_pages=DEFAULT_MAX_PAGES, dpi=DEFAULT_DPI, **kwargs):
+    check_document(pdf_bytes, max_pages, dpi, limits)
+    # Pages go one after another: the worker is already one of a pool
+    return render_pdf(pdf_bytes, max_pages=max_pages, dpi=dpi, parallel=False, **kwargs)
+
+
+def checked_page(pdf_bytes, limits, page_number, **kwargs):
+    # RenderSandbox.render runs "check" on the document before asking for any of its pages
+    return render_page(pdf_bytes, page_number, **kwargs)
+
+
+def document_sections(pdf_bytes, limits, page_total):
+    return segment_pdf(pdf_bytes, page_total)
+
+
+def checked_text(pdf_bytes, limits, max_pages=None):
+    # Text extraction never rasterizes, so page size does not matter
+    check_document(pdf_bytes, max_pages, None, limits)
+    return extract_text(pdf_bytes, max_pages=max_pages)
+
+
+TASKS = {
+    "render": checked_render,
+    "check": checked_document,
+    "page": checked_page,
+    "sections": document_sections,
+    "text": checked_text,
+}
+
+
+def limit_memory(max_rss_mb):
+    """Cap the worker's data segment, so allocations past the limit fail in the worker instead of growing until it is killed."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    limit = int(max_rss_mb * 2**20)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+
+def document_errors(fitz):
+    """Exception types PyMuPDF raises for a bad document; newer releases add MuPDF's own error classes."""
+    mupdf_error = getattr(getattr(fitz, "mupdf", None), "FzErrorBase", None)
+    return (RuntimeError, ValueError) + ((mupdf_error,) if mupdf_error else ())
+
+
+def worker_main(conn, limits):
+    """Worker process loop: run jobs from `conn` until it closes or sends None."""
+    if hasattr(os, "nice"):
+        os.nice(WORKER_NICENESS)
+    import fitz  # loaded once up front rather than during the first job's time limit
+    bad_document = document_errors(fitz)
+    limit_memory(limits["max_rss_mb"])
+    conn.send(("ready",))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        task, pdf_bytes, kwargs = job
+        try:
+            reply = ("ok", TASKS[task](pdf_bytes, limits, **kwargs))
+        except PdfRejected as e:
+            reply = ("rejected", e.reason, str(e))
+        except MemoryError:
+            reply = ("rejected", "memory", "the PDF needs too much memory to render")
+        except bad_document as e:
+            if "malloc" in str(e):
+                # MuPDF reports its own allocations failing under the memory limit this way
+                reply = ("rejected", "memory", "the PDF needs too much memory to render")
+            else:
+                reply = ("rejected", "unreadable", str(e) or type(e).__name__)
+        except Exception:
+            # A bug on our side rather than a bad file: keep the traceback, and do not blame the PDF for good
+            logger.exception("PDF %s task failed", task)
+            reply = ("rejected", "error", "the PDF renderer failed unexpectedly on this file")
+        conn.send(reply)
+
+
+def start_without_main(process):
+    """Start a spawned process without re-running the parent's main script in it; worker_main needs nothing from it."""
+    with _start_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            process.start()
+        finally:
+            sys.modules["__main__"] = main
+
+
+class Worker:
+    def __init__(self, context, limits):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_conn, limits), name="pdf-render", daemon=True)
+        start_without_main(self.process)
+        child_conn.close()
+        self.jobs = 0
+        self.ready = False
+
+    def wait_ready(self):
+        """
+        Wait for the worker to finish starting, so start-up time is not counted against a job.
+
+        Raises:
+            SandboxUnavailable: The worker exited or hung while starting
+        """
+        try:
+            if self.conn.poll(STARTUP_SECONDS) and self.conn.recv() == ("ready",):
+                self.ready = True
+                return
+        except (EOFError, OSError):
+            pass
+        self.kill()
+        raise SandboxUnavailable("the PDF render worker failed to start")
+
+    def run(self, job, timeout_seconds, max_rss_mb):
+        """
+        Send one job and wait for its reply.
+
+        Returns:
+            tuple: The worker's reply, or ("killed", reason, message) if the
+            worker was stopped or died, after which it must not be reused
+        """
+        if not self.ready:
+            self.wait_ready()
+        self.jobs += 1
+        try:
+            self.conn.send(job)
+            deadline = time.monotonic() + timeout_seconds
+            while not self.conn.poll(POLL_SECONDS):
+                if time.monotonic() > deadline:
+                    self.kill()
+                    return "killed", "timeout", f"rendering took longer than {timeout_seconds:g} seconds"
+                rss = resident_mb(self.process.pid)
+                if rss is not None and rss > max_rss_mb:
+                    self.kill()
+                    return "killed", "memory", f"rendering needed more than {max_rss_mb:g} MB of memory"
+            return self.conn.recv()
+        except (EOFError, OSError):
+            # The worker died mid-job, e.g. killed by the OS or a crash inside MuPDF
+            self.kill()
+            return "killed", "crashed", "the PDF renderer crashed on this file"
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+    def retire(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class RenderSandbox:
+    """
+    Pool of worker processes converting PDFs under time, memory, page and pixel limits.
+
+    Args:
+        workers (int): Worker processes; also the number of pages converted at once
+        **limits: Overrides for DEFAULT_LIMITS
+    """
+
+    def __init__(self, workers=2, **limits):
+        self.workers = workers
+        self.limits = {**DEFAULT_LIMITS, **limits}
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(Worker(self._context, self.limits))
+        self._rejected = OrderedDict()  # sha256 -> (reason, message)
+        self._lock = threading.Lock()
+        self._pages = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-page") if workers > 1 else None
+
+    def render(self, pdf_bytes, max_pages=DEFAULT_MAX_PAGES, dpi=DEFAULT_DPI, mode=MODE_AUTO, image_options=None):
+        """
+        pdf_render.render_pdf in worker processes.
+
+        With more than one worker the document is checked first, then its
+        pages are converted on separate workers and its sections found; the
+        time limit applies to each of those steps.
+
+        Raises:
+            PdfRejected: The file is not a PDF, is over a limit, or could not be read
+            SandboxUnavailable: A worker could not be started
+        """
+        options = {"dpi": dpi, "mode": mode, "image_options": image_options}
+        if self._pages is None or max_pages <= 1:
+            return self._run("render", pdf_bytes, {"max_pages": max_pages, **options})
+        page_total = self._run("check", pdf_bytes, {"max_pages": max_pages, "dpi": dpi})
+        futures = [
+            self._pages.submit(self._run, "page", pdf_bytes, {"page_number": n, **options}) for n in range(page_total)
+        ]
+        results = [future.result() for future in futures]
+        sections = self._run("sections", pdf_bytes, {"page_total": page_total}) if all_text(results) else None
+        return collect_pages(results, sections)
+
+    def extract_text(self, pdf_bytes, max_pages=None):
+        """
+        pdf_render.extract_text in a worker process.
+
+        Raises:
+            PdfRejected: The file is not a PDF, is over a limit, or could not be read
+            SandboxUnavailable: A worker could not be started
+        """
+        return self._run("text", pdf_bytes, {"max_pages": max_pages})
+
+    def _run(self, task, pdf_bytes, kwargs):
+        max_bytes = self.limits["max_file_mb"] * 2**20
+        if len(pdf_bytes) > max_bytes:
+            self._reject("size", f"the file is {len(pdf_bytes) / 2**20:.1f} MB; at most {self.limits['max_file_mb']:g} MB is accepted", pdf_bytes)
+        if b"%PDF-" not in pdf_bytes[:HEADER_SEARCH_BYTES]:
+            self._reject("format", "the file is not a PDF", pdf_bytes)
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        with self._lock:
+            earlier = self._rejected.get(digest)
+        if earlier is not None:
+            raise PdfRejected(*earlier)
+
+        worker = self._idle.get()
+        reply = None
+        try:
+            reply = worker.run((task, pdf_bytes, kwargs), self.limits["timeout_seconds"], self.limits["max_rss_mb"])
+        finally:
+            # A worker that ran out of memory or hit an unexpected error may be left in a bad state
+            spent = reply is None or reply[0] != "ok" and reply[1] in ("memory", "error")
+            if worker.process.is_alive() and worker.jobs < JOBS_PER_WORKER and not spent:
+                self._idle.put(worker)
+            else:
+                if worker.process.is_alive():
+                    worker.retire()
+                self._idle.put(Worker(self._context, self.limits))
+        if reply[0] == "ok":
+            return reply[1]
+        _, reason, message = reply
+        if reason in REMEMBERED_REASONS:
+            with self._lock:
+                self._rejected[digest] = (reason, message)
+                if len(self._rejected) > REJECTIONS_REMEMBERED:
+                    self._rejected.popitem(last=False)
+        self._reject(reason, message, pdf_bytes)
+
+    def _reject(self, reason, message, pdf_bytes):
+        METRICS.inc("resume_pdf_rejected_total", reason=reason)
+        log_event("pdf_rejected", reason=reason, bytes=len(pdf_bytes), message=message)
+        raise PdfRejected(reason, message)
+
+    def wait_ready(self):
+        """
+        Wait for every worker to finish starting, e.g. before timing the process that started them.
+
+        Raises:
+            SandboxUnavailable: A worker could not be started
+        """
+        workers = [self._idle.get() for _ in range(self.workers)]
+        try:
+            for worker in workers:
+                if not worker.ready:
+                    worker.wait_ready()
+        finally:
+            for worker in workers:
+                self._idle.put(worker if worker.process.is_alive() else Worker(self._context, self.limits))
+
+    def close(self):
+        """Stop the idle workers; documents still converting finish first."""
+        if self._pages is not None:
+            self._pages.shutdown()
+        for _ in range(self.workers):
+            self._idle.get().retire()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
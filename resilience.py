@@ -0,0 +1,276 @@
+"""Single-flight coalescing and rate-limit-aware retries for model calls.
+
+When identical requests (same resume, job description, prompt and model)
+arrive while one is already running, they wait for that call and share its
+result instead of starting their own. This works across threads (Streamlit
+sessions, the bulk CLI) and across the app's event loop.
+
+Calls rejected with 429 or a 5xx status are retried with exponential
+backoff and full jitter. A retry hint from the server overrides the
+computed delay; the hint can come from a Retry-After header, a RetryInfo
+error detail or a "retry in 12s" message. Retries stop after a fixed
+number of attempts or once the next wait would pass the overall deadline,
+and the last error is then raised to the caller.
+"""
+
+import asyncio
+import email.utils
+import random
+import re
+import threading
+import time
+
+from metrics import METRICS
+
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+# gRPC status names that mean the same as the HTTP codes above
+GRPC_STATUS = {
+    "RESOURCE_EXHAUSTED": 429,
+    "UNAVAILABLE": 503,
+    "INTERNAL": 500,
+    "DEADLINE_EXCEEDED": 504,
+}
+RETRY_IN_PATTERN = re.compile(r"retry in\s+([\d.]+)\s*(ms|s)\b", re.IGNORECASE)
+
+
+def error_status(error):
+    """HTTP-style status code of a client error, or None if it has none."""
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if callable(code):
+            code = code()  # grpc.RpcError.code() returns a StatusCode enum
+        if isinstance(code, int):
+            return code
+        name = getattr(code, "name", None)
+        if name in GRPC_STATUS:
+            return GRPC_STATUS[name]
+    return None
+
+
+def retry_after_seconds(error):
+    """
+    Read the server's retry hint from an error.
+
+    Returns:
+        float: Seconds to wait, or None if the error carries no hint
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(when.timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    for detail in getattr(error, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+    match = RETRY_IN_PATTERN.search(str(error))
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if match.group(2).lower() == "ms" else seconds
+    return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, capped per wait and overall.
+
+    Args:
+        max_retries (int): Retries after the first attempt
+        base_delay (float): Upper bound of the first jittered wait, in seconds
+        max_delay (float): Upper bound of any computed wait, in seconds
+        deadline (float): Give up instead of waiting past this many seconds since the first attempt
+    """
+
+    def __init__(self, max_retries=4, base_delay=1.0, max_delay=30.0, deadline=120.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def next_delay(self, attempt, error, elapsed):
+        """Seconds to wait before retry number `attempt + 1`, or None to give up."""
+        if attempt >= self.max_retries or error_status(error) not in RETRYABLE_STATUS:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hint = retry_after_seconds(error)
+        if hint is not None:
+            # Honour the hint, with a little jitter so waiting clients don't return in lockstep
+            delay = hint + random.uniform(0, self.base_delay)
+        if elapsed + delay > self.deadline:
+            return None
+        return delay
+
+
+def _record_retry(error, delay, label):
+    METRICS.inc("resume_model_retries_total", prompt=label, status=error_status(error))
+    METRICS.observe("resume_model_retry_wait_seconds", delay, prompt=label)
+
+
+def call_with_retries(fn, policy, on_retry=None, label="custom"):
+    """
+    Call `fn()` and retry it on retryable errors according to `policy`.
+
+    Args:
+        fn (callable): The model call
+        policy (RetryPolicy): When and how long to wait
+        on_retry (callable): Optional on_retry(attempt, delay, error), called before each wait
+        label (str): Prompt name for the retry metrics
+
+    Returns:
+        Whatever `fn` returns
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            delay = policy.next_delay(attempt, e, time.monotonic() - started)
+            if delay is None:
+                raise
+            attempt += 1
+            _record_retry(e, delay, label)
+            if on_retry is not None:
+                on_retry(attempt, delay, e)
+            time.sleep(delay)
+
+
+async def call_with_retries_async(fn, policy, on_retry=None, label="custom"):
+    """Async counterpart of call_with_retries; `fn()` returns an awaitable."""
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            delay = policy.next_delay(attempt, e, time.monotonic() - started)
+            if delay is None:
+                raise
+            attempt += 1
+            _record_retry(e, delay, label)
+            if on_retry is not None:
+                on_retry(attempt, delay, e)
+            await asyncio.sleep(delay)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Flight:
+    """One in-flight call that other callers can wait on, from threads or coroutines."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._waiters = []  # (loop, future) for coroutines
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            return None
+        return self._outcome()
+
+    async def wait_async(self, timeout=None):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = None
+            if not self._done.is_set():
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._outcome()
+
+    def _outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def _resolve(self, result, error):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self._done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one.
+
+    The first caller for a key becomes the leader and runs the call; callers
+    that join while it runs get the leader's result, or its exception. If
+    the leader stops without an outcome (e.g. a stream closed half-way) or a
+    follower waits longer than `timeout` seconds, followers receive None and
+    should run the call themselves.
+    """
+
+    def __init__(self, timeout=300.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def join(self, key):
+        """Return (flight, is_leader) for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+        METRICS.inc("resume_singleflight_total", role="leader" if leader else "follower")
+        return flight, leader
+
+    def finish(self, key, flight, result=None, error=None):
+        """Publish the leader's outcome and let the next identical call start fresh."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if error is not None and not isinstance(error, Exception):
+            result, error = None, None  # GeneratorExit, KeyboardInterrupt: not the followers' failure
+        flight._resolve(result, error)
+
+    def do(self, key, fn):
+        """Run `fn()` once for all concurrent callers with this key and return its result."""
+        flight, leader = self.join(key)
+        if not leader:
+            result = flight.wait(self.timeout)
+            if result is not None:
+                return result
+            return fn()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result)
+        return result
+
+    async def do_async(self, key, fn):
+        """Async counterpart of do; `fn()` returns an awaitable."""
+        flight, leader = self.join(key)
+        if not leader:
+            result = await flight.wait_async(self.timeout)
+            if result is not None:
+                return result
+            return await fn()
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result)
+        return result
@@ -0,0 +1,133 @@
+"""SQLite-backed cache for Gemini analysis responses.
+
+A response is reusable when the same resume is analyzed against the same job
+description with the same prompt and model. Entries expire after a TTL and
+the table is trimmed least-recently-used first once it grows past its byte
+budget.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+def _hash_bytes(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(value).hexdigest()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def fingerprint_parts(parts):
+    """Stable fingerprint for rendered resume parts; raw image bytes are hashed in place."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=_hash_bytes).encode()).hexdigest()
+
+
+def normalize_job_description(text):
+    """Collapse whitespace so re-pasted postings hit the same cache entry."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_response_key(resume_fingerprint, job_description, prompt_id, model_name):
+    """
+    Build the cache key for one analysis.
+
+    Args:
+        resume_fingerprint (str): Fingerprint of the rendered resume
+        job_description (str): Job description as entered by the user
+        prompt_id (str): Prompt identity, e.g. "input_prompt4:<hash>"
+        model_name (str): Gemini model name
+
+    Returns:
+        str: Hex digest of all four components
+    """
+    payload = json.dumps([
+        resume_fingerprint,
+        normalize_job_description(job_description),
+        prompt_id,
+        model_name,
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent TTL + size-bounded cache of model responses.
+
+    `near_duplicates` (near_duplicates.NearDuplicateIndex) is consulted when
+    request keys are built, so near-duplicate resumes and job descriptions
+    can share entries.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=256 * 1024 * 1024, near_duplicates=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.near_duplicates = near_duplicates
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        size = len(value.encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
@@ -0,0 +1,282 @@
+"""Append-only columnar store of analysis scores for analytics.
+
+Every scored analysis (see scores.py) becomes one row: requisition,
+candidate, analysis, model, the weighted total and one column per
+sub-score. Rows are written as Parquet files under a directory per
+requisition (hive layout, requisition=<id>/part-*.parquet), and never
+rewritten except by compaction.
+
+Queries read through pyarrow.dataset, so a filter on the requisition only
+opens that requisition's files, only the requested columns are read, and
+filtering, grouping and top-K run vectorized in Arrow. Ranking a
+requisition's candidates does not load the rest of the store.
+
+Writers in several processes can share one directory. Each append is a
+new file, written under a hidden name and renamed into place, so readers
+never see a partial file. Once a requisition has many small files they
+are merged into one.
+
+Usage:
+    python results_store.py top REQ-123 --analysis 6 --limit 50
+    python results_store.py compact
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from functools import lru_cache
+from urllib.parse import quote
+
+from scores import SCORE_COLUMNS, SCORE_SCHEMAS
+
+PARTITION = "requisition"
+# Stale compaction locks (a crashed compactor) are broken after this long
+LOCK_SECONDS = 600
+
+
+def default_requisition(job_description):
+    """Requisition ID for a job description submitted without one: the same text always gets the same ID."""
+    return "jd-" + hashlib.sha256(" ".join(job_description.split()).encode()).hexdigest()[:12]
+
+
+def score_rows(results, candidate, requisition, resume="", model="", job_id=""):
+    """
+    Rows for the scored entries of an analysis result.
+
+    Args:
+        results (dict): Prompt name -> {"response", "error", "scores", ...} (job_worker.result_entry)
+        candidate (str): Candidate name or file name
+        requisition (str): Requisition (job opening) ID
+        resume (str): Resume fingerprint
+        model (str): Gemini model name
+        job_id (str): Job that produced the results, if any
+
+    Returns:
+        list: One dict per analysis with scores
+    """
+    now = time.time()
+    return [
+        {
+            "timestamp": now, PARTITION: requisition, "candidate": candidate, "resume": resume, "analysis": name,
+            "model": model, "job_id": job_id, "total": entry["scores"]["total"], **entry["scores"]["scores"],
+        }
+        for name, entry in results.items() if entry.get("scores")
+    ]
+
+
+@lru_cache(maxsize=None)
+def file_schema():
+    # pyarrow takes a few hundred milliseconds to import (pyarrow.dataset pulls in pandas),
+    # so it waits until results are first written or queried
+    import pyarrow as pa
+    fields = [
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("candidate", pa.string()),
+        ("resume", pa.string()),
+        ("analysis", pa.string()),
+        ("model", pa.string()),
+        ("job_id", pa.string()),
+        ("total", pa.float64()),
+    ]
+    return pa.schema(fields + [(column, pa.float64()) for column in SCORE_COLUMNS])
+
+
+class ResultsStore:
+    """
+    Directory of Parquet files, one subdirectory per requisition.
+
+    Args:
+        directory (str): Root directory of the store
+        compact_files (int): Merge a requisition's small files once it has more than this many
+        compact_bytes (int): Files at least this big are already compacted and left alone
+    """
+
+    def __init__(self, directory, compact_files=64, compact_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.compact_files = compact_files
+        self.compact_bytes = compact_bytes
+
+    def _partition_dir(self, requisition):
+        return os.path.join(self.directory, f"{PARTITION}={quote(requisition, safe='')}")
+
+    def _write(self, directory, table):
+        import pyarrow.parquet as pq
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Hidden while being written: dataset discovery skips names starting with "."
+        temp = os.path.join(directory, "." + name)
+        pq.write_table(table, temp, compression="zstd")
+        os.replace(temp, os.path.join(directory, name))
+        return name
+
+    def append(self, rows):
+        """
+        Write rows (dicts as made by score_rows) as one new file per requisition.
+
+        Sub-score columns a row does not have are left null.
+        """
+        import pyarrow as pa
+        schema = file_schema()
+        by_requisition = {}
+        for row in rows:
+            by_requisition.setdefault(row[PARTITION], []).append(row)
+        for requisition, group in by_requisition.items():
+            columns = {name: [row.get(name) for row in group] for name in schema.names}
+            columns["timestamp"] = [int(value * 1000) for value in columns["timestamp"]]
+            directory = self._partition_dir(requisition)
+            self._write(directory, pa.table(columns, schema=schema))
+            if len(self._files(directory)) > self.compact_files:
+                self.compact(requisition)
+
+    def _files(self, directory):
+        try:
+            return sorted(name for name in os.listdir(directory) if name.startswith("part-") and name.endswith(".parquet"))
+        except FileNotFoundError:
+            return []
+
+    def compact(self, requisition=None):
+        """
+        Merge each requisition's small files into one (all requisitions by default).
+
+        Returns:
+            int: Files merged away
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if requisition is not None:
+            directories = [self._partition_dir(requisition)]
+        elif os.path.isdir(self.directory):
+            directories = [
+                os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.startswith(PARTITION + "=")
+            ]
+        else:
+            directories = []
+        merged = 0
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            lock = os.path.join(directory, ".compact.lock")
+            try:
+                if time.time() - os.path.getmtime(lock) > LOCK_SECONDS:
+                    os.remove(lock)
+            except OSError:
+                pass
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                continue  # another process is compacting this requisition
+            try:
+                files = [
+                    name for name in self._files(directory)
+                    if os.path.getsize(os.path.join(directory, name)) < self.compact_bytes
+                ]
+                if len(files) < 2:
+                    continue
+                table = pa.concat_tables(
+                    [pq.read_table(os.path.join(directory, name), schema=file_schema()) for name in files]
+                )
+                self._write(directory, table.sort_by("timestamp"))
+                for name in files:
+                    os.remove(os.path.join(directory, name))
+                merged += len(files) - 1
+            finally:
+                os.remove(lock)
+        return merged
+
+    def schema(self):
+        """Schema of query results: the file columns plus the requisition, read from the directory name."""
+        import pyarrow as pa
+        return file_schema().append(pa.field(PARTITION, pa.string()))
+
+    def dataset(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        partitioning = ds.partitioning(pa.schema([(PARTITION, pa.string())]), flavor="hive")
+        return ds.dataset(self.directory, format="parquet", partitioning=partitioning, schema=self.schema())
+
+    def query(self, columns=None, filter=None):
+        """
+        Read matching rows as an Arrow table.
+
+        Args:
+            columns (list): Columns to read (default all)
+            filter (pyarrow.compute.Expression): Row filter, e.g.
+                (ds.field("requisition") == "REQ-1") & (ds.field("total") >= 80)
+
+        Returns:
+            pyarrow.Table
+        """
+        dataset = self.dataset() if os.path.isdir(self.directory) else None
+        if dataset is None:
+            table = self.schema().empty_table()
+            return table.select(columns) if columns else table
+        return dataset.to_table(columns=columns, filter=filter)
+
+    def top(self, requisition, analysis, limit=50, by="total"):
+        """
+        Best candidates for a requisition by one analysis score.
+
+        A candidate analyzed more than once is ranked by their latest result.
+
+        Args:
+            requisition (str): Requisition ID
+            analysis (str): Prompt name, e.g. "input_prompt6"
+            limit (int): Number of candidates
+            by (str): "total" or a sub-score column
+
+        Returns:
+            list: Dicts with candidate, the score, timestamp and job_id, best first
+        """
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        table = self.query(
+            columns=["candidate", by, "timestamp", "job_id"],
+            filter=(ds.field(PARTITION) == requisition) & (ds.field("analysis") == analysis) & ds.field(by).is_valid(),
+        )
+        if not table.num_rows:
+            return []
+        # Ordered aggregation ("last") needs a single thread; the table is already narrowed to one requisition
+        latest = table.sort_by("timestamp").group_by("candidate", use_threads=False).aggregate(
+            [(by, "last"), ("timestamp", "last"), ("job_id", "last")]
+        ).rename_columns(["candidate", by, "timestamp", "job_id"])
+        best = latest.take(pc.select_k_unstable(latest, k=min(limit, latest.num_rows), sort_keys=[(by, "descending")]))
+        return best.sort_by([(by, "descending")]).to_pylist()
+
+
+def main(argv=None):
+    from settings import make_results_store
+
+    parser = argparse.ArgumentParser(description="Query or compact the analysis results store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    top = commands.add_parser("top", help="Best candidates for a requisition")
+    top.add_argument("requisition")
+    top.add_argument("-a", "--analysis", default="6", help="Tool number (1, 4 or 6) or prompt name (default: 6, ATS Score)")
+    top.add_argument("-n", "--limit", type=int, default=50)
+    top.add_argument("--by", default="total", help="'total' or a sub-score column")
+    commands.add_parser("compact", help="Merge small files")
+    args = parser.parse_args(argv)
+    if args.command == "top":
+        analysis = f"input_prompt{args.analysis}" if args.analysis.isdigit() else args.analysis
+        if analysis not in SCORE_SCHEMAS:
+            tools = ", ".join(name.replace("input_prompt", "") for name in SCORE_SCHEMAS)
+            parser.error(f"--analysis must be a scored tool: {tools} (or its prompt name)")
+        if args.by != "total" and args.by not in SCORE_SCHEMAS[analysis]:
+            parser.error(f"--by must be 'total' or one of: {', '.join(SCORE_SCHEMAS[analysis])}")
+
+    store = make_results_store()
+    if store is None:
+        parser.error("RESUME_RESULTS_DIR is empty, so no results are stored")
+    if args.command == "compact":
+        print(f"Merged {store.compact()} files", file=sys.stderr)
+        return 0
+    for row in store.top(args.requisition, analysis, args.limit, args.by):
+        print(json.dumps(row, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""Persistent inverted index of resume text for shortlisting before any LLM call.
+
+The index is a directory of immutable segments. Each flush writes one
+segment: a sorted term array, posting offsets, and posting doc ids and term
+frequencies, all saved as .npy files that are memory-mapped on load. Only
+the pages a query touches are read from disk, so one node can hold 100k+
+resumes. A JSON manifest, replaced atomically, lists the live segments.
+Resumes are identified by the SHA-256 of their PDF, so re-adding a file is
+a no-op.
+
+Several processes may add to the same index: a flush holds an exclusive
+lock on the index directory, loads any segments other writers published
+since, and only then writes its own segment and manifest. Readers never
+wait for the lock.
+
+Usage:
+    python resume_index.py add resumes/
+    python resume_index.py search job_description.txt -k 50
+"""
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: run one writer per index at a time there
+    fcntl = None
+
+from keyword_score import tokenize
+from render_sandbox import PdfRejected
+from settings import CACHE_DIR, PDF_MAX_PAGES, PDF_RENDER_WORKERS, make_render_sandbox
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TERM_CHARS = 32  # fixed-width term arrays are what make the dictionary mmap-able
+INDEX_BATCH_SIZE = 1000  # resumes extracted and flushed per segment by index_directory
+
+
+class ResumeIndex:
+    """Append-only, segment-based BM25 index over resume text."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._manifest_path = os.path.join(path, "manifest.json")
+        self._manifest = {"segments": [], "next_segment": 0}
+        self._segments = []
+        self._docs = []  # doc id -> {"name", "sha"}
+        self._by_sha = {}
+        self._load_new_segments()
+        self._pending = []  # (name, sha, Counter) added since the last flush
+        self._pending_shas = set()
+
+    def __len__(self):
+        return len(self._docs) + len(self._pending)
+
+    def doc_id(self, sha):
+        """Return the doc id for a PDF hash, or None if it has not been flushed yet."""
+        return self._by_sha.get(sha)
+
+    def add(self, name, text, sha):
+        """
+        Queue a resume for the next flush.
+
+        Args:
+            name (str): Display name, usually the file name
+            text (str): Extracted resume text
+            sha (str): SHA-256 of the PDF bytes, see pdf_sha
+
+        Returns:
+            bool: False if this PDF is already indexed or queued
+        """
+        if sha in self._by_sha or sha in self._pending_shas:
+            return False
+        terms = Counter(term for term in tokenize(text) if len(term) <= MAX_TERM_CHARS)
+        self._pending.append((name, sha, terms))
+        self._pending_shas.add(sha)
+        return True
+
+    def flush(self):
+        """Write queued resumes as a new segment and publish it in the manifest."""
+        if not self._pending:
+            return
+        with self._write_lock():
+            self._load_new_segments()
+            # Another writer may have indexed some of the same PDFs in the meantime
+            pending = [entry for entry in self._pending if entry[1] not in self._by_sha]
+            if pending:
+                self._write_segment(pending)
+        self._pending = []
+        self._pending_shas = set()
+
+    def _write_segment(self, pending):
+        start = len(self._docs)
+        postings = {}
+        lengths = np.zeros(len(pending), dtype=np.int32)
+        docs = []
+        for offset, (name, sha, terms) in enumerate(pending):
+            lengths[offset] = sum(terms.values())
+            docs.append({"name": name, "sha": sha})
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((start + offset, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            entries = np.array(postings[term])
+            doc_ids[offsets[i]:offsets[i + 1]] = entries[:, 0]
+            tfs[offsets[i]:offsets[i + 1]] = entries[:, 1]
+
+        name = f"seg_{self._manifest['next_segment']:06d}"
+        base = os.path.join(self.path, name)
+        np.save(base + ".terms.npy", np.array(terms, dtype=f"<U{MAX_TERM_CHARS}"))
+        np.save(base + ".offsets.npy", offsets)
+        np.save(base + ".doc_ids.npy", doc_ids)
+        np.save(base + ".tfs.npy", tfs)
+        np.save(base + ".lengths.npy", lengths)
+        with open(base + ".docs.jsonl", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(doc) + "\n" for doc in docs)
+
+        meta = {"name": name, "start": start, "count": len(docs), "total_length": int(lengths.sum())}
+        manifest = {
+            "segments": self._manifest["segments"] + [meta],
+            "next_segment": self._manifest["next_segment"] + 1,
+        }
+        self._write_manifest(manifest)
+        self._manifest = manifest
+        self._segments.append(self._open_segment(meta))
+        for doc in docs:
+            self._by_sha[doc["sha"]] = len(self._docs)
+            self._docs.append(doc)
+
+    def search(self, query_text, top_k=50, doc_ids=None):
+        """
+        Rank indexed resumes against a job description with BM25.
+
+        Args:
+            query_text (str): Job description text
+            top_k (int): Number of results to return
+            doc_ids (iterable): Optional doc ids to restrict the ranking to
+
+        Returns:
+            list: (score, name, doc_id) tuples, best first
+        """
+        n_docs = len(self._docs)
+        if not n_docs:
+            return []
+        query = Counter(term for term in tokenize(query_text) if len(term) <= MAX_TERM_CHARS)
+        total_length = sum(meta["total_length"] for meta in self._manifest["segments"])
+        avg_length = total_length / n_docs or 1
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term, query_tf in query.items():
+            slices = [(segment, segment.postings(term)) for segment in self._segments]
+            doc_freq = sum(len(ids) for _, (ids, _) in slices)
+            if not doc_freq:
+                continue
+            idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+            weight = idf * (1 + np.log(query_tf))
+            for segment, (ids, tfs) in slices:
+                if not len(ids):
+                    continue
+                lengths = segment.lengths[ids - segment.start]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+                scores[ids] += weight * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        if doc_ids is not None:
+            mask = np.zeros(n_docs, dtype=bool)
+            mask[list(doc_ids)] = True
+            scores[~mask] = -np.inf
+        top_k = min(top_k, n_docs)
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(float(scores[i]), self._docs[i]["name"], int(i)) for i in best if np.isfinite(scores[i])]
+
+    def _open_segment(self, meta):
+        return _Segment(os.path.join(self.path, meta["name"]), meta["start"])
+
+    def _load_new_segments(self):
+        """Load the segments published since the manifest was last read; the manifest only ever grows."""
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        for meta in manifest["segments"][len(self._manifest["segments"]):]:
+            self._segments.append(self._open_segment(meta))
+            with open(os.path.join(self.path, meta["name"] + ".docs.jsonl"), encoding="utf-8") as f:
+                for line in f:
+                    doc = json.loads(line)
+                    self._by_sha[doc["sha"]] = len(self._docs)
+                    self._docs.append(doc)
+        self._manifest = manifest
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        # flock is released by the OS if the writer dies, so a crash never leaves the index locked
+        with open(os.path.join(self.path, ".write.lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _write_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+
+class _Segment:
+    def __init__(self, base, start):
+        self.start = start
+        self.terms = np.load(base + ".terms.npy", mmap_mode="r")
+        self.offsets = np.load(base + ".offsets.npy", mmap_mode="r")
+        self.doc_ids = np.load(base + ".doc_ids.npy", mmap_mode="r")
+        self.tfs = np.load(base + ".tfs.npy", mmap_mode="r")
+        self.lengths = np.load(base + ".lengths.npy", mmap_mode="r")
+
+    def postings(self, term):
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return np.asarray(self.doc_ids[lo:hi]), np.asarray(self.tfs[lo:hi])
+
+
+def pdf_sha(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _extract_text_or_none(sandbox, pdf_bytes, max_pages):
+    # One unreadable or refused PDF must not stop the batch
+    try:
+        return sandbox.extract_text(pdf_bytes, max_pages=max_pages)
+    except PdfRejected:
+        return None
+
+
+def index_directory(index, resume_dir, sandbox, executor=None):
+    """
+    Add every new PDF in `resume_dir` to the index.
+
+    New files are extracted and flushed in batches, so a crash loses at most
+    one batch and memory stays bounded for very large directories. PDFs that
+    cannot be read are skipped and retried on the next call.
+
+    Args:
+        index (ResumeIndex): Index to update
+        resume_dir (str): Directory of PDF resumes
+        sandbox (RenderSandbox): Extracts the text, so a malicious PDF cannot hang or exhaust this process
+        executor (Executor): Optional thread pool, to keep several sandbox workers busy
+
+    Returns:
+        dict: File name -> SHA-256 for every PDF in the directory
+    """
+    shas = {}
+    new_files = []
+    for name in sorted(os.listdir(resume_dir)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        with open(os.path.join(resume_dir, name), "rb") as f:
+            sha = pdf_sha(f.read())
+        shas[name] = sha
+        if index.doc_id(sha) is None:
+            new_files.append(name)
+
+    map_fn = executor.map if executor is not None else map
+    for batch_start in range(0, len(new_files), INDEX_BATCH_SIZE):
+        batch = new_files[batch_start:batch_start + INDEX_BATCH_SIZE]
+        pdfs = []
+        for name in batch:
+            with open(os.path.join(resume_dir, name), "rb") as f:
+                pdfs.append(f.read())
+        texts = map_fn(functools.partial(_extract_text_or_none, sandbox), pdfs, [PDF_MAX_PAGES] * len(batch))
+        for name, text in zip(batch, texts):
+            if text is None:
+                print(f"skipping unreadable PDF {name}", file=sys.stderr)
+                continue
+            index.add(name, text, shas[name])
+        index.flush()
+    return shas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the local resume index.")
+    parser.add_argument("--index", default=os.path.join(CACHE_DIR, "index"), help="Index directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Index every new PDF in a directory")
+    add.add_argument("resume_dir")
+    search = commands.add_parser("search", help="Rank indexed resumes against a job description")
+    search.add_argument("job_description", help="Text file with the job description")
+    search.add_argument("-k", "--top-k", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    index = ResumeIndex(args.index)
+    if args.command == "add":
+        before = len(index)
+        with make_render_sandbox(PDF_RENDER_WORKERS or os.cpu_count()) as sandbox, \
+                ThreadPoolExecutor(max_workers=sandbox.workers) as pool:
+            index_directory(index, args.resume_dir, sandbox, executor=pool)
+        print(f"Indexed {len(index) - before} new resumes ({len(index)} total)", file=sys.stderr)
+    else:
+        with open(args.job_description, encoding="utf-8") as f:
+            job_description = f.read()
+        for score, name, _ in index.search(job_description, args.top_k):
+            print(f"{score:.3f}\t{name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Layout-aware resume section segmentation and per-prompt pruning.
+
+segment_pdf() reads the text layer with PyMuPDF's get_text("dict"), which
+keeps each line's font size, weight and position. A line is a section
+heading when it is short and either matches a known heading ("Work
+Experience", "EDUCATION", "Skills:") or is styled like the headings that
+did match (same size, weight and capitals, set apart from body text), so
+headings the table does not know still end the section above them.
+Two-column pages are read column by column rather than line by line
+across the page.
+
+render_pdf sends a segmented resume as one text part per section, each
+starting with a "[Resume section: ...]" marker. prune_sections() then
+drops the sections an analysis does not read (prompts.PROMPT_SECTIONS),
+so e.g. the cover letter is written from the experience and achievements
+without the rest of the resume. Scanned pages, and resumes whose headings
+are not recognised, are sent whole as before.
+"""
+
+import re
+from collections import Counter
+
+from metrics import METRICS
+from scheduler import estimate_tokens
+
+HEADER = "header"  # name and contact details above the first heading
+OTHER = "other"  # sections under headings that are not in SECTION_HEADINGS
+
+# Known resume headings per section; keyword_score uses the same table
+SECTION_HEADINGS = {
+    "summary": ("summary", "profile", "professional summary", "career summary", "objective", "career objective",
+                "about me", "about", "professional profile", "personal statement"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history",
+                   "work history", "career history", "relevant experience", "professional background",
+                   "experience and employment", "internships", "volunteer experience", "leadership experience"),
+    "skills": ("skills", "technical skills", "core competencies", "competencies", "technologies", "tools",
+               "tech stack", "key skills", "skills and tools", "skills and technologies", "areas of expertise",
+               "expertise", "core skills", "languages and tools"),
+    "projects": ("projects", "personal projects", "selected projects", "key projects", "academic projects",
+                 "side projects", "open source"),
+    "education": ("education", "academic background", "education and training", "academic qualifications",
+                  "qualifications", "academics", "education and certifications"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "certifications and licenses", "courses", "training", "professional development",
+                       "courses and certifications"),
+    "achievements": ("achievements", "key achievements", "accomplishments", "awards", "honors", "honours",
+                     "awards and honors", "awards and achievements", "publications"),
+}
+SECTION_TITLES = {HEADER: "Header", OTHER: "Other", **{section: section.title() for section in SECTION_HEADINGS}}
+_HEADING_LOOKUP = {alias: section for section, aliases in SECTION_HEADINGS.items() for alias in aliases}
+
+# Below this many recognised headings the resume is sent whole
+MIN_HEADINGS = 2
+MAX_HEADING_CHARS = 40
+MAX_HEADING_WORDS = 5
+# A heading set larger than body text by at least this ratio is styled apart from it
+HEADING_SIZE_RATIO = 1.1
+# Share of a page's lines that must sit wholly on each side of the middle to read it as two columns
+COLUMN_SHARE = 0.2
+
+SECTION_MARKER = re.compile(r"^\[Resume section: ([A-Za-z ]+)\]")
+EXCERPT_NOTE = "[Resume excerpt: only the sections this analysis needs are included]"
+
+
+def page_lines(page):
+    """
+    Text lines of a page with their layout, in reading order.
+
+    Returns:
+        list: Dicts with "text", "size" (largest font size), "bold", "first"
+        (first line of its block) and "bbox"
+    """
+    import fitz
+    lines = []
+    # Image blocks would carry the decoded image bytes, which are never needed here
+    flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    for block in page.get_text("dict", flags=flags, sort=True)["blocks"]:
+        if block.get("type") != 0:
+            continue
+        for number, line in enumerate(block["lines"]):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            lines.append({
+                "text": "".join(span["text"] for span in line["spans"]).strip(),
+                "size": max(span["size"] for span in spans),
+                # Flag bit 16 is bold; some fonts only say so in their name
+                "bold": all(span["flags"] & 16 or "bold" in span["font"].lower() for span in spans),
+                "first": number == 0,
+                "bbox": line["bbox"],
+            })
+    return order_columns(lines, page.rect)
+
+
+def order_columns(lines, rect):
+    """
+    Reorder a two-column page: everything above the right column (usually
+    the name and contact header), then the left column, the right column,
+    and full-width lines below the top of the columns.
+    """
+    middle = (rect.x0 + rect.x1) / 2
+    right = [line for line in lines if line["bbox"][0] >= middle]
+    left = [line for line in lines if line["bbox"][2] <= middle]
+    if not left or not right or min(len(left), len(right)) < COLUMN_SHARE * len(lines):
+        return lines
+    top = min(line["bbox"][1] for line in right)
+    by_position = lambda line: (line["bbox"][1], line["bbox"][0])
+    above = [line for line in lines if line["bbox"][1] < top]
+    below = [line for line in lines if line["bbox"][1] >= top]
+    return (
+        sorted(above, key=by_position)
+        + sorted((line for line in below if line["bbox"][2] <= middle), key=by_position)
+        + sorted((line for line in below if line["bbox"][0] >= middle), key=by_position)
+        + sorted((line for line in below if line["bbox"][0] < middle < line["bbox"][2]), key=by_position)
+    )
+
+
+def heading_key(text):
+    """Normalized heading text, or None if the line is too long or reads like a sentence."""
+    stripped = text.strip().rstrip(":").strip()
+    if not stripped or len(stripped) > MAX_HEADING_CHARS or len(stripped.split()) > MAX_HEADING_WORDS:
+        return None
+    if stripped[-1] in ".,;":
+        return None
+    key = re.sub(r"[^a-z ]", "", stripped.lower().replace("&", " and "))
+    return re.sub(r"\s+", " ", key).strip() or None
+
+
+def style(line):
+    return round(line["size"]), line["bold"], line["text"].isupper()
+
+
+def segment_lines(lines):
+    """
+    Split layout lines into sections.
+
+    Returns:
+        list: (section, text) pairs in reading order, or None if fewer than
+        MIN_HEADINGS headings are recognised
+    """
+    sizes = Counter()
+    for line in lines:
+        sizes[round(line["size"])] += len(line["text"])
+    if not sizes:
+        return None
+    body_size = sizes.most_common(1)[0][0]
+
+    known = {}
+    for number, line in enumerate(lines):
+        key = heading_key(line["text"])
+        if key in _HEADING_LOOKUP:
+            known[number] = _HEADING_LOOKUP[key]
+    # When the resume sets its headings apart, a heading word in body style is just a word
+    styled = {
+        number: section for number, section in known.items()
+        if lines[number]["size"] >= body_size * HEADING_SIZE_RATIO or lines[number]["bold"] or lines[number]["text"].isupper()
+    }
+    if len(set(styled.values())) >= MIN_HEADINGS:
+        known = styled
+    if len(set(known.values())) < MIN_HEADINGS:
+        return None
+    heading_styles = {style(lines[number]) for number in known}
+
+    sections = []
+    current, body = HEADER, []
+    for number, line in enumerate(lines):
+        section = known.get(number)
+        if section is None and style(line) in heading_styles and heading_key(line["text"]):
+            # Styled like the recognised headings and set apart from body text: an unknown heading.
+            # Capitals at body size only count at the start of a block, not inside a paragraph.
+            if line["size"] >= body_size * HEADING_SIZE_RATIO or (line["text"].isupper() and line["first"]):
+                section = OTHER
+        if section is not None:
+            if body:
+                sections.append((current, "\n".join(body)))
+            current, body = section, []
+        body.append(line["text"])
+    if body:
+        sections.append((current, "\n".join(body)))
+
+    merged = []
+    for section, text in sections:
+        if merged and merged[-1][0] == section:
+            merged[-1] = (section, merged[-1][1] + "\n" + text)
+        else:
+            merged.append((section, text))
+    return merged
+
+
+def segment_pdf(pdf_bytes, max_pages):
+    """
+    Split the text layer of the first `max_pages` pages into resume sections.
+
+    Returns:
+        list: (section, text) pairs in reading order, or None if the headings are not recognised
+    """
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        lines = []
+        for number in range(min(doc.page_count, max_pages)):
+            lines.extend(page_lines(doc.load_page(number)))
+    return segment_lines(lines)
+
+
+def section_parts(sections):
+    """One text part per section, each starting with its section marker."""
+    return [{"text": f"[Resume section: {SECTION_TITLES[section]}]\n{text}"} for section, text in sections]
+
+
+def part_section(part):
+    """Section of a part made by section_parts, or None for any other part."""
+    match = SECTION_MARKER.match(part.get("text", ""))
+    if match is None:
+        return None
+    title = match.group(1)
+    return next((section for section, value in SECTION_TITLES.items() if value == title), None)
+
+
+def prune_sections(pdf_parts, sections, label):
+    """
+    Keep only the resume sections an analysis reads.
+
+    Parts that are not sections (page images, unsegmented text) are always
+    kept. If none of the wanted sections is present, the resume goes whole.
+
+    Args:
+        pdf_parts (list): Resume parts from pdf_render.render_pdf
+        sections (tuple): Section names to keep, None for all
+        label (str): Prompt name label for metrics
+
+    Returns:
+        list: Parts to send
+    """
+    if not sections:
+        return pdf_parts
+    kept, dropped = [], []
+    for part in pdf_parts:
+        section = part_section(part)
+        (dropped if section is not None and section not in sections else kept).append(part)
+    if not dropped or all(part_section(part) is None for part in kept):
+        return pdf_parts
+    note = {"text": EXCERPT_NOTE}
+    saved = estimate_tokens(dropped) - estimate_tokens([note])
+    if saved <= 0:
+        return pdf_parts
+    METRICS.inc("resume_preflight_tokens_saved_total", saved, prompt=label, reason="sections")
+    return [note] + kept
@@ -0,0 +1,298 @@
+"""Process-wide admission control for model calls.
+
+Every model call takes one request from a requests-per-minute token bucket
+and its estimated tokens from a tokens-per-minute bucket before it is sent.
+When the buckets run dry, calls wait in a queue instead of going out and
+failing with 429.
+
+The queue is split by priority class (interactive before bulk) and, within
+a class, by session. Sessions are served round-robin, so one user running
+many analyses cannot starve the others. A single dispatcher thread admits
+calls in that order as the buckets refill. Waiting callers can be told
+their position in line.
+
+Estimated tokens are settled against the real usage once a response
+arrives, so the token bucket tracks what the API actually counted.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+from metrics import METRICS
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+IMAGE_TOKENS = 258  # what Gemini counts for one image part
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(contents, output_tokens=0):
+    """Rough token count of request parts plus the expected response length."""
+    tokens = output_tokens
+    for part in contents:
+        if "text" in part:
+            tokens += len(part["text"]) // CHARS_PER_TOKEN + 1
+        else:
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+class TokenBucket:
+    """A bucket of `per_minute` units that refills continuously; 0 means unlimited."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until `amount` units are available."""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        # A single call bigger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        return max(amount - self.level, 0.0) / self.rate
+
+    def take(self, amount, now):
+        if self.capacity:
+            self._refill(now)
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount, now):
+        """Return (positive) or charge (negative) units after the fact."""
+        if self.capacity:
+            self._refill(now)
+            self.level = min(self.capacity, self.level + amount)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Ticket:
+    """One queued model call."""
+
+    def __init__(self, session, priority, tokens):
+        self.session = session
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.granted = None
+        self._event = threading.Event()
+        self._waiters = []  # (loop, future) for coroutines
+        self._lock = threading.Lock()
+
+    def _grant(self, now):
+        with self._lock:
+            self.granted = now
+            self._event.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    async def _wait_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._event.is_set():
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        await future
+
+
+class AdmissionController:
+    """
+    Shared scheduler for all model calls in the process.
+
+    Args:
+        requests_per_minute (int): Request quota, 0 for unlimited
+        tokens_per_minute (int): Token quota (input plus output), 0 for unlimited
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        self._queues = {}  # priority -> OrderedDict(session -> deque of tickets), in service order
+        self._thread = None
+
+    def submit(self, session, priority, tokens):
+        """Queue a call and return its ticket; the dispatcher grants it when its turn comes."""
+        ticket = Ticket(session, priority, tokens)
+        with self._cond:
+            sessions = self._queues.setdefault(priority, OrderedDict())
+            sessions.setdefault(session, deque()).append(ticket)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="admission", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return ticket
+
+    def acquire(self, session, priority, tokens, on_position=None, poll_seconds=0.5):
+        """
+        Block until a call may be sent.
+
+        Args:
+            session (str): Fairness key, e.g. one Streamlit session
+            priority (int): PRIORITY_INTERACTIVE or PRIORITY_BULK
+            tokens (int): Estimated tokens for the call
+            on_position (callable): Optional on_position(n), called with the 1-based
+                place in line while waiting (only when it changes) and with 0 once admitted
+
+        Returns:
+            Ticket: Pass it to settle() once the real usage is known
+        """
+        ticket = self.submit(session, priority, tokens)
+        try:
+            last = None
+            while not ticket._event.wait(poll_seconds if on_position else None):
+                position = self.position(ticket)
+                if position and position != last:
+                    on_position(position)
+                    last = position
+            if last is not None:
+                on_position(0)  # let the caller clear its "waiting" notice
+        except BaseException:
+            self.cancel(ticket)
+            raise
+        return ticket
+
+    async def acquire_async(self, session, priority, tokens, on_position=None, poll_seconds=0.5):
+        """Async counterpart of acquire, for calls made on an event loop."""
+        ticket = self.submit(session, priority, tokens)
+        waiting = asyncio.ensure_future(ticket._wait_async())
+        try:
+            last = None
+            while not (await asyncio.wait({waiting}, timeout=poll_seconds if on_position else None))[0]:
+                position = self.position(ticket)
+                if position and position != last:
+                    on_position(position)
+                    last = position
+            if last is not None:
+                on_position(0)
+        except BaseException:
+            waiting.cancel()
+            self.cancel(ticket)
+            raise
+        return ticket
+
+    def settle(self, ticket, actual_tokens):
+        """Correct the token bucket once the call's real token usage is known."""
+        with self._cond:
+            self.tokens.adjust(ticket.tokens - actual_tokens, time.monotonic())
+            self._cond.notify_all()
+
+    def cancel(self, ticket):
+        """Drop a ticket whose caller stopped waiting; a granted ticket keeps its quota."""
+        with self._cond:
+            sessions = self._queues.get(ticket.priority, {})
+            queue = sessions.get(ticket.session)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del sessions[ticket.session]
+                self._cond.notify_all()
+
+    def position(self, ticket):
+        """1-based place in line of a waiting ticket, or 0 once it has been granted."""
+        with self._cond:
+            if ticket.granted is not None:
+                return 0
+            ahead = 0
+            for priority in sorted(self._queues):
+                sessions = self._queues[priority]
+                if priority < ticket.priority:
+                    ahead += sum(len(queue) for queue in sessions.values())
+                    continue
+                if priority > ticket.priority:
+                    break
+                own = sessions.get(ticket.session)
+                if own is None or ticket not in own:
+                    return 0
+                index = own.index(ticket)
+                before_own = True
+                # Round-robin: each session ahead in rotation gets index + 1 turns first, the rest index
+                for session, queue in sessions.items():
+                    if session == ticket.session:
+                        before_own = False
+                        continue
+                    ahead += min(len(queue), index + 1 if before_own else index)
+                ahead += index
+            return ahead + 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                PRIORITY_NAMES.get(priority, str(priority)): sum(len(queue) for queue in sessions.values())
+                for priority, sessions in self._queues.items()
+            }
+
+    def _next(self):
+        for priority in sorted(self._queues):
+            sessions = self._queues[priority]
+            if sessions:
+                session = next(iter(sessions))
+                return priority, session, sessions[session][0]
+        return None
+
+    def _run(self):
+        with self._cond:
+            while True:
+                head = self._next()
+                if head is None:
+                    self._cond.wait()
+                    continue
+                priority, session, ticket = head
+                now = time.monotonic()
+                delay = max(self.requests.delay(1, now), self.tokens.delay(ticket.tokens, now))
+                if delay > 0:
+                    # New arrivals, settlements and cancellations wake us early
+                    self._cond.wait(delay)
+                    continue
+                self.requests.take(1, now)
+                self.tokens.take(ticket.tokens, now)
+                sessions = self._queues[priority]
+                queue = sessions.pop(session)
+                queue.popleft()
+                if queue:
+                    sessions[session] = queue  # back of the rotation
+                METRICS.observe("resume_queue_wait_seconds", now - ticket.enqueued, priority=PRIORITY_NAMES.get(priority, priority))
+                ticket._grant(now)
+
+
+class Admission:
+    """
+    How one caller's model calls are admitted: the shared controller plus the
+    caller's session, priority and an optional queue-position callback.
+    """
+
+    def __init__(self, controller, session, priority=PRIORITY_INTERACTIVE, on_position=None, output_tokens=1000):
+        self.controller = controller
+        self.session = session
+        self.priority = priority
+        self.on_position = on_position
+        self.output_tokens = output_tokens
+
+    def acquire(self, contents):
+        return self.controller.acquire(
+            self.session, self.priority, estimate_tokens(contents, self.output_tokens), self.on_position
+        )
+
+    async def acquire_async(self, contents):
+        return await self.controller.acquire_async(
+            self.session, self.priority, estimate_tokens(contents, self.output_tokens), self.on_position
+        )
+
+    def settle(self, ticket, actual_tokens):
+        self.controller.settle(ticket, actual_tokens)
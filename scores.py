@@ -0,0 +1,79 @@
+"""Structured scores for the scoring analyses.
+
+Resume Analysis, Skills Match and ATS Score end their answers with a fenced
+JSON block of 0-100 sub-scores (see score_instruction, appended to those
+prompts). extract_scores() reads the block back and computes the weighted
+total locally from SCORE_SCHEMAS, so totals are comparable across
+candidates whatever the model wrote in prose. The block is stripped from
+the text shown to users.
+"""
+
+import json
+import re
+
+# Prompt name -> sub-score -> weight in the total; weights follow each prompt's own breakdown
+SCORE_SCHEMAS = {
+    "input_prompt1": {"match": 0.4, "technical_depth": 0.3, "career_progression": 0.2, "soft_skills": 0.1},
+    "input_prompt4": {"quantitative": 0.4, "qualitative": 0.3, "technical_proficiency": 0.2, "role_specific": 0.1},
+    "input_prompt6": {"keywords": 0.25, "format": 0.25, "content": 0.25, "ats_compatibility": 0.25},
+}
+SCORE_COLUMNS = [key for schema in SCORE_SCHEMAS.values() for key in schema]
+SCORE_LABELS = {"ats_compatibility": "ATS Compatibility"}
+
+SCORE_BLOCK = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+# A score block at the very end of the text, complete or still streaming in
+SCORE_TAIL = re.compile(r"\s*```(?:json)?\s*\{[^`]*(?:```)?\s*$")
+
+
+def score_instruction(name):
+    """Closing instruction asking for the sub-scores of `name` as a JSON block."""
+    fields = ", ".join(f'"{key}": <0-100>' for key in SCORE_SCHEMAS[name])
+    return (
+        "\n\nEnd your answer with your score for each category, as a number from 0 to 100, "
+        f"in a fenced JSON block exactly like this:\n```json\n{{{fields}}}\n```"
+    )
+
+
+def score_label(key):
+    return SCORE_LABELS.get(key, key.replace("_", " ").title())
+
+
+def extract_scores(name, text):
+    """
+    Read the sub-scores of a scoring analysis from its response.
+
+    Args:
+        name (str): Prompt name
+        text (str): Full response text
+
+    Returns:
+        dict: {"scores": {sub-score: float}, "total": float} with the weighted
+        total over the sub-scores present; None if `name` has no scores or the
+        response has no readable score block
+    """
+    schema = SCORE_SCHEMAS.get(name)
+    if schema is None or not text:
+        return None
+    for block in reversed(SCORE_BLOCK.findall(text)):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        scores = {}
+        for key in schema:
+            try:
+                scores[key] = min(max(float(str(data[key]).strip().rstrip("%")), 0.0), 100.0)
+            except (KeyError, TypeError, ValueError):
+                continue
+        if scores:
+            weight = sum(schema[key] for key in scores)
+            total = sum(schema[key] * value for key, value in scores.items()) / weight
+            return {"scores": scores, "total": round(total, 1)}
+    return None
+
+
+def strip_scores(text):
+    """Response text without its trailing score block, for display."""
+    return SCORE_TAIL.sub("", text) if text else text
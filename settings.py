@@ -0,0 +1,137 @@
+"""Environment-driven configuration shared by the app and the CLI tools."""
+
+import os
+
+from jobs import JobStore
+from near_duplicates import NearDuplicateIndex
+from pdf_cache import PdfRenderCache
+from pdf_render import DEFAULT_DPI, DEFAULT_IMAGE_OPTIONS, DEFAULT_MAX_PAGES, MODE_AUTO
+from render_sandbox import DEFAULT_LIMITS, RenderSandbox
+from response_cache import ResponseCache
+from results_store import ResultsStore
+from scheduler import AdmissionController
+
+# Try to load environment variables from .env file
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv not installed, that's okay
+
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# USD per million tokens, used for cost estimates (defaults: gemini-1.5-flash, prompts up to 128k)
+MODEL_PRICES = {
+    "input": float(os.getenv("GEMINI_INPUT_PRICE_PER_MTOK", "0.075")),
+    "output": float(os.getenv("GEMINI_OUTPUT_PRICE_PER_MTOK", "0.30")),
+}
+# Retries for rate-limited (429) and failed (5xx) model calls
+MODEL_RETRY = {
+    "max_retries": int(os.getenv("GEMINI_MAX_RETRIES", "4")),
+    "base_delay": float(os.getenv("GEMINI_RETRY_BASE_SECONDS", "1")),
+    "max_delay": float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "30")),
+    "deadline": float(os.getenv("GEMINI_RETRY_DEADLINE_SECONDS", "120")),
+}
+# Quota shared by every model call in the process (defaults: gemini-1.5-flash free tier; 0 = unlimited)
+RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "15"))
+TPM_LIMIT = int(os.getenv("GEMINI_TPM_LIMIT", "1000000"))
+# Response length assumed when reserving tokens; corrected once the real usage is known
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "1000"))
+# Job description preflight (see preflight.py): drop boilerplate, and cap each request's input tokens (0 = no cap)
+JD_COMPRESSION = os.getenv("RESUME_JD_COMPRESSION", "1").lower() not in ("0", "false", "no")
+TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "0"))
+# Per-prompt budgets overriding TOKEN_BUDGET, e.g. "input_prompt7=6000,combined=20000"
+TOKEN_BUDGETS = {
+    name.strip(): int(tokens)
+    for name, tokens in (item.split("=", 1) for item in os.getenv("RESUME_TOKEN_BUDGETS", "").split(",") if "=" in item)
+}
+# Send each analysis only the resume sections it reads (see resume_sections.py)
+SECTION_PRUNING = os.getenv("RESUME_SECTION_PRUNING", "1").lower() not in ("0", "false", "no")
+# Near-duplicate resumes and job descriptions (see near_duplicates.py): "flag" them,
+# "reuse" the earlier copy's cached analyses, or "off"
+NEAR_DUPLICATES = os.getenv("RESUME_NEAR_DUPLICATES", "flag").lower()
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("RESUME_NEAR_DUPLICATE_THRESHOLD", "0.9"))
+CACHE_DIR = os.getenv("RESUME_CACHE_DIR", ".cache")
+# Scores of every analysis, kept for analytics (empty = don't keep them)
+RESULTS_DIR = os.getenv("RESUME_RESULTS_DIR", "results")
+
+METRICS_PORT = int(os.getenv("RESUME_METRICS_PORT", "0"))
+METRICS_LOG = os.getenv("RESUME_METRICS_LOG", "0").lower() not in ("0", "false", "no")
+ADMIN_PANEL = os.getenv("RESUME_ADMIN_PANEL", "0").lower() not in ("0", "false", "no")
+
+API_HOST = os.getenv("RESUME_API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("RESUME_API_PORT", "8080"))
+API_WORKERS = int(os.getenv("RESUME_API_WORKERS", "1"))
+API_TOKEN = os.getenv("RESUME_API_TOKEN", "")
+JOB_TTL_HOURS = int(os.getenv("RESUME_JOB_TTL_HOURS", "24"))
+# Background workers started by the app and the API (0 = rely on separate job_worker.py processes)
+JOB_WORKERS = int(os.getenv("RESUME_JOB_WORKERS", "4"))
+JOB_LEASE_SECONDS = int(os.getenv("RESUME_JOB_LEASE_SECONDS", "300"))
+
+PDF_MAX_PAGES = int(os.getenv("RESUME_PDF_MAX_PAGES", str(DEFAULT_MAX_PAGES)))
+PDF_DPI = int(os.getenv("RESUME_PDF_DPI", str(DEFAULT_DPI)))
+PDF_RENDER_WORKERS = int(os.getenv("RESUME_PDF_RENDER_WORKERS", "0")) or None
+PDF_MODE = os.getenv("RESUME_PDF_MODE", MODE_AUTO)
+# Limits for converting untrusted PDFs, see render_sandbox.py
+PDF_LIMITS = {
+    "timeout_seconds": float(os.getenv("RESUME_PDF_TIMEOUT_SECONDS", str(DEFAULT_LIMITS["timeout_seconds"]))),
+    "max_rss_mb": int(os.getenv("RESUME_PDF_MAX_RSS_MB", str(DEFAULT_LIMITS["max_rss_mb"]))),
+    "max_file_mb": float(os.getenv("RESUME_PDF_MAX_FILE_MB", str(DEFAULT_LIMITS["max_file_mb"]))),
+    "max_document_pages": int(os.getenv("RESUME_PDF_MAX_DOCUMENT_PAGES", str(DEFAULT_LIMITS["max_document_pages"]))),
+    "max_page_pixels": int(float(os.getenv("RESUME_PDF_MAX_PAGE_MEGAPIXELS", str(DEFAULT_LIMITS["max_page_pixels"] / 1e6))) * 1e6),
+}
+
+PDF_IMAGE_OPTIONS = {
+    "format": os.getenv("RESUME_IMAGE_FORMAT", DEFAULT_IMAGE_OPTIONS["format"]),
+    "quality": int(os.getenv("RESUME_IMAGE_QUALITY", str(DEFAULT_IMAGE_OPTIONS["quality"]))),
+    "grayscale": os.getenv("RESUME_IMAGE_GRAYSCALE", "1").lower() not in ("0", "false", "no"),
+    "target_bytes": int(os.getenv("RESUME_IMAGE_TARGET_KB", "0")) * 1024,
+    "min_quality": int(os.getenv("RESUME_IMAGE_MIN_QUALITY", str(DEFAULT_IMAGE_OPTIONS["min_quality"]))),
+    "min_dpi": int(os.getenv("RESUME_IMAGE_MIN_DPI", str(DEFAULT_IMAGE_OPTIONS["min_dpi"]))),
+}
+
+# Bump "version" when rendering changes so stale cache entries are not reused
+PDF_RENDER_SETTINGS = {"version": 5, "max_pages": PDF_MAX_PAGES, "dpi": PDF_DPI, "mode": PDF_MODE, "image": PDF_IMAGE_OPTIONS}
+PDF_TEXT_SETTINGS = {"version": 1, "max_pages": PDF_MAX_PAGES, "format": "text"}
+
+
+def make_pdf_cache():
+    return PdfRenderCache(
+        os.path.join(CACHE_DIR, "pdf"),
+        memory_limit_bytes=int(os.getenv("RESUME_PDF_CACHE_MEMORY_MB", "64")) * 1024 * 1024,
+        disk_limit_bytes=int(os.getenv("RESUME_PDF_CACHE_DISK_MB", "512")) * 1024 * 1024,
+    )
+
+
+def make_render_sandbox(workers=None):
+    # The app and API server keep a few idle workers by default; bulk runs size theirs to the CPUs
+    return RenderSandbox(workers or PDF_RENDER_WORKERS or min(4, os.cpu_count() or 1), **PDF_LIMITS)
+
+
+def make_response_cache():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    ttl_seconds = int(os.getenv("RESUME_RESPONSE_CACHE_TTL_HOURS", "168")) * 3600
+    near_duplicates = None
+    if NEAR_DUPLICATES != "off":
+        near_duplicates = NearDuplicateIndex(
+            os.path.join(CACHE_DIR, "near_duplicates.sqlite3"), threshold=NEAR_DUPLICATE_THRESHOLD,
+            reuse=NEAR_DUPLICATES == "reuse", ttl_seconds=ttl_seconds,
+        )
+    return ResponseCache(
+        os.path.join(CACHE_DIR, "responses.sqlite3"),
+        ttl_seconds=ttl_seconds,
+        max_bytes=int(os.getenv("RESUME_RESPONSE_CACHE_MB", "256")) * 1024 * 1024,
+        near_duplicates=near_duplicates,
+    )
+
+
+def make_admission_controller():
+    return AdmissionController(requests_per_minute=RPM_LIMIT, tokens_per_minute=TPM_LIMIT)
+
+
+def make_job_store():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return JobStore(os.path.join(CACHE_DIR, "jobs.sqlite3"), ttl_seconds=JOB_TTL_HOURS * 3600)
+
+
+def make_results_store():
+    return ResultsStore(RESULTS_DIR) if RESULTS_DIR else None
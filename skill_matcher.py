@@ -0,0 +1,189 @@
+"""Local skill extraction with an Aho-Corasick automaton over a skill taxonomy.
+
+Every alias in the taxonomy (e.g. "k8s" for Kubernetes) is compiled into one
+automaton, so a resume is scanned for all of them in a single pass over its
+text. Matches must sit on word boundaries, which keeps "java" from matching
+inside "javascript" while still allowing symbols in names like "c++".
+
+The bundled taxonomy is skill_taxonomy.json next to this file. Extra skills
+or aliases can be merged in from the JSON file named by RESUME_SKILLS_FILE,
+which uses the same {category: {skill: [aliases]}} layout.
+
+Usage:
+    python skill_matcher.py resumes/ > skills.jsonl
+"""
+
+import argparse
+import json
+import os
+from collections import deque
+from functools import lru_cache
+
+from pdf_render import extract_text
+
+BUNDLED_TAXONOMY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skill_taxonomy.json")
+
+
+def load_taxonomy(paths):
+    """Merge taxonomy files in order; later files add categories, skills and aliases."""
+    taxonomy = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for category, skills in json.load(f).items():
+                merged = taxonomy.setdefault(category, {})
+                for skill, aliases in skills.items():
+                    merged.setdefault(skill, [])
+                    merged[skill].extend(alias for alias in aliases if alias not in merged[skill])
+    return taxonomy
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over every alias in a skill taxonomy."""
+
+    def __init__(self, taxonomy):
+        self.categories = {}
+        # Trie as parallel lists indexed by state: transitions, failure link, outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for category, skills in taxonomy.items():
+            for skill, aliases in skills.items():
+                self.categories[skill] = category
+                for alias in {skill.casefold(), *(alias.casefold() for alias in aliases)}:
+                    self._add(alias, skill)
+        self._build_failure_links()
+
+    def _add(self, alias, skill):
+        state = 0
+        for char in alias:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(alias), skill))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """
+        Find every taxonomy skill mentioned in `text`.
+
+        Returns:
+            list: One dict per skill with "skill", "category", "count",
+            "aliases" (as written in the text) and "positions" (character
+            offsets of each mention), ordered by first mention
+        """
+        lowered, origin = fold_case(text)
+        found = {}
+        state = 0
+        for end, char in enumerate(lowered, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, skill in self._out[state]:
+                start = end - length
+                if _is_boundary(lowered, start - 1) and _is_boundary(lowered, end):
+                    match = found.setdefault(skill, {
+                        "skill": skill,
+                        "category": self.categories[skill],
+                        "count": 0,
+                        "aliases": [],
+                        "positions": [],
+                    })
+                    span = (origin[start], origin[end - 1] + 1) if origin else (start, end)
+                    # Overlapping aliases of one skill ("rest api" / "rest apis") count once
+                    if match["positions"] and match["positions"][-1][1] > span[0]:
+                        continue
+                    match["count"] += 1
+                    match["positions"].append(span)
+                    alias = text[span[0]:span[1]]
+                    if alias not in match["aliases"]:
+                        match["aliases"].append(alias)
+        return sorted(found.values(), key=lambda match: match["positions"][0][0])
+
+
+def fold_case(text):
+    """
+    Casefold `text` for matching.
+
+    Folding can lengthen a string ("ß" -> "ss", "İ" -> "i̇"), which would shift
+    every offset after it, so then each folded character is mapped back to
+    the character of `text` it came from.
+
+    Returns:
+        tuple: (folded text, original index of each folded character, or
+        None when every character folded to exactly one)
+    """
+    folded = text.casefold()
+    if len(folded) == len(text):
+        return folded, None  # folding never shortens a character, so nothing expanded
+    origin = []
+    for index, char in enumerate(text):
+        origin.extend([index] * len(char.casefold()))
+    return folded, origin
+
+
+def _is_boundary(text, index):
+    if index < 0 or index >= len(text):
+        return True
+    char = text[index]
+    return not (char.isalnum() or char in "+#")
+
+
+@lru_cache(maxsize=1)
+def get_default_matcher():
+    """Matcher for the bundled taxonomy plus RESUME_SKILLS_FILE, built once per process."""
+    paths = [BUNDLED_TAXONOMY]
+    if os.getenv("RESUME_SKILLS_FILE"):
+        paths.append(os.environ["RESUME_SKILLS_FILE"])
+    return SkillMatcher(load_taxonomy(paths))
+
+
+def group_by_category(matches):
+    grouped = {}
+    for match in matches:
+        grouped.setdefault(match["category"], []).append(match["skill"])
+    return grouped
+
+
+def format_skills_for_prompt(matches):
+    """Describe locally matched skills as a text part the model can ground its answer on."""
+    if not matches:
+        return "Skills detected locally from the resume text: none matched the skill taxonomy."
+    lines = [f"- {category}: {', '.join(skills)}" for category, skills in group_by_category(matches).items()]
+    return (
+        "Skills detected locally from the resume text by exact taxonomy matching "
+        "(treat as confirmed mentions; the resume may contain others):\n" + "\n".join(lines)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract taxonomy skills from every PDF in a directory as JSONL.")
+    parser.add_argument("resume_dir", help="Directory containing PDF resumes")
+    args = parser.parse_args(argv)
+
+    matcher = get_default_matcher()
+    for name in sorted(os.listdir(args.resume_dir)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        with open(os.path.join(args.resume_dir, name), "rb") as f:
+            text = extract_text(f.read())
+        print(json.dumps({"file": name, "skills": matcher.find(text)}))
+
+
+if __name__ == "__main__":
+    main()
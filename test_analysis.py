@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import analysis
+from analysis import stream_analysis, stream_analysis_async
+from resilience import SingleFlight
+
+PARTS = [{"text": "Jane Doe, Python engineer"}]
+
+
+class BrokenCache:
+    """A response cache whose writes fail, as a full or locked SQLite file would."""
+
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        raise sqlite3.OperationalError("database is locked")
+
+
+class JoinedFlights(SingleFlight):
+    def __init__(self):
+        super().__init__(timeout=30)
+        self.followed = threading.Event()
+
+    def join(self, key):
+        flight, leader = super().join(key)
+        if not leader:
+            self.followed.set()
+        return flight, leader
+
+
+class FakeModel:
+    """Streams two chunks, holding the second back until a follower has joined the same request."""
+
+    def __init__(self, flights):
+        self.flights = flights
+        self.calls = 0
+
+    def chunks(self):
+        yield SimpleNamespace(text="Strong ", usage_metadata=None)
+        self.flights.followed.wait(5)
+        yield SimpleNamespace(text="match.", usage_metadata=None)
+
+    def generate_content(self, contents, stream=False):
+        self.calls += 1
+        return self.chunks()
+
+    async def generate_content_async(self, contents, stream=False):
+        self.calls += 1
+
+        async def chunks():
+            yield SimpleNamespace(text="Strong ", usage_metadata=None)
+            await asyncio.to_thread(self.flights.followed.wait, 5)
+            yield SimpleNamespace(text="match.", usage_metadata=None)
+        return chunks()
+
+
+@pytest.fixture
+def model(monkeypatch):
+    flights = JoinedFlights()
+    model = FakeModel(flights)
+    monkeypatch.setattr(analysis, "IN_FLIGHT", flights)
+    monkeypatch.setattr(analysis, "get_model", lambda model_name: model)
+    return model
+
+
+def test_followers_get_the_text_when_the_leader_cannot_cache_it(model):
+    followed = []
+    follower = threading.Thread(
+        target=lambda: followed.append("".join(stream_analysis("Job", PARTS, "Rate this", cache=BrokenCache())))
+    )
+
+    def lead():
+        for chunk in stream_analysis("Job", PARTS, "Rate this", cache=BrokenCache()):
+            if follower.ident is None:  # on the first chunk
+                follower.start()
+
+    with pytest.raises(sqlite3.OperationalError):
+        lead()
+    follower.join(5)
+    assert followed == ["Strong match."]
+    assert model.calls == 1
+
+
+def test_async_followers_get_the_text_when_the_leader_cannot_cache_it(model):
+    async def collect():
+        return "".join([chunk async for chunk in stream_analysis_async("Job", PARTS, "Rate this", cache=BrokenCache())])
+
+    async def main():
+        leader = asyncio.ensure_future(collect())
+        while not analysis.IN_FLIGHT._flights:
+            await asyncio.sleep(0.01)
+        # The leader is streaming: this call joins it, then the leader's cache write fails
+        return await asyncio.gather(leader, asyncio.to_thread(asyncio.run, collect()), return_exceptions=True)
+
+    leader, follower = asyncio.run(main())
+    assert isinstance(leader, sqlite3.OperationalError)
+    assert follower == "Strong match."
+    assert model.calls == 1
@@ -0,0 +1,54 @@
+import pytest
+
+import job_worker
+from analysis import start_event_loop
+from job_worker import JobWorkers, submit_job
+from jobs import DONE, JobStore
+
+RENDER = {"parts": [{"text": "Jane Doe, Python engineer"}], "pages": 1}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+@pytest.fixture
+def workers(store):
+    loop = start_event_loop()
+    yield JobWorkers(store, loop, poll_seconds=0.01)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def fake_stream(failing):
+    async def stream(job_description, parts, prompt, **kwargs):
+        if prompt in failing:
+            raise RuntimeError("429 Resource exhausted")
+        yield "Looks good."
+    return stream
+
+
+def run_submission(store, workers):
+    job_id, created = submit_job(store, "Backend engineer", RENDER, ["input_prompt1", "input_prompt2"])
+    if created:
+        workers.run_job(store.claim("w", 60), "w")
+    return job_id, created
+
+
+def test_a_job_with_a_failed_analysis_runs_again_when_resubmitted(store, workers, monkeypatch):
+    monkeypatch.setattr(job_worker, "stream_analysis_async", fake_stream({job_worker.PROMPTS["input_prompt2"]}))
+    job_id, _ = run_submission(store, workers)
+    job = store.get(job_id)
+    assert job["status"] == DONE
+    assert job["result"]["results"]["input_prompt2"]["error"] == "429 Resource exhausted"
+
+    monkeypatch.setattr(job_worker, "stream_analysis_async", fake_stream(set()))
+    retry_id, created = run_submission(store, workers)
+    assert created and retry_id != job_id
+    assert not any(entry["error"] for entry in store.get(retry_id)["result"]["results"].values())
+
+
+def test_a_successful_job_is_reused(store, workers, monkeypatch):
+    monkeypatch.setattr(job_worker, "stream_analysis_async", fake_stream(set()))
+    job_id, _ = run_submission(store, workers)
+    assert run_submission(store, workers) == (job_id, False)
@@ -0,0 +1,82 @@
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"), max_attempts=2)
+
+
+def test_submissions_with_the_same_key_share_a_job(store):
+    job_id, created = store.submit({"analyses": ["a"]}, {"parts": [b"pdf"]}, key="k")
+    assert created
+    assert store.submit({"analyses": ["a"]}, key="k") == (job_id, False)
+    assert store.submit({"analyses": ["a"]}, key="other")[1]
+    assert store.get(job_id, with_payload=True)["payload"] == {"parts": [b"pdf"]}
+
+
+def test_a_failed_job_is_not_reused(store):
+    job_id, _ = store.submit({}, key="k")
+    store.fail(job_id, "boom")
+    new_id, created = store.submit({}, key="k")
+    assert created and new_id != job_id
+
+
+def test_a_job_finished_as_not_reusable_is_not_reused(store):
+    job_id, _ = store.submit({}, key="k")
+    store.finish(job_id, {"results": {"a": {"error": "busy"}}}, reusable=False)
+    assert store.get(job_id)["status"] == DONE
+    new_id, created = store.submit({}, key="k")
+    assert created and new_id != job_id
+
+
+def test_claim_takes_higher_priority_first_then_oldest(store):
+    bulk, _ = store.submit({}, priority=1)
+    first, _ = store.submit({}, priority=0)
+    second, _ = store.submit({}, priority=0)
+    assert store.position(bulk) == 3
+    assert [store.claim("w", 60)["id"] for _ in range(3)] == [first, second, bulk]
+    assert store.claim("w", 60) is None
+    assert store.position(first) == 0
+
+
+def test_progress_renews_the_lease_and_saves_partial_text(store):
+    job_id, _ = store.submit({})
+    store.claim("w1", 60)
+    assert store.progress(job_id, "w1", {"a": "so far"}, 60, {"position": 2})
+    job = store.get(job_id)
+    assert job["status"] == RUNNING
+    assert job["partial"] == {"a": "so far"}
+    assert job["waiting"] == {"position": 2}
+    store.finish(job_id, {"results": {}}, "w1")
+    job = store.get(job_id)
+    assert job["status"] == DONE and job["result"] == {"results": {}} and job["waiting"] == {}
+
+
+def test_an_expired_lease_is_reclaimed_and_the_old_worker_is_ignored(store):
+    job_id, _ = store.submit({})
+    store.claim("w1", -1)  # the lease is already over
+    job = store.claim("w2", 60)
+    assert job["id"] == job_id and job["attempts"] == 2
+    assert not store.progress(job_id, "w1", {}, 60)
+    store.finish(job_id, {"from": "w1"}, "w1")
+    assert store.get(job_id)["status"] == RUNNING
+    store.finish(job_id, {"from": "w2"}, "w2")
+    assert store.get(job_id)["result"] == {"from": "w2"}
+
+
+def test_jobs_whose_workers_keep_dying_fail(store):
+    job_id, _ = store.submit({})
+    store.claim("w1", -1)
+    store.claim("w2", -1)
+    assert store.claim("w3", 60) is None
+    job = store.get(job_id)
+    assert job["status"] == FAILED and "too many times" in job["error"]
+
+
+def test_stats_count_jobs_by_status(store):
+    store.submit({})
+    done, _ = store.submit({})
+    store.finish(done, {})
+    assert store.stats() == {QUEUED: 1, DONE: 1}
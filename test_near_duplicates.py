@@ -0,0 +1,64 @@
+import random
+
+from near_duplicates import NearDuplicateIndex, group_near_duplicates, minhash, similarity
+
+WORDS = [f"word{i}" for i in range(500)]
+
+
+def text(seed, words=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def edited(original, changes):
+    words = original.split()
+    for i in range(changes):
+        words[i * 7] = "edited"
+    return " ".join(words)
+
+
+def test_minhash_is_deterministic_and_skips_short_texts():
+    assert (minhash(text(1)) == minhash(text(1))).all()
+    assert minhash("too short to compare") is None
+
+
+def test_similarity_tracks_how_much_text_changed():
+    original = text(1)
+    assert similarity(minhash(original), minhash(original)) == 1.0
+    assert similarity(minhash(original), minhash(edited(original, 2))) > 0.9
+    assert similarity(minhash(original), minhash(text(2))) < 0.2
+
+
+def test_group_near_duplicates_keeps_the_first_of_each_group():
+    original, other = text(1), text(2)
+    signatures = {
+        "newest.pdf": minhash(original),
+        "other.pdf": minhash(other),
+        "older.pdf": minhash(edited(original, 2)),
+        "scanned.pdf": None,
+    }
+    duplicates = group_near_duplicates(signatures, threshold=0.8)
+    assert set(duplicates) == {"older.pdf"}
+    kept, score = duplicates["older.pdf"]
+    assert kept == "newest.pdf" and score >= 0.8
+
+
+def test_index_groups_near_duplicates_across_calls(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near.db"), threshold=0.8, reuse=True)
+    original = text(1)
+    assert index.canonical("resume", "a", minhash(original)) == ("a", 1.0)
+    group, score = index.canonical("resume", "b", minhash(edited(original, 2)))
+    assert group == "a" and score >= 0.8
+    assert index.canonical("resume", "c", minhash(text(2)))[0] == "c"
+    # Job descriptions are a separate namespace
+    assert index.canonical("job_description", "d", minhash(original))[0] == "d"
+
+
+def test_request_identities_ignore_extra_parts_for_grouping(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "near.db"), threshold=0.8, reuse=True)
+    resume = [{"text": text(1)}]
+    copy = [{"text": edited(text(1), 2)}]
+    grounding = [{"text": "Skills found locally: Python"}]
+    first, _ = index.request_identities(resume, resume + grounding, None, "Job", "test", grounding)
+    second, _ = index.request_identities(copy, copy + grounding, None, "Job", "test", grounding)
+    assert first == second
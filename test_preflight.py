@@ -0,0 +1,66 @@
+import pytest
+
+from preflight import TokenBudgetError, compress_job_description, count_tokens, fit_to_budget
+
+JOB = """Senior Backend Engineer
+
+About us
+We are a leading provider of logistics software, founded in 2009 and headquartered in Berlin.
+
+Requirements
+- 5+ years of experience building services in Python.
+- Knowledge of PostgreSQL and Kubernetes is required.
+- Experience with Python services is required.
+
+We are an equal opportunity employer and do not discriminate on the basis of race, religion or disability.
+We offer health insurance, a 401(k) plan and paid time off."""
+
+
+def test_compression_drops_boilerplate_and_keeps_the_role():
+    report = compress_job_description(JOB)
+    text = report["text"]
+    assert "Python" in text and "PostgreSQL" in text
+    assert "founded in 2009" not in text
+    assert "equal opportunity" not in text
+    assert "401(k)" not in text
+    assert set(report["removed"]) >= {"company", "eeo", "benefits"}
+    assert report["tokens_after"] < report["tokens_before"]
+
+
+def test_compression_drops_repeated_sentences():
+    text = "Build data pipelines in Python.\nBuild data pipelines in Python."
+    report = compress_job_description(text)
+    assert report["text"] == "Build data pipelines in Python."
+    assert "duplicate" in report["removed"]
+
+
+def test_text_with_nothing_about_the_role_is_sent_as_written():
+    text = "We offer health insurance, dental and a 401(k) plan."
+    assert compress_job_description(text) == {
+        "text": text, "tokens_before": count_tokens(text), "tokens_after": count_tokens(text), "removed": {},
+    }
+
+
+def test_fit_to_budget_leaves_text_that_fits():
+    assert fit_to_budget(JOB, 100, 0) == (JOB, 0)
+    assert fit_to_budget(JOB, 100, 10_000) == (JOB, 0)
+
+
+def test_fit_to_budget_drops_the_least_relevant_lines_first():
+    job = "Free snacks and a friendly team.\nExperience with Python and PostgreSQL is required.\nWe have a dog."
+    other = 10
+    text, saved = fit_to_budget(job, other, other + count_tokens(job) - 5)
+    assert text == "Experience with Python and PostgreSQL is required."
+    assert saved == count_tokens(job) - count_tokens(text)
+
+
+def test_fit_to_budget_cuts_a_single_long_line_at_a_word_boundary():
+    job = " ".join(["python"] * 200)
+    text, _ = fit_to_budget(job, 0, 20)
+    assert count_tokens(text) <= 20
+    assert text and set(text.split()) == {"python"}
+
+
+def test_fit_to_budget_fails_when_the_rest_of_the_request_is_over_budget():
+    with pytest.raises(TokenBudgetError):
+        fit_to_budget(JOB, 500, 400)
@@ -0,0 +1,21 @@
+import sys
+import types
+
+import fitz
+
+from render_sandbox import RenderSandbox
+
+
+def test_workers_start_without_re_running_the_main_script(tmp_path, monkeypatch):
+    # What Streamlit's script runner leaves behind: the app script installed as __main__
+    script = tmp_path / "app.py"
+    script.write_text("raise SystemExit('the main script ran in the worker')\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Jane Doe")
+    with RenderSandbox(workers=1) as sandbox:
+        assert "Jane Doe" in sandbox.extract_text(doc.tobytes())
+    assert sys.modules["__main__"] is main
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from resilience import RetryPolicy, SingleFlight, call_with_retries, call_with_retries_async, retry_after_seconds
+
+
+class ApiError(Exception):
+    def __init__(self, code, message="error"):
+        super().__init__(message)
+        self.code = code
+
+
+def test_next_delay_backs_off_within_bounds():
+    policy = RetryPolicy(max_retries=4, base_delay=1.0, max_delay=3.0, deadline=100)
+    for attempt, bound in enumerate([1, 2, 3, 3]):
+        delay = policy.next_delay(attempt, ApiError(503), elapsed=0)
+        assert 0 <= delay <= bound
+    assert policy.next_delay(4, ApiError(503), elapsed=0) is None
+
+
+def test_next_delay_gives_up_on_other_errors_and_past_the_deadline():
+    policy = RetryPolicy(base_delay=1.0, deadline=10)
+    assert policy.next_delay(0, ApiError(400), elapsed=0) is None
+    assert policy.next_delay(0, ValueError("no status"), elapsed=0) is None
+    assert policy.next_delay(0, ApiError(429, "retry in 5s"), elapsed=6) is None
+
+
+def test_server_hint_overrides_the_computed_delay():
+    assert retry_after_seconds(ApiError(429, "Quota exceeded, retry in 1500ms")) == 1.5
+    delay = RetryPolicy(base_delay=1.0).next_delay(0, ApiError(429, "retry in 7s"), elapsed=0)
+    assert 7 <= delay <= 8
+
+
+def test_call_with_retries_retries_then_succeeds():
+    calls, retries = [], []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ApiError(503)
+        return "ok"
+
+    policy = RetryPolicy(base_delay=0.001)
+    assert call_with_retries(flaky, policy, lambda *args: retries.append(args)) == "ok"
+    assert [attempt for attempt, _, _ in retries] == [1, 2]
+
+
+def test_call_with_retries_raises_the_last_error():
+    def failing():
+        raise ApiError(500)
+
+    with pytest.raises(ApiError):
+        call_with_retries(failing, RetryPolicy(max_retries=2, base_delay=0.001))
+
+
+def test_async_retries():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ApiError(429)
+        return "ok"
+
+    assert asyncio.run(call_with_retries_async(flaky, RetryPolicy(base_delay=0.001))) == "ok"
+    assert len(calls) == 2
+
+
+class CountingSingleFlight(SingleFlight):
+    def __init__(self):
+        super().__init__()
+        self.joined = 0
+        self._count_lock = threading.Lock()
+
+    def join(self, key):
+        flight, leader = super().join(key)
+        with self._count_lock:
+            self.joined += 1
+        return flight, leader
+
+
+def test_single_flight_shares_one_call_between_threads():
+    flights = CountingSingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "shared"
+
+    threads = [threading.Thread(target=lambda: results.append(flights.do("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flights.joined < len(threads):
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["shared"] * 4
+    assert len(calls) == 1
+
+
+def test_single_flight_passes_the_leaders_error_to_followers():
+    flights = SingleFlight()
+    flight, leader = flights.join("key")
+    assert leader
+    follower, leads = flights.join("key")
+    assert follower is flight and not leads
+    flights.finish("key", flight, error=ApiError(500))
+    with pytest.raises(ApiError):
+        follower.wait(1)
+    # The key is free again for the next call
+    assert flights.join("key")[1]
+
+
+def test_single_flight_followers_run_the_call_themselves_when_the_leader_stops():
+    flights = SingleFlight()
+    flight, _ = flights.join("key")
+    flights.finish("key", flight, error=GeneratorExit())
+    assert flight.wait(1) is None
+
+
+def test_single_flight_async_followers():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "shared"
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("key", slow) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["shared"] * 3
+    assert len(calls) == 1
@@ -0,0 +1,16 @@
+import pytest
+
+from results_store import main
+
+
+@pytest.mark.parametrize("args, message", [
+    (["-a", "0"], "--analysis must be a scored tool: 1, 4, 6"),
+    (["-a", "9"], "--analysis must be a scored tool"),
+    (["-a", "input_prompt2"], "--analysis must be a scored tool"),
+    (["-a", "1", "--by", "keywords"], "--by must be 'total' or one of: match,"),
+])
+def test_top_rejects_unscored_analyses_and_unknown_columns(args, message, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["top", "REQ-1", *args])
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
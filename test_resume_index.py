@@ -0,0 +1,63 @@
+from resume_index import ResumeIndex
+
+
+def build(path, docs, flush_every=None):
+    index = ResumeIndex(str(path))
+    for i, (name, text) in enumerate(docs):
+        index.add(name, text, f"sha-{name}")
+        if flush_every and (i + 1) % flush_every == 0:
+            index.flush()
+    index.flush()
+    return index
+
+
+DOCS = [
+    ("python.pdf", "python developer python django sql"),
+    ("java.pdf", "java developer spring sql"),
+    ("designer.pdf", "graphic designer figma illustrator"),
+    ("data.pdf", "python data engineer spark sql airflow"),
+]
+
+
+def test_search_ranks_by_bm25(tmp_path):
+    index = build(tmp_path, DOCS)
+    ranked = index.search("python sql developer", top_k=3)
+    assert [name for _, name, _ in ranked] == ["python.pdf", "java.pdf", "data.pdf"]
+    assert ranked[0][0] > ranked[1][0] > ranked[2][0] > 0
+
+
+def test_segments_merge_into_one_ranking(tmp_path):
+    one_segment = build(tmp_path / "one", DOCS).search("python sql developer", top_k=4)
+    many_segments = build(tmp_path / "many", DOCS, flush_every=1).search("python sql developer", top_k=4)
+    assert [(name, doc_id) for _, name, doc_id in many_segments] == [(name, doc_id) for _, name, doc_id in one_segment]
+    for (a, _, _), (b, _, _) in zip(one_segment, many_segments):
+        assert abs(a - b) < 1e-5
+
+
+def test_reopened_index_keeps_documents_and_skips_known_hashes(tmp_path):
+    build(tmp_path, DOCS, flush_every=2)
+    index = ResumeIndex(str(tmp_path))
+    assert len(index) == len(DOCS)
+    assert index.add("copy.pdf", "anything", "sha-python.pdf") is False
+    assert index.doc_id("sha-java.pdf") == 1
+
+
+def test_search_can_be_restricted_to_doc_ids(tmp_path):
+    index = build(tmp_path, DOCS)
+    allowed = {index.doc_id("sha-java.pdf"), index.doc_id("sha-designer.pdf")}
+    ranked = index.search("python sql", doc_ids=allowed)
+    assert {name for _, name, _ in ranked} == {"java.pdf", "designer.pdf"}
+    assert ranked[0][1] == "java.pdf" and ranked[0][0] > 0
+
+
+def test_flush_loads_segments_written_by_another_writer(tmp_path):
+    first = ResumeIndex(str(tmp_path))
+    second = ResumeIndex(str(tmp_path))
+    first.add("a.pdf", "python", "sha-a")
+    second.add("b.pdf", "java", "sha-b")
+    second.add("a-again.pdf", "python", "sha-a")
+    first.flush()
+    second.flush()
+    index = ResumeIndex(str(tmp_path))
+    assert [doc["name"] for doc in index._docs] == ["a.pdf", "b.pdf"]
+    assert [name for score, name, _ in index.search("java") if score > 0] == ["b.pdf"]
@@ -0,0 +1,74 @@
+import fitz
+
+from resume_sections import (
+    EXCERPT_NOTE, HEADER, OTHER, heading_key, part_section, prune_sections, section_parts, segment_lines, segment_pdf,
+)
+
+
+def line(text, size=10, bold=False, first=True):
+    return {"text": text, "size": size, "bold": bold, "first": first, "bbox": (0, 0, 100, 10)}
+
+
+def heading(text):
+    return line(text, size=14, bold=True)
+
+
+def test_heading_key_normalizes_short_headings_only():
+    assert heading_key("Work Experience:") == "work experience"
+    assert heading_key("SKILLS & TOOLS") == "skills and tools"
+    assert heading_key("Led a team of five engineers.") is None
+    assert heading_key("Built the billing service used by most of our customers") is None
+
+
+def test_segment_lines_splits_on_known_and_look_alike_headings():
+    lines = [
+        line("Jane Doe"), line("jane@example.com"),
+        heading("Experience"), line("Engineer at Acme, 2019-2024"),
+        heading("Volunteering"), line("Food bank driver"),
+        heading("Education"), line("BSc Computer Science"),
+    ]
+    assert segment_lines(lines) == [
+        (HEADER, "Jane Doe\njane@example.com"),
+        ("experience", "Experience\nEngineer at Acme, 2019-2024"),
+        (OTHER, "Volunteering\nFood bank driver"),
+        ("education", "Education\nBSc Computer Science"),
+    ]
+
+
+def test_heading_words_in_body_style_do_not_split_a_styled_resume():
+    lines = [heading("Skills"), line("Python"), line("Experience", first=False), heading("Projects"), line("A compiler")]
+    assert [section for section, _ in segment_lines(lines)] == ["skills", "projects"]
+
+
+def test_segment_lines_needs_enough_recognised_headings():
+    assert segment_lines([line("Jane Doe"), heading("Experience"), line("Engineer")]) is None
+    assert segment_lines([]) is None
+
+
+def test_segment_pdf_reads_headings_from_the_text_layer():
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    for text, size, font in [
+        ("Jane Doe", 10, "helv"), ("SKILLS", 14, "hebo"), ("Python, SQL", 10, "helv"),
+        ("EXPERIENCE", 14, "hebo"), ("Engineer at Acme", 10, "helv"),
+    ]:
+        page.insert_text((72, y), text, fontsize=size, fontname=font)
+        y += 30
+    pdf_bytes = doc.tobytes()
+    assert segment_pdf(pdf_bytes, 1) == [
+        (HEADER, "Jane Doe"), ("skills", "SKILLS\nPython, SQL"), ("experience", "EXPERIENCE\nEngineer at Acme"),
+    ]
+
+
+def test_prune_sections_keeps_only_the_wanted_sections():
+    sections = [(HEADER, "Jane Doe"), ("skills", "Python " * 50), ("experience", "Engineer at Acme " * 50)]
+    parts = section_parts(sections)
+    assert [part_section(part) for part in parts] == [HEADER, "skills", "experience"]
+    pruned = prune_sections(parts, ("experience",), "test")
+    assert pruned == [{"text": EXCERPT_NOTE}, parts[2]]
+    # No filter, or none of the wanted sections present: the resume goes whole
+    assert prune_sections(parts, None, "test") is parts
+    assert prune_sections(parts, ("projects",), "test") is parts
+    images = [{"mime_type": "image/png", "data": b"png"}]
+    assert prune_sections(images, ("experience",), "test") is images
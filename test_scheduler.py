@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, AdmissionController, TokenBucket
+
+
+def blocked_controller(requests_per_minute):
+    """A controller whose request bucket starts empty, so calls queue up instead of being admitted at once."""
+    controller = AdmissionController(requests_per_minute=requests_per_minute)
+    controller.requests.level = 0
+    return controller
+
+
+def submit_mixed(controller):
+    return {
+        "a1": controller.submit("a", PRIORITY_INTERACTIVE, 1),
+        "bulk": controller.submit("batch", PRIORITY_BULK, 1),
+        "a2": controller.submit("a", PRIORITY_INTERACTIVE, 1),
+        "a3": controller.submit("a", PRIORITY_INTERACTIVE, 1),
+        "b1": controller.submit("b", PRIORITY_INTERACTIVE, 1),
+    }
+
+
+def test_token_bucket_delay_and_refill():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.delay(60, now) == 0
+    bucket.take(60, now)
+    assert bucket.delay(30, now) == 30  # one unit per second
+    assert bucket.delay(30, now + 10) == 20
+    assert bucket.delay(600, now + 10) == 50  # a call bigger than the bucket waits for a full one
+    assert TokenBucket(0).delay(10**9, now) == 0
+
+
+def test_positions_follow_priority_then_round_robin():
+    controller = blocked_controller(1)  # the first grant is a minute away
+    tickets = submit_mixed(controller)
+    positions = {name: controller.position(ticket) for name, ticket in tickets.items()}
+    assert positions == {"a1": 1, "b1": 2, "a2": 3, "a3": 4, "bulk": 5}
+    for ticket in tickets.values():
+        controller.cancel(ticket)
+
+
+def test_grants_follow_priority_then_round_robin():
+    controller = blocked_controller(600)  # one grant every 0.1 s
+    tickets = submit_mixed(controller)
+    for ticket in tickets.values():
+        assert ticket._event.wait(5)
+    order = sorted(tickets, key=lambda name: tickets[name].granted)
+    assert order == ["a1", "b1", "a2", "a3", "bulk"]
+
+
+def test_cancelled_tickets_leave_the_queue():
+    controller = blocked_controller(1)
+    first = controller.submit("a", PRIORITY_INTERACTIVE, 1)
+    second = controller.submit("b", PRIORITY_INTERACTIVE, 1)
+    controller.cancel(first)
+    assert controller.position(second) == 1
+    assert controller.stats() == {"interactive": 1}
+    controller.cancel(second)
+
+
+def test_async_acquire_reports_position_until_admitted():
+    controller = blocked_controller(600)
+    positions = []
+
+    async def main():
+        first = asyncio.ensure_future(controller.acquire_async("a", PRIORITY_INTERACTIVE, 1))
+        await asyncio.sleep(0)
+        await controller.acquire_async("b", PRIORITY_INTERACTIVE, 1, positions.append, poll_seconds=0.01)
+        await first
+
+    started = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - started < 5
+    assert positions[0] == 2 and positions[-1] == 0
@@ -0,0 +1,45 @@
+from scores import extract_scores, score_instruction, strip_scores
+
+ATS = "Looks solid overall.\n\n```json\n{\"keywords\": 80, \"format\": 90, \"content\": 70, \"ats_compatibility\": 60}\n```"
+
+
+def test_extracts_sub_scores_and_the_weighted_total():
+    assert extract_scores("input_prompt6", ATS) == {
+        "scores": {"keywords": 80.0, "format": 90.0, "content": 70.0, "ats_compatibility": 60.0},
+        "total": 75.0,
+    }
+
+
+def test_total_is_weighted_over_the_sub_scores_present():
+    text = '```json\n{"match": "90%", "technical_depth": 60}\n```'
+    # (0.4 * 90 + 0.3 * 60) / 0.7
+    assert extract_scores("input_prompt1", text)["total"] == 77.1
+
+
+def test_values_are_clamped_and_unreadable_ones_skipped():
+    text = '```\n{"quantitative": 140, "qualitative": -5, "technical_proficiency": "n/a"}\n```'
+    assert extract_scores("input_prompt4", text)["scores"] == {"quantitative": 100.0, "qualitative": 0.0}
+
+
+def test_the_last_readable_block_wins():
+    text = '```json\n{"keywords": 10}\n```\nCorrected:\n```json\n{"keywords": 50}\n```\n```json\nnot json}\n```'
+    assert extract_scores("input_prompt6", text)["scores"] == {"keywords": 50.0}
+
+
+def test_no_scores_for_unscored_prompts_or_missing_blocks():
+    assert extract_scores("input_prompt2", ATS) is None
+    assert extract_scores("input_prompt6", "No block here") is None
+    assert extract_scores("input_prompt6", None) is None
+    assert extract_scores("input_prompt6", '```json\n{"unrelated": 1}\n```') is None
+
+
+def test_instruction_lists_every_sub_score():
+    instruction = score_instruction("input_prompt6")
+    for key in ("keywords", "format", "content", "ats_compatibility"):
+        assert f'"{key}": <0-100>' in instruction
+
+
+def test_strip_scores_removes_a_trailing_block_even_while_streaming():
+    assert strip_scores(ATS) == "Looks solid overall."
+    assert strip_scores('Text so far\n```json\n{"keywords": 8') == "Text so far"
+    assert strip_scores("```json\n{}\n``` in the middle stays") == "```json\n{}\n``` in the middle stays"
@@ -0,0 +1,43 @@
+from skill_matcher import SkillMatcher
+
+TAXONOMY = {
+    "Languages": {"Java": ["java"], "JavaScript": ["javascript", "js"], "C++": ["c++", "cpp"]},
+    "Backend": {"REST APIs": ["rest api", "rest apis"], "Kubernetes": ["k8s"]},
+}
+
+
+def find(text):
+    return {match["skill"]: match for match in SkillMatcher(TAXONOMY).find(text)}
+
+
+def test_matches_aliases_case_insensitively_on_word_boundaries():
+    matches = find("Built K8S clusters in JavaScript, not Java-free code")
+    assert set(matches) == {"Kubernetes", "JavaScript", "Java"}
+    assert matches["Kubernetes"]["aliases"] == ["K8S"]
+    assert matches["Java"]["count"] == 1  # "java" inside "JavaScript" is not a mention
+
+
+def test_symbols_in_skill_names():
+    assert set(find("Wrote C++ and cpp daily")) == {"C++"}
+    assert find("Wrote C++ and cpp daily")["C++"]["count"] == 2
+
+
+def test_overlapping_aliases_count_once():
+    match = find("Designed REST APIs for billing")["REST APIs"]
+    assert match["count"] == 1
+    assert match["aliases"] == ["REST APIs"]
+
+
+def test_results_are_ordered_by_first_mention():
+    assert [match["skill"] for match in SkillMatcher(TAXONOMY).find("k8s, then java, then c++")] == [
+        "Kubernetes", "Java", "C++",
+    ]
+
+
+def test_offsets_point_into_the_original_text_after_case_folding_expands():
+    # "ß" folds to "ss", which must not shift the offsets of later mentions
+    text = "Straße team: Java and K8s"
+    for match in SkillMatcher(TAXONOMY).find(text):
+        for start, end in match["positions"]:
+            assert text[start:end] in match["aliases"]
+    assert find(text)["Kubernetes"]["aliases"] == ["K8s"]